@@ -0,0 +1,240 @@
+"""
+⚡ CYBER CHAT - Activity Module
+Typing indicators and presence changes, coalesced on the server
+Students: Adir Buskila & Liav Weizman
+
+Clients report TYPING when a burst of keystrokes starts (and again every
+TYPING_REFRESH seconds while it lasts) and STOP_TYPING when it ends.
+Instead of relaying each report to every client, the server keeps who is
+typing and, at most once per TYPING_FLUSH_INTERVAL, sends each client
+that is out of date one frame with the whole set:
+
+    TYPING|alice,bob        (never including the recipient; empty = nobody)
+
+The frame is a full snapshot, so it can be skipped for a client that is
+behind on writes: it gets the then-current set on a later tick instead.
+
+STATUS changes are buffered the same way for PRESENCE_WINDOW seconds,
+merged per user (the last status wins, and a change that is undone
+within the window is not sent at all) and delivered to everyone as one
+frame in the USERS| entry format:
+
+    PRESENCE|alice(away), bob(online)
+"""
+
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, Optional, Set, Tuple
+
+from config import TYPING_FLUSH_INTERVAL, TYPING_TIMEOUT, PRESENCE_WINDOW, PRESENCE_ANNOUNCE
+from utils import ChatLogger
+
+
+IDLE_FRAME = b"TYPING|\n"   # What a client shows before anyone types
+
+
+def typing_frame(typers, exclude: Optional[str] = None) -> bytes:
+    return ("TYPING|" + ",".join(u for u in typers if u != exclude) + "\n").encode()
+
+
+# ═══════════════════════════════════════════════════════════════
+# TICKER
+# ═══════════════════════════════════════════════════════════════
+
+class Ticker(ABC):
+    """Calls flush() every `interval` seconds on a daemon thread."""
+
+    name = "flush"
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.running = False
+        self.thread: Optional[threading.Thread] = None
+        self.logger = ChatLogger('CyberServer')
+
+    def start(self):
+        self.running = True
+        if self.interval <= 0:
+            return  # Flushed by the caller instead
+        self.thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join(timeout=2)
+        self.thread = None
+
+    def _run(self):
+        while self.running:
+            time.sleep(self.interval)
+            try:
+                self.flush()
+            except Exception as e:
+                # Keep ticking: the next flush may well succeed
+                self.logger.error(f"{self.name} tick failed: {e!r}")
+
+    @abstractmethod
+    def flush(self):
+        """One tick's work."""
+
+
+# ═══════════════════════════════════════════════════════════════
+# TYPING TRACKER
+# ═══════════════════════════════════════════════════════════════
+
+class TypingTracker(Ticker):
+    """Who is typing, flushed to clients by a background ticker."""
+
+    name = "typing-flush"
+
+    def __init__(self, server, interval: float = TYPING_FLUSH_INTERVAL,
+                 timeout: float = TYPING_TIMEOUT):
+        super().__init__(interval)
+        self.server = server
+        self.timeout = timeout
+        self.typing: Dict[str, float] = {}  # {username: monotonic expiry}
+        self.dirty = False                  # The set changed since the last flush
+        self.owed: Set[str] = set()         # Clients skipped or newly (re)connected
+
+        # Accounting
+        self.reports = 0
+        self.frames_sent = 0
+        self.frames_dropped = 0
+
+    # ─────────────────────────────────────────────────────────────
+    # STATE CHANGES
+    # ─────────────────────────────────────────────────────────────
+
+    def start_typing(self, username: str):
+        """TYPING report: start (or extend) the user's typing state."""
+        with self.lock:
+            self.reports += 1
+            if username not in self.typing:
+                self.dirty = True
+            self.typing[username] = time.monotonic() + self.timeout
+        if self.interval <= 0:
+            self.flush()
+
+    def stop_typing(self, username: str):
+        """STOP_TYPING, a sent message or a disconnect."""
+        if username not in self.typing:
+            return  # Common case (every chat message) - skip the lock
+        with self.lock:
+            if self.typing.pop(username, None) is not None:
+                self.dirty = True
+        if self.interval <= 0:
+            self.flush()
+
+    def refresh(self, username: str):
+        """A new connection for `username` needs the current set."""
+        with self.lock:
+            self.owed.add(username)
+        if self.interval <= 0:
+            self.flush()
+
+    # ─────────────────────────────────────────────────────────────
+    # FLUSHING
+    # ─────────────────────────────────────────────────────────────
+
+    def flush(self):
+        """Send the current set to every client that has not seen it yet."""
+        now = time.monotonic()
+        with self.lock:
+            for username in [u for u, expiry in self.typing.items() if expiry <= now]:
+                del self.typing[username]  # No refresh - the client went quiet
+                self.dirty = True
+            if not self.dirty and not self.owed:
+                return
+            typers = sorted(self.typing)
+            owed, self.owed = self.owed, set()
+            everyone = self.dirty
+            self.dirty = False
+
+        with self.server.lock:
+            if everyone:
+                targets = list(self.server.clients.items())
+            else:
+                targets = [(u, self.server.clients[u]) for u in owed if u in self.server.clients]
+
+        shared = typing_frame(typers)
+        typing_now = set(typers)
+        skipped = set()
+        for username, conn in targets:
+            frame = typing_frame(typers, username) if username in typing_now else shared
+            if frame == conn.typing_sent:
+                continue
+            if conn.backlogged():
+                # Behind on writes: chat frames first, the newest set later
+                skipped.add(username)
+                continue
+            if conn.send(frame):
+                conn.typing_sent = frame
+                self.frames_sent += 1
+
+        if skipped:
+            self.frames_dropped += len(skipped)
+            with self.lock:
+                self.owed |= skipped
+
+
+# ═══════════════════════════════════════════════════════════════
+# PRESENCE BATCHER
+# ═══════════════════════════════════════════════════════════════
+
+class PresenceBatcher(Ticker):
+    """STATUS changes merged per user and sent as one PRESENCE| frame per window."""
+
+    name = "presence-flush"
+
+    def __init__(self, server, window: float = PRESENCE_WINDOW,
+                 announce: bool = PRESENCE_ANNOUNCE):
+        super().__init__(window)
+        self.server = server
+        self.announce = announce                    # Also post "'x' is now away" lines
+        self.pending: Dict[str, Tuple[str, str]] = {}  # {username: (status before, latest)}
+
+        # Accounting
+        self.changes = 0
+        self.updates_sent = 0
+        self.frames_sent = 0
+
+    def status_changed(self, username: str, old: str, new: str):
+        """Record a STATUS change; it goes out with the next flush."""
+        with self.lock:
+            self.changes += 1
+            before = self.pending[username][0] if username in self.pending else old
+            self.pending[username] = (before, new)
+        if self.interval <= 0:
+            self.flush()
+
+    def stop(self):
+        super().stop()
+        self.flush()  # Changes still buffered go out with the other queued frames
+
+    def flush(self):
+        """Send every user whose status changed since the last flush."""
+        with self.lock:
+            if not self.pending:
+                return
+            pending, self.pending = self.pending, {}
+
+        with self.server.lock:
+            changed = [(u, new) for u, (old, new) in pending.items()
+                       if new != old and u in self.server.clients]
+            conns = list(self.server.clients.values())
+        if not changed:
+            return  # Every change was undone within the window
+
+        if self.announce:
+            for username, status in changed:
+                self.server.broadcast_system(f"'{username}' is now {status}")
+
+        frame = ("PRESENCE|" + ", ".join(f"{u}({s})" for u, s in changed) + "\n").encode()
+        for conn in conns:
+            if conn.send(frame):
+                self.frames_sent += 1
+        self.updates_sent += len(changed)
+        self.server.ui_call(self.server.update_users_list)
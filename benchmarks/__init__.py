@@ -0,0 +1,5 @@
+"""
+⚡ CYBER CHAT - Benchmarks
+Performance measurements for the server and client hot paths.
+Run modules from the project root, e.g. `python -m benchmarks.pool_bench`.
+"""
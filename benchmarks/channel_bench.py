@@ -0,0 +1,261 @@
+"""
+⚡ CYBER CHAT - Channel Priority Benchmark
+Chat latency on a connection that is also receiving bulk file data
+Students: Adir Buskila & Liav Weizman
+
+'bob' reads slowly (small receive buffer, rate-limited reader) while
+several uploaders send him files through the server, so his downlink is
+always full of FILE_CHUNK frames. Meanwhile 'alice' sends him timestamped
+private messages and bob pings the server. Measured, once with a plain
+FIFO outbox (CHANNEL_PRIORITIES=0, SOCKET_NOTSENT_LOWAT=0) and once with
+channel priorities:
+
+    chat        alice's message sent → arrived at bob
+    ping        bob's PING → PONG round trip
+    bulk        file bytes bob received per second
+
+Usage:
+    python -m benchmarks.channel_bench                     # both modes
+    python -m benchmarks.channel_bench --uploaders 4 --rate 5
+    python -m benchmarks.channel_bench --workers 0 --json channel_results.json
+"""
+
+import argparse
+import json
+import os
+import shutil
+import socket
+import sys
+import tempfile
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.tls_bench import _start_server, _stop_server
+from config import DEFAULT_HOST, POOL_WORKERS
+from transfer import TransferManager, FILE_FRAMES
+from utils import format_bytes, percentile
+
+
+MODES = (
+    ('fifo', {'CHANNEL_PRIORITIES': '0', 'SOCKET_NOTSENT_LOWAT': '0'}),
+    ('prioritized', {}),
+)
+
+
+# ═══════════════════════════════════════════════════════════════
+# CLIENTS
+# ═══════════════════════════════════════════════════════════════
+
+class BenchUser:
+    """Blocking chat client with a reader thread and a transfer manager."""
+
+    def __init__(self, address: Tuple[str, Optional[int]], name: str,
+                 rcvbuf: int = 0, rate: float = 0.0):
+        self.name = name
+        self.rate = rate                    # Reader throttle in bytes/s (0 = as fast as possible)
+        self.lock = threading.Lock()
+        self.registered = threading.Event()
+        self.files = TransferManager(self.send, self.on_transfer_event)
+        self.download_dir = ''
+        self.received = 0                   # Bulk payload bytes written to disk
+        self.chat_latencies: List[float] = []
+        self.ping_latencies: List[float] = []
+        self.pings: deque = deque()
+
+        host, port = address  # port None: Unix socket at path `host`
+        self.sock = socket.socket(socket.AF_UNIX if port is None else socket.AF_INET,
+                                  socket.SOCK_STREAM)
+        if rcvbuf:
+            self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, rcvbuf)
+        self.sock.connect(host if port is None else address)
+        self.sock.sendall(f"{name}\n".encode())
+        threading.Thread(target=self._read, daemon=True, name=f"bench-{name}").start()
+
+    def send(self, message: str) -> bool:
+        try:
+            with self.lock:
+                self.sock.sendall((message + "\n").encode())
+            return True
+        except OSError:
+            return False
+
+    def ping(self):
+        self.pings.append(time.perf_counter())
+        self.send("PING")
+
+    def close(self):
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+
+    def on_transfer_event(self, kind: str, transfer):
+        if kind == 'offer' and self.download_dir:
+            self.files.accept(transfer.id, os.path.join(self.download_dir, transfer.id))
+
+    def _read(self):
+        buffer = b''
+        started = time.perf_counter()
+        total = 0
+        while True:
+            try:
+                data = self.sock.recv(16 * 1024)
+            except OSError:
+                return
+            if not data:
+                return
+            now = time.perf_counter()
+            *lines, buffer = (buffer + data).split(b'\n')
+            for line in lines:
+                self._on_line(line.decode(), now)
+
+            total += len(data)
+            if self.rate:
+                ahead = total / self.rate - (time.perf_counter() - started)
+                if ahead > 0:
+                    time.sleep(ahead)
+
+    def _on_line(self, line: str, now: float):
+        msg_type, _, content = line.partition("|")
+        if "OK|Welcome" in line:
+            self.registered.set()  # After the WELCOME prompt, which has no newline
+        elif msg_type in FILE_FRAMES:
+            if msg_type == "FILE_CHUNK":
+                self.received += len(content.rsplit(":", 1)[-1]) * 3 // 4
+            self.files.handle(msg_type, content)
+        elif msg_type == "PONG" and self.pings:
+            self.ping_latencies.append(now - self.pings.popleft())
+        elif msg_type == "MSG" and "]: t=" in content:
+            self.chat_latencies.append(now - float(content.rsplit("t=", 1)[1]))
+
+
+# ═══════════════════════════════════════════════════════════════
+# RUN
+# ═══════════════════════════════════════════════════════════════
+
+def _summary(latencies: List[float]) -> Dict[str, Any]:
+    latencies = sorted(latencies)
+    return {
+        'samples': len(latencies),
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+        'max_ms': (latencies[-1] if latencies else 0.0) * 1000,
+    }
+
+
+def run_mode(mode: str, env: Dict[str, str], port: int, workers: int, uploaders: int,
+             megabytes: int, rate: float, rcvbuf: int, interval: float) -> Dict[str, Any]:
+    """One server with `env` applied; bob downloads from every uploader at once."""
+    saved = {name: os.environ.get('CYBER_CHAT_' + name) for name in env}
+    os.environ.update({'CYBER_CHAT_' + name: value for name, value in env.items()})
+    try:
+        proc, pipe = _start_server(port, workers, False)  # Spawned: reads the env layer
+    finally:
+        for name, value in saved.items():
+            if value is None:
+                os.environ.pop('CYBER_CHAT_' + name, None)
+            else:
+                os.environ['CYBER_CHAT_' + name] = value
+
+    workdir = tempfile.mkdtemp(prefix='channel_bench_')
+    source = os.path.join(workdir, 'payload.bin')
+    with open(source, 'wb') as f:
+        f.write(os.urandom(megabytes * 1024 * 1024))
+
+    users: List[BenchUser] = []
+    try:
+        address = (DEFAULT_HOST, port)
+        bob = BenchUser(address, 'bob', rcvbuf=rcvbuf, rate=rate * 1e6)
+        bob.download_dir = workdir
+        alice = BenchUser(address, 'alice')
+        senders = [BenchUser(address, f"uploader{i}") for i in range(uploaders)]
+        users = [bob, alice] + senders
+        for user in users:
+            if not user.registered.wait(10):
+                raise RuntimeError(f"{user.name} was not registered")
+
+        started = time.perf_counter()
+        outgoing = [user.files.offer('bob', source) for user in senders]
+        while not all(t.finished for t in outgoing) and time.perf_counter() - started < 600:
+            alice.send(f"TO:bob:t={time.perf_counter():.6f}")
+            bob.ping()
+            time.sleep(interval)
+        elapsed = time.perf_counter() - started
+        time.sleep(0.5)  # Last messages and pongs
+    finally:
+        for user in users:
+            user.close()
+        _stop_server(proc, pipe)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return {
+        'mode': mode,
+        'uploaders': uploaders,
+        'completed': sum(1 for t in outgoing if t.state == 'done'),
+        'bulk_bytes': bob.received,
+        'bulk_mb_per_s': bob.received / elapsed / 1e6,
+        'seconds': elapsed,
+        'chat': _summary(bob.chat_latencies),
+        'ping': _summary(bob.ping_latencies),
+    }
+
+
+# ═══════════════════════════════════════════════════════════════
+# REPORT
+# ═══════════════════════════════════════════════════════════════
+
+def print_results(results: List[Dict[str, Any]]):
+    print()
+    print(f"{'':<18}" + "".join(f"{r['mode']:>16}" for r in results))
+    print("─" * (18 + 16 * len(results)))
+    for label, fmt in (
+        ('Transfers', lambda r: f"{r['completed']}/{r['uploaders']}"),
+        ('Bulk received', lambda r: format_bytes(r['bulk_bytes'])),
+        ('Bulk rate', lambda r: f"{r['bulk_mb_per_s']:.1f} MB/s"),
+        ('Chat p50', lambda r: f"{r['chat']['p50_ms']:.1f} ms"),
+        ('Chat p99', lambda r: f"{r['chat']['p99_ms']:.1f} ms"),
+        ('Chat max', lambda r: f"{r['chat']['max_ms']:.1f} ms"),
+        ('Ping p50', lambda r: f"{r['ping']['p50_ms']:.1f} ms"),
+        ('Ping p99', lambda r: f"{r['ping']['p99_ms']:.1f} ms"),
+        ('Samples', lambda r: f"{r['chat']['samples']}/{r['ping']['samples']}"),
+    ):
+        print(f"{label:<18}" + "".join(f"{fmt(r):>16}" for r in results))
+    print()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chat latency under bulk load")
+    parser.add_argument('--mode', choices=[name for name, _ in MODES])
+    parser.add_argument('--uploaders', type=int, default=3, help="concurrent files sent to bob")
+    parser.add_argument('--megabytes', type=int, default=16, help="size of each file")
+    parser.add_argument('--rate', type=float, default=10.0, help="bob's read rate in MB/s")
+    parser.add_argument('--rcvbuf', type=int, default=64 * 1024, help="bob's SO_RCVBUF")
+    parser.add_argument('--interval', type=float, default=0.02,
+                        help="seconds between chat messages (and pings)")
+    parser.add_argument('--workers', type=int, default=POOL_WORKERS)
+    parser.add_argument('--port', type=int, default=24466)
+    parser.add_argument('--json', help="write results to this file")
+    args = parser.parse_args()
+
+    results = []
+    for offset, (mode, env) in enumerate(MODES):
+        if args.mode and mode != args.mode:
+            continue
+        print(f"⚡ {mode}: {args.uploaders} × {args.megabytes} MB to a reader "
+              f"at {args.rate:g} MB/s, chatting every {args.interval * 1000:g} ms...")
+        results.append(run_mode(mode, env, args.port + offset, args.workers, args.uploaders,
+                                args.megabytes, args.rate, args.rcvbuf, args.interval))
+    print_results(results)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,289 @@
+"""
+⚡ CYBER CHAT - Micro-Benchmarks
+Per-message hot paths measured in isolation
+Students: Adir Buskila & Liav Weizman
+
+Each benchmark runs one code path over realistic inputs and records
+operations per second plus the peak bytes allocated by a single call.
+Results are compared against a stored baseline; anything slower (or
+allocating more) than the threshold is flagged as a regression.
+
+Usage:
+    python main.py bench                      # run and compare to baseline
+    python main.py bench --filter emoji       # only matching benchmarks
+    python main.py bench --save-baseline      # record a new baseline
+    python -m benchmarks.micro --threshold 0.1
+"""
+
+import argparse
+import contextlib
+import io
+import itertools
+import json
+import os
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import STATUS_ONLINE, STATUS_AWAY, STATUS_BUSY
+from utils import (
+    sanitize_username, replace_emoji_shortcuts, parse_command,
+    validate_message, parse_user_list
+)
+
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+DEFAULT_THRESHOLD = 0.20  # 20% slower / larger than baseline
+
+
+# ═══════════════════════════════════════════════════════════════
+# REALISTIC INPUTS
+# ═══════════════════════════════════════════════════════════════
+
+USERNAMES = [
+    "alice", "Bob_the_Builder", "  carol  ", "d@ve!", "eve-99",
+    "שלום_user", "x" * 40, "neo.matrix", "Trinity", "m0rph3us",
+]
+
+CHAT_MESSAGES = [
+    "hey everyone :)",
+    "did anyone try the new build? :fire: :fire:",
+    "brb",
+    "lol :D that's amazing <3",
+    "ok so here is the plan: we meet at 8, bring snacks, and don't forget "
+    "the cables this time :+1: :rocket:",
+    "no emoji in this one, just a plain sentence of average length.",
+    "a" * 400,
+    ":wave: :wave: :wave: hi :100:",
+]
+
+COMMAND_INPUTS = [
+    "/status away", "/dm bob hello there", "/help", "just chatting",
+    "/clear", "  /ping  ", "/save", "not a /command",
+]
+
+# Near the 2000-character limit in validate_message() - worst case for scanning
+LONG_CHAT_MESSAGES = [
+    "x" * 2000,
+    "this line has no command in it at all " * 50,
+    "ratio: 3:1 in favour, said someone " * 55,
+]
+
+PROTOCOL_COMMANDS = [
+    "LIST", "STATUS:away", "STATUS:online", "TO:user01:psst, over here",
+    "list", "to:user02:lowercase works too",
+]
+
+SERVER_MESSAGES = CHAT_MESSAGES + PROTOCOL_COMMANDS[:4]
+
+
+def make_user_list(count: int) -> str:
+    """Build a USERS frame body like the server's broadcast_userlist()."""
+    statuses = [STATUS_ONLINE, STATUS_AWAY, STATUS_BUSY]
+    return "Online: " + ", ".join(
+        f"user{i:02d}({statuses[i % 3]})" for i in range(count)
+    )
+
+
+# ═══════════════════════════════════════════════════════════════
+# SERVER FIXTURE
+# ═══════════════════════════════════════════════════════════════
+
+class NullConnection:
+    """Stand-in for ClientConnection that discards everything sent."""
+
+    def __init__(self, username: str):
+        self.username = username
+        self.status = STATUS_ONLINE
+        self.messages_sent = 0
+        self.bytes_sent = 0
+
+    def send(self, data: bytes) -> bool:
+        self.bytes_sent += len(data)
+        return True
+
+    push = send  # No session: sequenced frames are sent as-is
+
+    def close(self):
+        pass
+
+
+def make_server(clients: int):
+    """Headless server with `clients` registered null connections."""
+    from server import CyberServer
+
+    server = CyberServer(headless=True)
+    server.logger.logger.disabled = True  # Measure the protocol, not disk I/O
+    for i in range(clients):
+        name = f"user{i:02d}"
+        server.clients[name] = NullConnection(name)
+    return server
+
+
+# ═══════════════════════════════════════════════════════════════
+# BENCHMARK REGISTRY
+# ═══════════════════════════════════════════════════════════════
+
+def cycling(func: Callable, inputs: List[Any]) -> Callable[[], Any]:
+    """Wrap func so each call consumes the next input in rotation."""
+    feed = itertools.cycle(inputs)
+    return lambda: func(next(feed))
+
+
+def bench_handle_message() -> Callable[[], Any]:
+    server = make_server(5)
+    return cycling(lambda msg: server.handle_message("user00", msg), SERVER_MESSAGES)
+
+
+def bench_broadcast_build() -> Callable[[], Any]:
+    server = make_server(50)
+    return cycling(lambda msg: server.broadcast_message("user00", msg), CHAT_MESSAGES)
+
+
+def bench_command_lookup(inputs: List[str]) -> Callable[[], Any]:
+    server = make_server(0)
+    return cycling(server.resolve_command, inputs)
+
+
+def bench_update_users_parse() -> Callable[[], Any]:
+    return cycling(parse_user_list, [make_user_list(n) for n in (1, 10, 50, 200)])
+
+
+BENCHMARKS: Dict[str, Callable[[], Callable[[], Any]]] = {
+    'handle_message dispatch': bench_handle_message,
+    'broadcast build (50 clients)': bench_broadcast_build,
+    'command lookup (chat)': lambda: bench_command_lookup(CHAT_MESSAGES + LONG_CHAT_MESSAGES),
+    'command lookup (commands)': lambda: bench_command_lookup(PROTOCOL_COMMANDS),
+    'sanitize_username': lambda: cycling(sanitize_username, USERNAMES),
+    'replace_emoji_shortcuts': lambda: cycling(replace_emoji_shortcuts, CHAT_MESSAGES),
+    'parse_command': lambda: cycling(parse_command, COMMAND_INPUTS),
+    'validate_message': lambda: cycling(validate_message, CHAT_MESSAGES),
+    'update_users parse': bench_update_users_parse,
+}
+
+
+# ═══════════════════════════════════════════════════════════════
+# RUNNER
+# ═══════════════════════════════════════════════════════════════
+
+def time_calls(func: Callable[[], Any], calls: int) -> float:
+    """Seconds taken by `calls` invocations."""
+    started = time.perf_counter()
+    for _ in range(calls):
+        func()
+    return time.perf_counter() - started
+
+
+def measure(func: Callable[[], Any], min_time: float = 0.2,
+            repeat: int = 5) -> Tuple[float, float]:
+    """Return (best ops/sec, mean peak bytes allocated per call)."""
+    # Calibrate so one timing run lasts at least min_time
+    calls = 1
+    while time_calls(func, calls) < min_time:
+        calls *= 2
+
+    best = min(time_calls(func, calls) for _ in range(repeat))
+    ops_per_sec = calls / best
+
+    samples = 200
+    tracemalloc.start()
+    try:
+        total = 0
+        for _ in range(samples):
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            func()
+            total += tracemalloc.get_traced_memory()[1] - before
+    finally:
+        tracemalloc.stop()
+
+    return ops_per_sec, total / samples
+
+
+def run(names: List[str], min_time: float) -> Dict[str, Dict[str, float]]:
+    """Run the named benchmarks and return their results."""
+    results = {}
+    for name in names:
+        func = BENCHMARKS[name]()
+        # Headless server logs go to stdout; keep the report readable
+        with contextlib.redirect_stdout(io.StringIO()):
+            ops_per_sec, alloc_bytes = measure(func, min_time)
+        results[name] = {'ops_per_sec': ops_per_sec, 'alloc_bytes': alloc_bytes}
+        print(f"  {name:<32}{ops_per_sec:>14,.0f} ops/s{alloc_bytes:>12,.0f} B/op")
+    return results
+
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]],
+            threshold: float) -> List[str]:
+    """Print a comparison and return the names that regressed."""
+    regressions = []
+    print()
+    print(f"  {'benchmark':<32}{'ops/s Δ':>12}{'alloc Δ':>12}")
+    for name, result in results.items():
+        base = baseline.get(name)
+        if not base:
+            print(f"  {name:<32}{'(new)':>12}")
+            continue
+
+        speed = result['ops_per_sec'] / base['ops_per_sec'] - 1
+        alloc = (result['alloc_bytes'] / base['alloc_bytes'] - 1) if base['alloc_bytes'] else 0.0
+        slower = speed < -threshold
+        bigger = alloc > threshold and result['alloc_bytes'] - base['alloc_bytes'] > 64
+        flag = "  ⚠️ REGRESSION" if slower or bigger else ""
+        if flag:
+            regressions.append(name)
+        print(f"  {name:<32}{speed * 100:>+11.1f}%{alloc * 100:>+11.1f}%{flag}")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command-line entry point (python main.py bench ...)."""
+    parser = argparse.ArgumentParser(prog="main.py bench",
+                                     description="Micro-benchmarks for per-message hot paths")
+    parser.add_argument('--filter', default='', help="only run benchmarks containing this text")
+    parser.add_argument('--baseline', default=BASELINE_FILE, help="baseline JSON file")
+    parser.add_argument('--save-baseline', action='store_true', help="overwrite the baseline")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help="regression threshold as a fraction (default 0.20)")
+    parser.add_argument('--min-time', type=float, default=0.2, help="seconds per timing run")
+    parser.add_argument('--json', help="also write results to this file")
+    args = parser.parse_args(argv)
+
+    names = [name for name in BENCHMARKS if args.filter.lower() in name.lower()]
+    print(f"⚡ Running {len(names)} micro-benchmarks...")
+    results = run(names, args.min_time)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+    if args.save_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline, encoding='utf-8') as f:
+                baseline = json.load(f)
+        baseline.update(results)
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        print(f"\n💾 Baseline saved to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("\nNo baseline yet - run with --save-baseline to record one.")
+        return 0
+
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print(f"\n❌ {len(regressions)} regression(s) above {args.threshold:.0%}")
+        return 1
+    print(f"\n✅ No regressions above {args.threshold:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,216 @@
+"""
+⚡ CYBER CHAT - Multicast Fan-out Benchmark
+Server egress per broadcast: one TCP copy per client vs. one datagram
+Students: Adir Buskila & Liav Weizman
+
+One headless server with MULTICAST_ENABLED runs on the loopback
+interface (the group is joined on 127.0.0.1, so no LAN is needed). For
+each client count, 'sender' broadcasts timestamped messages to that many
+listeners, first with every listener on TCP and then with every listener
+a multicast member:
+
+    egress      bytes the server wrote per broadcast (TCP + group)
+    cpu         server CPU time per broadcast
+    delivery    sent → shown at a listener, all listeners pooled
+    repair      with --loss, members drop that fraction of datagrams on
+                purpose; NACKs and repaired frames show the TCP repair path
+
+Usage:
+    python -m benchmarks.multicast_bench
+    python -m benchmarks.multicast_bench --clients 10 100 400 --messages 1000
+    python -m benchmarks.multicast_bench --loss 0.05 --json multicast_results.json
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.channel_bench import BenchUser, _summary
+from benchmarks.tls_bench import _start_server, _stop_server, _server_stats
+from config import DEFAULT_HOST, POOL_WORKERS, MULTICAST_GROUP
+from multicast import MulticastReceiver
+from utils import format_bytes
+
+
+# ═══════════════════════════════════════════════════════════════
+# CLIENTS
+# ═══════════════════════════════════════════════════════════════
+
+class LossyReceiver(MulticastReceiver):
+    """Drops a fraction of group datagrams before they are parsed."""
+
+    loss = 0.0
+
+    def datagram(self, data: bytes):
+        if self.loss and random.random() < self.loss:
+            return
+        super().datagram(data)
+
+
+class GroupUser(BenchUser):
+    """BenchUser that can take broadcasts from the multicast group."""
+
+    def __init__(self, address: Tuple[str, Optional[int]], name: str):
+        self.receiver: Optional[LossyReceiver] = None
+        super().__init__(address, name)
+
+    def join(self, group: str, port: int, loss: float):
+        self.receiver = LossyReceiver(self.name, self._on_group_frame, self.send, lambda n: None)
+        self.receiver.loss = loss
+        self.receiver.listen(group, port, DEFAULT_HOST)
+        self.send("MULTICAST")
+
+    def close(self):
+        if self.receiver:
+            self.receiver.close()
+        self.send("QUIT")  # No session held for a resume - it would stay a member
+        super().close()
+
+    def _on_group_frame(self, frame: str):
+        if frame.startswith("MSG|") and "]: t=" in frame:
+            self.chat_latencies.append(time.perf_counter() - float(frame.rsplit("t=", 1)[1]))
+
+    def _on_line(self, line: str, now: float):
+        if line.startswith(("MC|", "MCLOST|")):
+            if self.receiver:
+                self.receiver.accept(line)
+        elif line.startswith("MULTICAST|"):
+            self.receiver.start(int(line.rsplit(":", 1)[1]))
+        else:
+            super()._on_line(line, now)
+
+
+# ═══════════════════════════════════════════════════════════════
+# RUN
+# ═══════════════════════════════════════════════════════════════
+
+def run_fanout(mode: str, clients: int, messages: int, interval: float, loss: float,
+               port: int, group_port: int, pipe) -> Dict[str, Any]:
+    """`messages` broadcasts to `clients` listeners, all on TCP or all on the group."""
+    address = (DEFAULT_HOST, port)
+    listeners: List[GroupUser] = []
+    sender = GroupUser(address, f"{mode}{clients}sender")
+    try:
+        listeners = [GroupUser(address, f"{mode}{clients}l{i}") for i in range(clients)]
+        for user in [sender] + listeners:
+            if not user.registered.wait(10):
+                raise RuntimeError(f"{user.name} was not registered")
+        if mode == 'multicast':
+            for user in listeners:
+                user.join(MULTICAST_GROUP, group_port, loss)
+            deadline = time.perf_counter() + 10
+            while not all(u.receiver.started for u in listeners):
+                if time.perf_counter() > deadline:
+                    raise RuntimeError("MULTICAST replies missing")
+                time.sleep(0.01)
+        time.sleep(0.5)  # Join notices out of the way
+        for user in listeners:
+            user.chat_latencies.clear()
+
+        before = _server_stats(pipe)
+        started = time.perf_counter()
+        for _ in range(messages):
+            sender.send(f"t={time.perf_counter():.6f}")
+            if interval:
+                time.sleep(interval)
+        expected = messages * clients
+        deadline = time.perf_counter() + 60
+        while sum(len(u.chat_latencies) for u in listeners) < expected \
+                and time.perf_counter() < deadline:
+            time.sleep(0.01)
+        elapsed = time.perf_counter() - started
+        after = _server_stats(pipe)
+    finally:
+        for user in [sender] + listeners:
+            user.close()
+        time.sleep(0.5)  # Departures processed before the next run
+
+    group_before = before['multicast'] or {}
+    group_after = after['multicast'] or {}
+    group_bytes = group_after.get('bytes_sent', 0) - group_before.get('bytes_sent', 0)
+    latencies = [lag for user in listeners for lag in user.chat_latencies]
+    result = _summary(latencies)
+    result.update({
+        'mode': mode,
+        'clients': clients,
+        'messages': messages,
+        'delivered': len(latencies) / max(1, expected),
+        'seconds': elapsed,
+        'egress_per_msg': (after['egress_bytes'] - before['egress_bytes'] + group_bytes) / messages,
+        'group_bytes_per_msg': group_bytes / messages,
+        'cpu_us_per_msg': (after['cpu'] - before['cpu']) / messages * 1e6,
+        'nacks': group_after.get('nacks', 0) - group_before.get('nacks', 0),
+        'repaired': group_after.get('repaired', 0) - group_before.get('repaired', 0),
+    })
+    return result
+
+
+# ═══════════════════════════════════════════════════════════════
+# REPORT
+# ═══════════════════════════════════════════════════════════════
+
+def print_results(results: List[Dict[str, Any]]):
+    print()
+    print(f"{'':<20}" + "".join(f"{r['mode'][:5]}×{r['clients']:<6}".rjust(14) for r in results))
+    print("─" * (20 + 14 * len(results)))
+    for label, fmt in (
+        ('Egress/broadcast', lambda r: format_bytes(r['egress_per_msg'])),
+        ('  to the group', lambda r: format_bytes(r['group_bytes_per_msg'])),
+        ('Server CPU/msg', lambda r: f"{r['cpu_us_per_msg']:.0f} µs"),
+        ('Delivered', lambda r: f"{r['delivered'] * 100:.1f}%"),
+        ('Delivery p50', lambda r: f"{r['p50_ms']:.1f} ms"),
+        ('Delivery p99', lambda r: f"{r['p99_ms']:.1f} ms"),
+        ('NACKs', lambda r: f"{r['nacks']}"),
+        ('Repaired frames', lambda r: f"{r['repaired']}"),
+    ):
+        print(f"{label:<20}" + "".join(f"{fmt(r):>14}" for r in results))
+    print()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Broadcast fan-out: TCP vs. multicast")
+    parser.add_argument('--clients', type=int, nargs='+', default=[10, 50, 200],
+                        help="listener counts to run")
+    parser.add_argument('--messages', type=int, default=300, help="broadcasts per run")
+    parser.add_argument('--interval', type=float, default=0.002,
+                        help="seconds between broadcasts")
+    parser.add_argument('--loss', type=float, default=0.0,
+                        help="fraction of datagrams each member drops (exercises NACK repair)")
+    parser.add_argument('--workers', type=int, default=POOL_WORKERS)
+    parser.add_argument('--port', type=int, default=24486)
+    parser.add_argument('--group-port', type=int, default=24487)
+    parser.add_argument('--json', help="write results to this file")
+    args = parser.parse_args()
+
+    # The spawned server reads its settings from the environment layer
+    os.environ['CYBER_CHAT_MULTICAST_ENABLED'] = '1'
+    os.environ['CYBER_CHAT_MULTICAST_PORT'] = str(args.group_port)
+    os.environ['CYBER_CHAT_MAX_CLIENTS'] = str(max(args.clients) + 50)
+    proc, pipe = _start_server(args.port, args.workers, False)
+    results = []
+    try:
+        for clients in args.clients:
+            for mode in ('tcp', 'multicast'):
+                print(f"⚡ {mode}: {args.messages} broadcasts to {clients} listeners"
+                      + (f", {args.loss:.0%} datagram loss" if mode == 'multicast' and args.loss
+                         else "") + "...")
+                results.append(run_fanout(mode, clients, args.messages, args.interval,
+                                          args.loss, args.port, args.group_port, pipe))
+    finally:
+        _stop_server(proc, pipe)
+    print_results(results)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,308 @@
+"""
+⚡ CYBER CHAT - Connection Pool Benchmark
+Thread-per-client vs. selector pool at high connection counts
+Students: Adir Buskila & Liav Weizman
+
+Starts a headless server in a child process, connects N clients from a
+single selector loop, then sends timestamped probe messages and measures
+how long each broadcast copy takes to reach every client.
+
+Usage:
+    python -m benchmarks.pool_bench                   # both modes, 2000 clients
+    python -m benchmarks.pool_bench --clients 500 --mode pool
+    python -m benchmarks.pool_bench --json pool_results.json
+    python -m benchmarks.pool_bench --tls             # same, over TLS
+"""
+
+import argparse
+import json
+import multiprocessing as mp
+import os
+import random
+import selectors
+import socket
+import ssl
+import sys
+import threading
+import time
+from typing import Any, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import DEFAULT_HOST, POOL_WORKERS
+from utils import format_bytes, get_memory_usage, percentile
+
+
+# ═══════════════════════════════════════════════════════════════
+# SERVER PROCESS
+# ═══════════════════════════════════════════════════════════════
+
+def _serve(pipe, port: int, workers: int, use_tls: bool = False):
+    """Run a headless server and answer 'stats' / 'stop' over the pipe."""
+    sys.stdout = open(os.devnull, 'w')
+    from server import CyberServer
+
+    server = CyberServer(port=port, workers=workers, headless=True, use_tls=use_tls)
+    server.start_server()
+    pipe.send('ready' if server.running else 'failed')
+
+    while True:
+        command = pipe.recv()
+        if command == 'stats':
+            with server.lock:
+                clients = len(server.clients)
+                egress = sum(conn.bytes_sent for conn in server.clients.values())
+            pipe.send({
+                'rss': get_memory_usage(),
+                'threads': threading.active_count(),
+                'clients': clients,
+                'cpu': time.process_time(),
+                'tls_handshakes': server.stats['tls_handshakes'],
+                'tls_resumed': server.stats['tls_resumed'],
+                'pool': server.pool.stats() if server.pool else None,
+                'egress_bytes': egress,
+                'multicast': server.multicast.stats() if server.multicast else None,
+            })
+        elif command == 'stop':
+            server.stop_server()
+            pipe.send('stopped')
+            return
+
+
+# ═══════════════════════════════════════════════════════════════
+# CLIENT DRIVER
+# ═══════════════════════════════════════════════════════════════
+
+class BenchClient:
+    """Minimal non-blocking chat client used by the driver."""
+
+    def __init__(self, sock: socket.socket, name: str):
+        self.sock = sock
+        self.name = name
+        self.buffer = b''
+        self.registered = False
+
+
+class Driver:
+    """Owns all client sockets and timestamps probe deliveries."""
+
+    def __init__(self, host: str, port: int, tls_context: ssl.SSLContext = None):
+        self.host = host
+        self.port = port
+        self.tls_context = tls_context
+        self.selector = selectors.DefaultSelector()
+        self.clients: List[BenchClient] = []
+        self.registered = 0
+        self.probe_sent_at: Dict[int, float] = {}
+        self.latencies: List[float] = []
+        self.last_delivery: Dict[int, float] = {}
+
+    def connect(self, index: int):
+        sock = socket.create_connection((self.host, self.port), timeout=10)
+        if self.tls_context:
+            sock = self.tls_context.wrap_socket(sock, server_hostname=self.host)
+        client = BenchClient(sock, f"bench{index:05d}")
+        sock.sendall(f"{client.name}\n".encode())
+        sock.setblocking(False)
+        self.selector.register(sock, selectors.EVENT_READ, client)
+        self.clients.append(client)
+
+    def poll(self, timeout: float) -> int:
+        """Read whatever is ready. Returns the number of sockets serviced."""
+        events = self.selector.select(timeout)
+        for key, _ in events:
+            client = key.data
+            try:
+                data = client.sock.recv(65536)
+                # TLS: drain records already decrypted into the SSL buffer
+                while isinstance(client.sock, ssl.SSLSocket) and client.sock.pending():
+                    data += client.sock.recv(65536)
+            except (BlockingIOError, InterruptedError,
+                    ssl.SSLWantReadError, ssl.SSLWantWriteError):
+                continue
+            if not data:
+                self.selector.unregister(client.sock)
+                continue
+
+            now = time.perf_counter()
+            *lines, client.buffer = (client.buffer + data).split(b'\n')
+            for line in lines:
+                self._on_line(client, line, now)
+        return len(events)
+
+    def _on_line(self, client: BenchClient, line: bytes, now: float):
+        if not client.registered and b'OK|Welcome' in line:
+            client.registered = True
+            self.registered += 1
+        elif b']: probe ' in line and (line.startswith(b'MSG|') or line.startswith(b'SENT|')):
+            probe_id = int(line.rsplit(b' ', 1)[1])
+            latency = now - self.probe_sent_at[probe_id]
+            self.latencies.append(latency)
+            self.last_delivery[probe_id] = max(self.last_delivery.get(probe_id, 0.0), latency)
+
+    def quiesce(self, idle: float = 1.0, limit: float = 600.0):
+        """Drain until the server has been silent for `idle` seconds."""
+        deadline = time.monotonic() + limit
+        while time.monotonic() < deadline and self.poll(idle):
+            pass
+
+    def send_probe(self, probe_id: int):
+        client = random.choice(self.clients)
+        self.probe_sent_at[probe_id] = time.perf_counter()
+        client.sock.setblocking(True)
+        client.sock.sendall(f"probe {probe_id}\n".encode())
+        client.sock.setblocking(False)
+
+    def close(self):
+        for client in self.clients:
+            try:
+                client.sock.close()
+            except Exception:
+                pass
+        self.selector.close()
+
+
+# ═══════════════════════════════════════════════════════════════
+# BENCHMARK
+# ═══════════════════════════════════════════════════════════════
+
+def run_mode(workers: int, clients: int, probes: int, rate: float,
+             port: int, use_tls: bool = False) -> Dict[str, Any]:
+    """Benchmark one connection-handling mode. workers=0 is thread-per-client."""
+    # Spawn (not fork) so the server's RSS does not include the driver's pages
+    ctx = mp.get_context('spawn')
+    pipe, child = ctx.Pipe()
+    proc = ctx.Process(target=_serve, args=(child, port, workers, use_tls), daemon=True)
+    proc.start()
+    if pipe.recv() != 'ready':
+        proc.join()
+        raise RuntimeError(f"Server failed to start on port {port}")
+
+    def server_stats() -> Dict[str, Any]:
+        pipe.send('stats')
+        return pipe.recv()
+
+    idle = server_stats()
+    tls_context = None
+    if use_tls:
+        import tls
+        tls_context = tls.client_context()
+    driver = Driver(DEFAULT_HOST, port, tls_context)
+
+    try:
+        # Ramp up - keep draining so the join/roster storm never stalls the server
+        ramp_start = time.perf_counter()
+        for i in range(clients):
+            driver.connect(i)
+            driver.poll(0)
+        while driver.registered < clients and driver.poll(5.0):
+            pass
+        driver.quiesce()
+        ramp_time = time.perf_counter() - ramp_start
+        loaded = server_stats()
+
+        # Probes - each one is broadcast to every connected client
+        interval = 1.0 / rate
+        next_send = time.perf_counter()
+        for probe_id in range(probes):
+            while time.perf_counter() < next_send:
+                driver.poll(max(0.0, next_send - time.perf_counter()))
+            driver.send_probe(probe_id)
+            next_send += interval
+
+        expected = probes * clients
+        deadline = time.monotonic() + 30
+        while len(driver.latencies) < expected and time.monotonic() < deadline:
+            driver.poll(0.5)
+        final = server_stats()
+    finally:
+        driver.close()
+        pipe.send('stop')
+        pipe.recv()
+        proc.join(timeout=5)
+
+    latencies = sorted(driver.latencies)
+    fanout = sorted(driver.last_delivery.values())
+    mode = f"pool ({workers} workers)" if workers else "thread-per-client"
+    return {
+        'mode': mode + (" + TLS" if use_tls else ""),
+        'tls': use_tls,
+        'workers': workers,
+        'clients': clients,
+        'registered': driver.registered,
+        'ramp_seconds': round(ramp_time, 2),
+        'rss_idle': idle['rss'],
+        'rss_loaded': loaded['rss'],
+        'rss_per_client': (loaded['rss'] - idle['rss']) / max(clients, 1),
+        'threads': loaded['threads'],
+        'cpu_ramp_seconds': loaded['cpu'] - idle['cpu'],
+        'cpu_probe_seconds': final['cpu'] - loaded['cpu'],
+        'deliveries': len(latencies),
+        'expected_deliveries': expected,
+        'delivery_p50_ms': percentile(latencies, 50) * 1000,
+        'delivery_p99_ms': percentile(latencies, 99) * 1000,
+        'delivery_max_ms': (latencies[-1] * 1000) if latencies else 0.0,
+        'fanout_p99_ms': percentile(fanout, 99) * 1000,
+        'pool': final['pool'],
+    }
+
+
+def print_report(results: List[Dict[str, Any]]):
+    """Print a side-by-side comparison."""
+    rows = [
+        ('Registered', lambda r: f"{r['registered']}/{r['clients']}"),
+        ('Ramp time', lambda r: f"{r['ramp_seconds']:.1f} s"),
+        ('Server threads', lambda r: str(r['threads'])),
+        ('CPU ramp', lambda r: f"{r['cpu_ramp_seconds']:.2f} s"),
+        ('CPU probes', lambda r: f"{r['cpu_probe_seconds']:.2f} s"),
+        ('RSS idle', lambda r: format_bytes(r['rss_idle'])),
+        ('RSS loaded', lambda r: format_bytes(r['rss_loaded'])),
+        ('RSS / client', lambda r: format_bytes(r['rss_per_client'])),
+        ('Deliveries', lambda r: f"{r['deliveries']}/{r['expected_deliveries']}"),
+        ('Delivery p50', lambda r: f"{r['delivery_p50_ms']:.2f} ms"),
+        ('Delivery p99', lambda r: f"{r['delivery_p99_ms']:.2f} ms"),
+        ('Delivery max', lambda r: f"{r['delivery_max_ms']:.2f} ms"),
+        ('Fan-out p99', lambda r: f"{r['fanout_p99_ms']:.2f} ms"),
+        ('Pool utilization', lambda r: f"{r['pool']['utilization'] * 100:.0f}%" if r['pool'] else '-'),
+        ('Queue wait avg', lambda r: f"{r['pool']['queue_wait_avg_ms']:.2f} ms" if r['pool'] else '-'),
+        ('Queue wait max', lambda r: f"{r['pool']['queue_wait_max_ms']:.2f} ms" if r['pool'] else '-'),
+    ]
+
+    print()
+    print(f"{'':<18}" + "".join(f"{r['mode']:>24}" for r in results))
+    print("─" * (18 + 24 * len(results)))
+    for label, fmt in rows:
+        print(f"{label:<18}" + "".join(f"{fmt(r):>24}" for r in results))
+    print()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Connection pool benchmark")
+    parser.add_argument('--clients', type=int, default=2000)
+    parser.add_argument('--probes', type=int, default=200)
+    parser.add_argument('--rate', type=float, default=20.0, help="probes per second")
+    parser.add_argument('--workers', type=int, default=POOL_WORKERS or 4)
+    parser.add_argument('--mode', choices=['thread', 'pool', 'both'], default='both')
+    parser.add_argument('--port', type=int, default=23456)
+    parser.add_argument('--tls', action='store_true', help="encrypt every connection")
+    parser.add_argument('--json', help="write results to this file")
+    args = parser.parse_args()
+
+    modes = {'thread': [0], 'pool': [args.workers], 'both': [0, args.workers]}[args.mode]
+    results = []
+    for i, workers in enumerate(modes):
+        label = f"{workers} pool workers" if workers else "thread-per-client"
+        print(f"⚡ Benchmarking {label} with {args.clients} clients"
+              + (" over TLS..." if args.tls else "..."))
+        results.append(run_mode(workers, args.clients, args.probes, args.rate,
+                                args.port + i, args.tls))
+
+    print_report(results)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,286 @@
+"""
+⚡ CYBER CHAT - TLS Overhead Benchmark
+Handshake and bulk-encryption cost of TLS against plaintext
+Students: Adir Buskila & Liav Weizman
+
+Three measurements:
+    handshake   connect-to-WELCOME latency and server CPU per connection for
+                plaintext, a full TLS handshake and a resumed TLS session
+    bulk        loopback throughput and CPU per MB, plain vs. encrypted
+    load        the pool benchmark (broadcast fan-out) with and without TLS
+                at our usual connection count
+
+Usage:
+    python -m benchmarks.tls_bench                    # everything
+    python -m benchmarks.tls_bench --only handshake --connects 500
+    python -m benchmarks.tls_bench --clients 1000 --json tls_results.json
+"""
+
+import argparse
+import json
+import multiprocessing as mp
+import os
+import socket
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tls
+from benchmarks.pool_bench import _serve, run_mode
+from config import DEFAULT_HOST, POOL_WORKERS
+from utils import format_bytes, percentile
+
+
+# ═══════════════════════════════════════════════════════════════
+# HANDSHAKE
+# ═══════════════════════════════════════════════════════════════
+
+def _start_server(port: int, workers: int, use_tls: bool):
+    """Headless server in a child process; returns (process, pipe)."""
+    ctx = mp.get_context('spawn')
+    pipe, child = ctx.Pipe()
+    proc = ctx.Process(target=_serve, args=(child, port, workers, use_tls), daemon=True)
+    proc.start()
+    if pipe.recv() != 'ready':
+        proc.join()
+        raise RuntimeError(f"Server failed to start on port {port}")
+    return proc, pipe
+
+
+def _stop_server(proc, pipe):
+    pipe.send('stop')
+    pipe.recv()
+    proc.join(timeout=5)
+
+
+def _server_stats(pipe) -> Dict[str, Any]:
+    pipe.send('stats')
+    return pipe.recv()
+
+
+def _time_connects(connect: Callable[[], socket.socket], count: int, pipe) -> Dict[str, Any]:
+    """Open `count` connections one after another, each up to the WELCOME prompt."""
+    before = _server_stats(pipe)
+    latencies: List[float] = []
+    for _ in range(count):
+        started = time.perf_counter()
+        sock = connect()
+        try:
+            sock.recv(256)  # WELCOME - the server is ready for this client
+            latencies.append(time.perf_counter() - started)
+        finally:
+            sock.close()
+    after = _server_stats(pipe)
+
+    latencies.sort()
+    return {
+        'connects': count,
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+        'server_cpu_us': (after['cpu'] - before['cpu']) / count * 1e6,
+        'resumed': after['tls_resumed'] - before['tls_resumed'],
+    }
+
+
+def bench_handshake(count: int, workers: int, port: int) -> Dict[str, Any]:
+    """Plain connect vs. full TLS handshake vs. resumed TLS session."""
+    address = (DEFAULT_HOST, port)
+    results = {}
+
+    proc, pipe = _start_server(port, workers, use_tls=False)
+    try:
+        results['plain'] = _time_connects(
+            lambda: socket.create_connection(address, timeout=5), count, pipe)
+    finally:
+        _stop_server(proc, pipe)
+
+    proc, pipe = _start_server(port + 1, workers, use_tls=True)
+    context = tls.client_context()
+    address = (DEFAULT_HOST, port + 1)
+    try:
+        def full() -> socket.socket:
+            sock = socket.create_connection(address, timeout=5)
+            return context.wrap_socket(sock, server_hostname=DEFAULT_HOST)
+
+        results['tls_full'] = _time_connects(full, count, pipe)
+
+        # Reconnect pattern: offer the ticket from the previous connection
+        ticket = {'session': None}
+
+        def resumed() -> socket.socket:
+            sock = socket.create_connection(address, timeout=5)
+            sock = context.wrap_socket(sock, server_hostname=DEFAULT_HOST,
+                                       session=ticket['session'])
+            return _KeepTicket(sock, ticket)
+
+        _KeepTicket(full(), ticket).recv(256)  # Prime the first ticket
+        results['tls_resumed'] = _time_connects(resumed, count, pipe)
+    finally:
+        _stop_server(proc, pipe)
+    return results
+
+
+class _KeepTicket:
+    """Socket wrapper that saves the TLS session after the first read."""
+
+    def __init__(self, sock, ticket: Dict[str, Any]):
+        self.sock = sock
+        self.ticket = ticket
+
+    def recv(self, size: int) -> bytes:
+        data = self.sock.recv(size)
+        self.ticket['session'] = self.sock.session  # TLS 1.3 tickets follow the handshake
+        return data
+
+    def close(self):
+        self.sock.close()
+
+
+# ═══════════════════════════════════════════════════════════════
+# BULK ENCRYPTION
+# ═══════════════════════════════════════════════════════════════
+
+def bench_bulk(megabytes: int, chunk: int, use_tls: bool) -> Dict[str, Any]:
+    """Push `megabytes` through loopback to a sink thread (both ends in this process)."""
+    listener = socket.create_server((DEFAULT_HOST, 0))
+    port = listener.getsockname()[1]
+    server_context = tls.server_context() if use_tls else None
+    received = {'bytes': 0}
+
+    def sink():
+        conn, _ = listener.accept()
+        if server_context:
+            conn = server_context.wrap_socket(conn, server_side=True)
+        with conn:
+            while True:
+                data = conn.recv(256 * 1024)
+                if not data:
+                    break
+                received['bytes'] += len(data)
+
+    thread = threading.Thread(target=sink, daemon=True)
+    thread.start()
+
+    sock = socket.create_connection((DEFAULT_HOST, port))
+    if use_tls:
+        sock = tls.client_context().wrap_socket(sock, server_hostname=DEFAULT_HOST)
+    payload = os.urandom(chunk)
+    total = megabytes * 1024 * 1024
+
+    cpu_start = time.process_time()
+    started = time.perf_counter()
+    sent = 0
+    while sent < total:
+        sock.sendall(payload)
+        sent += len(payload)
+    # Half-close and wait: close() with the unread session tickets would reset
+    sock.shutdown(socket.SHUT_WR)
+    thread.join()
+    elapsed = time.perf_counter() - started
+    cpu = time.process_time() - cpu_start
+    sock.close()
+    listener.close()
+
+    return {
+        'bytes': received['bytes'],
+        'mb_per_s': received['bytes'] / elapsed / 1e6,
+        'cpu_ms_per_mb': cpu / (received['bytes'] / 1e6) * 1000,
+    }
+
+
+# ═══════════════════════════════════════════════════════════════
+# REPORT
+# ═══════════════════════════════════════════════════════════════
+
+def print_handshake(results: Dict[str, Any]):
+    print()
+    print(f"{'Handshake':<18}{'plain':>16}{'TLS full':>16}{'TLS resumed':>16}")
+    print("─" * 66)
+    modes = ('plain', 'tls_full', 'tls_resumed')
+    for label, key, fmt in (
+        ('Connect p50', 'p50_ms', "{:.2f} ms"),
+        ('Connect p99', 'p99_ms', "{:.2f} ms"),
+        ('Server CPU/conn', 'server_cpu_us', "{:.0f} µs"),
+        ('Resumed', 'resumed', "{}"),
+    ):
+        print(f"{label:<18}" + "".join(f"{fmt.format(results[m][key]):>16}" for m in modes))
+
+
+def print_bulk(plain: Dict[str, Any], encrypted: Dict[str, Any]):
+    print()
+    print(f"{'Bulk':<18}{'plain':>16}{'TLS':>16}")
+    print("─" * 50)
+    print(f"{'Transferred':<18}{format_bytes(plain['bytes']):>16}"
+          f"{format_bytes(encrypted['bytes']):>16}")
+    print(f"{'Throughput':<18}{plain['mb_per_s']:>13.0f} MB/s{encrypted['mb_per_s']:>11.0f} MB/s")
+    print(f"{'CPU per MB':<18}{plain['cpu_ms_per_mb']:>13.2f} ms{encrypted['cpu_ms_per_mb']:>13.2f} ms")
+
+
+def print_load(results: List[Dict[str, Any]]):
+    print()
+    print(f"{'Load':<18}" + "".join(f"{r['mode']:>26}" for r in results))
+    print("─" * (18 + 26 * len(results)))
+    for label, fmt in (
+        ('Registered', lambda r: f"{r['registered']}/{r['clients']}"),
+        ('Ramp time', lambda r: f"{r['ramp_seconds']:.1f} s"),
+        ('CPU ramp', lambda r: f"{r['cpu_ramp_seconds']:.2f} s"),
+        ('CPU probes', lambda r: f"{r['cpu_probe_seconds']:.2f} s"),
+        ('RSS / client', lambda r: format_bytes(r['rss_per_client'])),
+        ('Delivery p50', lambda r: f"{r['delivery_p50_ms']:.2f} ms"),
+        ('Delivery p99', lambda r: f"{r['delivery_p99_ms']:.2f} ms"),
+        ('Fan-out p99', lambda r: f"{r['fanout_p99_ms']:.2f} ms"),
+    ):
+        print(f"{label:<18}" + "".join(f"{fmt(r):>26}" for r in results))
+    print()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="TLS overhead benchmark")
+    parser.add_argument('--only', choices=['handshake', 'bulk', 'load'])
+    parser.add_argument('--connects', type=int, default=300, help="handshakes per variant")
+    parser.add_argument('--megabytes', type=int, default=256, help="bulk transfer size")
+    parser.add_argument('--chunk', type=int, default=16 * 1024, help="bulk send size")
+    parser.add_argument('--clients', type=int, default=500, help="connections for the load run")
+    parser.add_argument('--probes', type=int, default=100)
+    parser.add_argument('--rate', type=float, default=20.0, help="probes per second")
+    parser.add_argument('--workers', type=int, default=POOL_WORKERS or 4)
+    parser.add_argument('--port', type=int, default=24456)
+    parser.add_argument('--json', help="write results to this file")
+    args = parser.parse_args()
+
+    tls.ensure_certificate()  # Not timed
+    results: Dict[str, Any] = {}
+
+    if args.only in (None, 'handshake'):
+        print(f"⚡ Timing {args.connects} connects per variant...")
+        results['handshake'] = bench_handshake(args.connects, args.workers, args.port)
+        print_handshake(results['handshake'])
+
+    if args.only in (None, 'bulk'):
+        print(f"\n⚡ Pushing {args.megabytes} MB through loopback...")
+        results['bulk'] = {
+            'plain': bench_bulk(args.megabytes, args.chunk, use_tls=False),
+            'tls': bench_bulk(args.megabytes, args.chunk, use_tls=True),
+        }
+        print_bulk(results['bulk']['plain'], results['bulk']['tls'])
+
+    if args.only in (None, 'load'):
+        print(f"\n⚡ Broadcast load with {args.clients} clients, plain then TLS...")
+        results['load'] = [
+            run_mode(args.workers, args.clients, args.probes, args.rate, args.port + 2),
+            run_mode(args.workers, args.clients, args.probes, args.rate, args.port + 3,
+                     use_tls=True),
+        ]
+        print_load(results['load'])
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+"""
+⚡ CYBER CHAT - Client UI Benchmark
+How the chat window copes with a fast stream of incoming messages
+Students: Adir Buskila & Liav Weizman
+
+A real CyberClient chat screen (no server) is fed MSG frames through
+dispatch() from a background thread, exactly as the receive thread
+would, at a fixed rate. Measured per rate:
+
+    handled     frames shown per second while feeding
+    catch-up    time after the last frame until the UI had shown it
+    insert      UI-thread time per message (process_message)
+    stall       how late a 10 ms timer on the UI thread fired - what a
+                user typing or scrolling at that moment would feel
+    backlog     most frames waiting for the UI at once
+
+Needs a display (on a headless box: xvfb-run python -m benchmarks.ui_bench).
+
+Usage:
+    python -m benchmarks.ui_bench
+    python -m benchmarks.ui_bench --rates 1000 5000 --seconds 5
+    python -m benchmarks.ui_bench --json ui_results.json
+
+Recorded results - per-batch layout (c8e13f8) against per-message
+update_idletasks() + yview_moveto() (its parent). Each rate ran in its
+own process, median of 3 runs:
+
+    python -m benchmarks.ui_bench --rates 200 --seconds 3    # then 1000, 3000, 5000
+
+              insert p50       insert p99       handled/s      catch-up        backlog max
+              before  after    before  after    before after   before  after   before  after
+    200/s     0.51    0.09 ms  22.47   0.63 ms    199    199   0.00    0.00 s     191      7
+    1000/s    0.44    0.06 ms  17.11   0.35 ms    744    998   0.57    0.00 s   1,302     25
+    3000/s    0.45    0.05 ms   1.46   0.22 ms    741  2,998   5.23    0.00 s   6,777    160
+    5000/s    0.43    0.05 ms   0.81   0.16 ms    777  4,972   8.92    0.00 s  12,667    325
+
+These were taken WITHOUT real rendering: single-CPU VM, Tk connected to
+a null X server that accepts the protocol and draws nothing. Text layout
+and font work in Tk still ran, but nothing reached a screen, so absolute
+costs are understated - expect higher numbers on a real desktop. Only the
+before/after ratio is meaningful.
+"""
+
+import argparse
+import gc
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import ChatHistory, percentile
+
+
+PROBE_MS = 10
+TEXT = "the quick brown fox jumps over the lazy dog :) " * 2
+
+
+# ═══════════════════════════════════════════════════════════════
+# MEASUREMENT
+# ═══════════════════════════════════════════════════════════════
+
+def _ms(values: List[float], pct: float) -> float:
+    return percentile(sorted(values), pct) * 1000 if values else 0.0
+
+
+def feed(client, rate: int, seconds: float, done: threading.Event):
+    """Receive-thread stand-in: frames arrive in small bursts, like socket reads."""
+    burst = max(1, rate // 200)
+    started = time.perf_counter()
+    sent = 0
+    while time.perf_counter() - started < seconds:
+        for _ in range(burst):
+            client.dispatch(f"MSG|[user{sent % 40}]: message {sent} {TEXT}")
+            sent += 1
+        delay = started + sent / rate - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+    client.fed = sent
+    done.set()
+
+
+def run_rate(rate: int, seconds: float) -> Dict[str, Any]:
+    from client import CyberClient
+
+    client = CyberClient()
+    client.username = 'bench'
+    client.history = ChatHistory('bench')
+    client.show_chat()
+    root = client.root
+
+    costs: List[float] = []
+    show = client.process_message
+
+    def timed(msg_type: str, content: str):
+        started = time.perf_counter()
+        show(msg_type, content)
+        costs.append(time.perf_counter() - started)
+    client.process_message = timed  # dispatch() queues self.process_message
+
+    stalls: List[float] = []
+    backlog = [0]
+    done = threading.Event()
+    state: Dict[str, float] = {}
+
+    def probe(expected: float):
+        now = time.perf_counter()
+        stalls.append(max(0.0, now - expected))
+        backlog[0] = max(backlog[0], len(client.ui_queue))
+        if done.is_set() and 'fed_at' not in state:
+            state['fed_at'] = now
+            state['handled_while_feeding'] = len(costs)
+        if done.is_set() and len(costs) >= client.fed:
+            state['caught_up'] = now
+            root.quit()
+            return
+        if now - state['started'] > seconds + 60:
+            root.quit()  # Never caught up
+            return
+        root.after(PROBE_MS, probe, now + PROBE_MS / 1000)
+
+    def start():
+        state['started'] = time.perf_counter()
+        threading.Thread(target=feed, args=(client, rate, seconds, done), daemon=True).start()
+        probe(time.perf_counter())
+
+    root.after(500, start)  # Let the window settle first
+    root.mainloop()
+    widgets = len(client.chat_view.frame.winfo_children())
+    client.on_close()
+
+    fed_at = state.get('fed_at', time.perf_counter())
+    return {
+        'rate': rate,
+        'fed': client.fed,
+        'handled_per_s': state.get('handled_while_feeding', len(costs))
+                         / max(1e-9, fed_at - state['started']),
+        'catch_up_s': state['caught_up'] - fed_at if 'caught_up' in state else None,
+        'insert_p50_ms': _ms(costs, 50),
+        'insert_p99_ms': _ms(costs, 99),
+        'stall_p50_ms': _ms(stalls, 50),
+        'stall_p99_ms': _ms(stalls, 99),
+        'stall_max_ms': max(stalls, default=0.0) * 1000,
+        'backlog_max': backlog[0],
+        'widgets': widgets,
+    }
+
+
+# ═══════════════════════════════════════════════════════════════
+# REPORT
+# ═══════════════════════════════════════════════════════════════
+
+def print_results(results: List[Dict[str, Any]]):
+    print()
+    print(f"{'':<18}" + "".join(f"{str(r['rate']) + '/s':>14}" for r in results))
+    print("─" * (18 + 14 * len(results)))
+    for label, fmt in (
+        ('Handled/s', lambda r: f"{r['handled_per_s']:,.0f}"),
+        ('Catch-up', lambda r: f"{r['catch_up_s']:.2f} s" if r['catch_up_s'] is not None
+                               else "never"),
+        ('Insert p50', lambda r: f"{r['insert_p50_ms']:.2f} ms"),
+        ('Insert p99', lambda r: f"{r['insert_p99_ms']:.2f} ms"),
+        ('UI stall p50', lambda r: f"{r['stall_p50_ms']:.1f} ms"),
+        ('UI stall p99', lambda r: f"{r['stall_p99_ms']:.1f} ms"),
+        ('UI stall max', lambda r: f"{r['stall_max_ms']:.1f} ms"),
+        ('Backlog max', lambda r: f"{r['backlog_max']:,}"),
+        ('Widgets', lambda r: f"{r['widgets']:,}"),
+    ):
+        print(f"{label:<18}" + "".join(f"{fmt(r):>14}" for r in results))
+    print()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Client UI under a fast message stream")
+    parser.add_argument('--rates', type=int, nargs='+', default=[200, 1000, 3000],
+                        help="incoming messages per second")
+    parser.add_argument('--seconds', type=float, default=3.0, help="feeding time per rate")
+    parser.add_argument('--json', help="write results to this file")
+    args = parser.parse_args()
+
+    output = os.path.abspath(args.json) if args.json else None
+    os.chdir(tempfile.mkdtemp(prefix='ui_bench_'))  # ChatHistory makes its folder here
+    results = []
+    for rate in args.rates:
+        print(f"⚡ {rate} messages/s for {args.seconds:g}s...")
+        try:
+            results.append(run_rate(rate, args.seconds))
+            gc.collect()  # That client's Tk objects go on this thread, not the next feeder's
+        except Exception as e:  # tkinter.TclError without a display
+            print(f"❌ Cannot open the client window: {e}")
+            return 1
+    print_results(results)
+
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,206 @@
+"""
+⚡ CYBER CHAT - Unix Socket Benchmark
+Same-host clients over an AF_UNIX socket vs. TCP loopback
+Students: Adir Buskila & Liav Weizman
+
+One headless server listens on both DEFAULT_HOST:port and a Unix socket
+path; every measurement runs once per transport against it:
+
+    connect     connect-to-WELCOME latency and server CPU per connection
+    ping        sequential PING → PONG round trips on a logged-in client
+    messages    pipelined private messages: throughput, delivery latency
+                and server CPU per message
+    bulk        one file relayed between two clients (FILE_* frames)
+
+Usage:
+    python -m benchmarks.unix_bench
+    python -m benchmarks.unix_bench --messages 50000 --megabytes 128
+    python -m benchmarks.unix_bench --workers 0 --json unix_results.json
+"""
+
+import argparse
+import json
+import os
+import shutil
+import socket
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.channel_bench import BenchUser, _summary
+from benchmarks.tls_bench import _start_server, _stop_server, _server_stats, _time_connects
+from config import DEFAULT_HOST, POOL_WORKERS
+from utils import format_address, open_connection
+
+
+UNIX_PATH = os.path.join(tempfile.gettempdir(), "cyber_chat_bench_{port}.sock")
+
+
+# ═══════════════════════════════════════════════════════════════
+# MEASUREMENTS
+# ═══════════════════════════════════════════════════════════════
+
+def bench_ping(address: Tuple[str, Optional[int]], tag: str, count: int) -> Dict[str, Any]:
+    """One PING in flight at a time."""
+    sock = open_connection(*address, timeout=5)
+    try:
+        sock.sendall(f"{tag}pinger\n".encode())
+        buffer = b''
+        while b"USERS|" not in buffer:  # Logged in
+            buffer += sock.recv(65536)
+
+        latencies: List[float] = []
+        for _ in range(count):
+            started = time.perf_counter()
+            sock.sendall(b"PING\n")
+            buffer = b''
+            while b"PONG|" not in buffer:
+                buffer += sock.recv(65536)
+            latencies.append(time.perf_counter() - started)
+    finally:
+        sock.close()
+    return _summary(latencies)
+
+
+def bench_messages(address: Tuple[str, Optional[int]], tag: str, count: int,
+                   pipe) -> Dict[str, Any]:
+    """`count` private messages sent back to back; timed until the last arrives."""
+    sender = BenchUser(address, f"{tag}sender")
+    receiver = BenchUser(address, f"{tag}receiver")
+    try:
+        for user in (sender, receiver):
+            if not user.registered.wait(10):
+                raise RuntimeError(f"{user.name} was not registered")
+        time.sleep(0.2)  # Join notices out of the way
+
+        before = _server_stats(pipe)
+        started = time.perf_counter()
+        for _ in range(count):
+            sender.send(f"TO:{receiver.name}:t={time.perf_counter():.6f}")
+        deadline = started + 120
+        while len(receiver.chat_latencies) < count and time.perf_counter() < deadline:
+            time.sleep(0.001)
+        elapsed = time.perf_counter() - started
+        after = _server_stats(pipe)
+    finally:
+        sender.close()
+        receiver.close()
+
+    delivered = len(receiver.chat_latencies)
+    result = _summary(receiver.chat_latencies)
+    result.update({
+        'delivered': delivered,
+        'per_second': delivered / elapsed,
+        'server_cpu_us': (after['cpu'] - before['cpu']) / max(1, delivered) * 1e6,
+    })
+    return result
+
+
+def bench_bulk(address: Tuple[str, Optional[int]], tag: str, megabytes: int) -> Dict[str, Any]:
+    """Relay one file from an uploader to a downloader through the server."""
+    workdir = tempfile.mkdtemp(prefix='unix_bench_')
+    source = os.path.join(workdir, 'payload.bin')
+    with open(source, 'wb') as f:
+        f.write(os.urandom(megabytes * 1024 * 1024))
+
+    uploader = BenchUser(address, f"{tag}uploader")
+    downloader = BenchUser(address, f"{tag}downloader")
+    downloader.download_dir = workdir
+    try:
+        for user in (uploader, downloader):
+            if not user.registered.wait(10):
+                raise RuntimeError(f"{user.name} was not registered")
+        started = time.perf_counter()
+        transfer = uploader.files.offer(downloader.name, source)
+        while not transfer.finished and time.perf_counter() - started < 300:
+            time.sleep(0.005)
+        elapsed = time.perf_counter() - started
+    finally:
+        uploader.close()
+        downloader.close()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return {
+        'state': transfer.state,
+        'bytes': downloader.received,
+        'mb_per_s': downloader.received / elapsed / 1e6,
+    }
+
+
+def run_transport(name: str, address: Tuple[str, Optional[int]], pipe,
+                  args) -> Dict[str, Any]:
+    print(f"⚡ {name}: {format_address(address)}")
+    return {
+        'transport': name,
+        'connect': _time_connects(lambda: open_connection(*address, timeout=5),
+                                  args.connects, pipe),
+        'ping': bench_ping(address, name, args.pings),
+        'messages': bench_messages(address, name, args.messages, pipe),
+        'bulk': bench_bulk(address, name, args.megabytes),
+    }
+
+
+# ═══════════════════════════════════════════════════════════════
+# REPORT
+# ═══════════════════════════════════════════════════════════════
+
+def print_results(results: List[Dict[str, Any]]):
+    print()
+    print(f"{'':<20}" + "".join(f"{r['transport']:>16}" for r in results))
+    print("─" * (20 + 16 * len(results)))
+    for label, fmt in (
+        ('Connect p50', lambda r: f"{r['connect']['p50_ms']:.3f} ms"),
+        ('Connect p99', lambda r: f"{r['connect']['p99_ms']:.3f} ms"),
+        ('Server CPU/conn', lambda r: f"{r['connect']['server_cpu_us']:.0f} µs"),
+        ('Ping p50', lambda r: f"{r['ping']['p50_ms'] * 1000:.0f} µs"),
+        ('Ping p99', lambda r: f"{r['ping']['p99_ms'] * 1000:.0f} µs"),
+        ('Messages/s', lambda r: f"{r['messages']['per_second']:,.0f}"),
+        ('Flood delivery p50', lambda r: f"{r['messages']['p50_ms']:.1f} ms"),
+        ('Flood delivery p99', lambda r: f"{r['messages']['p99_ms']:.1f} ms"),
+        ('Server CPU/msg', lambda r: f"{r['messages']['server_cpu_us']:.1f} µs"),
+        ('Bulk rate', lambda r: f"{r['bulk']['mb_per_s']:.1f} MB/s"),
+    ):
+        print(f"{label:<20}" + "".join(f"{fmt(r):>16}" for r in results))
+    print()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Unix socket vs. TCP loopback")
+    parser.add_argument('--connects', type=int, default=500, help="connections per transport")
+    parser.add_argument('--pings', type=int, default=2000, help="round trips per transport")
+    parser.add_argument('--messages', type=int, default=20000, help="pipelined messages")
+    parser.add_argument('--megabytes', type=int, default=64, help="file size for the bulk run")
+    parser.add_argument('--workers', type=int, default=POOL_WORKERS)
+    parser.add_argument('--port', type=int, default=24476)
+    parser.add_argument('--json', help="write results to this file")
+    args = parser.parse_args()
+
+    if not hasattr(socket, 'AF_UNIX'):
+        print("❌ Unix sockets are not available on this platform")
+        return 1
+
+    # The spawned server reads its settings from the environment layer
+    path = UNIX_PATH.format(port=args.port)
+    os.environ['CYBER_CHAT_UNIX_SOCKET_PATH'] = path
+    proc, pipe = _start_server(args.port, args.workers, False)
+    try:
+        results = [
+            run_transport('tcp', (DEFAULT_HOST, args.port), pipe, args),
+            run_transport('unix', (path, None), pipe, args),
+        ]
+    finally:
+        _stop_server(proc, pipe)
+    print_results(results)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,231 @@
+"""
+⚡ CYBER CHAT - Channels Module
+Logical channels with priority scheduling on one connection
+Students: Adir Buskila & Liav Weizman
+
+Every frame belongs to a channel, decided by its opcode:
+
+    control     OK, ERROR, SESSION, PONG, KICK, file handshakes...   always first
+    chat        MSG, SENT, SYSTEM (and SEQ| wrapped ones), replays, MC| repairs
+    presence    USERS, PRESENCE, TYPING
+    bulk        FILE_CHUNK
+
+Frames are whole lines, so channels interleave at frame boundaries with
+no change to the wire format. Control frames go out before anything
+else; chat, presence and bulk then share the socket by deficit round
+robin in CHANNEL_WEIGHTS proportion, so bulk keeps moving but a chat
+line never queues behind more than one bulk frame in the outbox.
+
+The kernel send buffer is the other place a chat line can wait. Bulk is
+only written while less than SOCKET_NOTSENT_LOWAT bytes are still
+unsent (Linux SIOCOUTNSQ). TCP_NOTSENT_LOWAT on the socket makes it
+report writable exactly when that is true again.
+
+A blocking socket with TCP_NOTSENT_LOWAT also blocks every write while
+that much is unsent - chat lines included, stalling the thread that
+sends them. PrioritySender therefore only writes a bulk frame that
+still fits under the mark, so the kernel always has room for the next
+interactive one.
+"""
+
+import socket
+import sys
+import threading
+import time
+from collections import deque
+from typing import Deque, Iterator, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: no unsent-byte count, priorities stay in user space
+    fcntl = None
+
+from config import CHANNEL_PRIORITIES, CHANNEL_WEIGHTS, CHANNEL_QUANTUM, SOCKET_NOTSENT_LOWAT
+
+
+CONTROL, CHAT, PRESENCE, BULK = range(4)
+CHANNEL_NAMES = ('control', 'chat', 'presence', 'bulk')
+
+CHAT_PREFIXES = (b"MSG|", b"SENT|", b"SYSTEM|", b"SEQ|", b"MC|")
+PRESENCE_PREFIXES = (b"USERS|", b"PRESENCE|", b"TYPING|")
+BULK_PREFIXES = (b"FILE_CHUNK",)    # FILE_CHUNK| from the server, FILE_CHUNK: from clients
+
+SIOCOUTNSQ = 0x894B                 # Linux: bytes not yet sent by TCP
+BULK_POLL = 0.002                   # Seconds between unsent-byte checks while bulk waits
+BULK_HOLD = 1.0                     # Longest a bulk frame waits for room before going anyway
+
+
+def channel_of(frame: bytes) -> int:
+    """Channel of a frame (a batch of frames takes its first one's)."""
+    if frame.startswith(CHAT_PREFIXES):
+        return CHAT
+    if frame.startswith(PRESENCE_PREFIXES):
+        return PRESENCE
+    if frame.startswith(BULK_PREFIXES):
+        return BULK
+    return CONTROL
+
+
+def lowat_enabled(sock) -> bool:
+    """TCP_NOTSENT_LOWAT is set, so writability waits for the unsent backlog."""
+    try:
+        return sock.getsockopt(socket.IPPROTO_TCP, socket.TCP_NOTSENT_LOWAT) > 0
+    except (AttributeError, OSError):
+        return False
+
+
+def unsent_bytes(sock) -> int:
+    """Bytes the kernel holds for `sock` but has not sent (0 where unknown)."""
+    if fcntl is None or not sys.platform.startswith('linux'):
+        return 0
+    try:
+        return int.from_bytes(fcntl.ioctl(sock.fileno(), SIOCOUTNSQ, b'\0' * 4),
+                              sys.byteorder, signed=True)
+    except (OSError, ValueError):
+        return 0
+
+
+def bulk_window_open(sock) -> bool:
+    """True while the kernel is not already sitting on a bulk backlog."""
+    return unsent_bytes(sock) < SOCKET_NOTSENT_LOWAT
+
+
+# ═══════════════════════════════════════════════════════════════
+# OUTBOX (POOL MODE)
+# ═══════════════════════════════════════════════════════════════
+
+class Outbox:
+    """
+    Per-channel frame queues behind one socket. Used like the deque it
+    replaces - append(), clear(), truthiness, iteration in wire order -
+    plus take(), which picks the next batch to write.
+    """
+
+    def __init__(self, weights=CHANNEL_WEIGHTS, quantum: int = CHANNEL_QUANTUM,
+                 prioritized: bool = CHANNEL_PRIORITIES):
+        self.queues: List[Deque[bytes]] = [deque() for _ in CHANNEL_NAMES]
+        self.quanta = [0] + [int(w * quantum) for w in weights]
+        self.deficit = [0] * len(CHANNEL_NAMES)
+        self.head = b''                     # Taken but not fully written - goes first
+        self.prioritized = prioritized      # False: one FIFO queue, as before channels
+
+    def __bool__(self) -> bool:
+        return bool(self.head) or any(self.queues)
+
+    def __len__(self) -> int:
+        return (1 if self.head else 0) + sum(len(q) for q in self.queues)
+
+    def __iter__(self) -> Iterator[bytes]:
+        if self.head:
+            yield self.head
+        for queue in self.queues:
+            yield from queue
+
+    def append(self, frame: bytes, channel: Optional[int] = None):
+        if not self.prioritized:
+            channel = CONTROL
+        elif channel is None:
+            channel = channel_of(frame)
+        self.queues[channel].append(frame)
+
+    def clear(self):
+        self.head = b''
+        for queue in self.queues:
+            queue.clear()
+        self.deficit = [0] * len(CHANNEL_NAMES)
+
+    def interactive(self) -> bool:
+        """Anything but bulk queued (i.e. the socket itself is backed up)."""
+        return bool(self.head) or any(self.queues[c] for c in (CONTROL, CHAT, PRESENCE))
+
+    def take(self, limit: int, bulk_ok: bool = True) -> bytes:
+        """
+        Up to ~`limit` bytes in send order: an unfinished batch, then every
+        control frame, then chat/presence/bulk by weighted round robin.
+        Returns b'' when only bulk is queued and bulk_ok is False.
+        """
+        batch = []
+        size = 0
+        if self.head:
+            batch.append(self.head)
+            size = len(self.head)
+            self.head = b''
+
+        queue = self.queues[CONTROL]
+        while queue and size < limit:
+            frame = queue.popleft()
+            batch.append(frame)
+            size += len(frame)
+
+        channels = (CHAT, PRESENCE, BULK) if bulk_ok else (CHAT, PRESENCE)
+        while size < limit:
+            active = [c for c in channels if self.queues[c]]
+            if not active:
+                break
+            for channel in active:
+                queue = self.queues[channel]
+                self.deficit[channel] += self.quanta[channel]
+                while queue and len(queue[0]) <= self.deficit[channel] and size < limit:
+                    frame = queue.popleft()
+                    self.deficit[channel] -= len(frame)
+                    batch.append(frame)
+                    size += len(frame)
+                if not queue:
+                    self.deficit[channel] = 0  # No banking credit while idle
+        return b''.join(batch)
+
+    def put_back(self, data: bytes):
+        """Unwritten rest of the last take() - it leaves before anything else."""
+        self.head = data
+
+
+# ═══════════════════════════════════════════════════════════════
+# PRIORITY SENDER (BLOCKING SOCKETS)
+# ═══════════════════════════════════════════════════════════════
+
+class PrioritySender:
+    """
+    sendall() for a blocking socket shared by several threads: one frame
+    at a time, interactive frames ahead of any bulk frame that is waiting,
+    and bulk held back while the kernel still has a backlog to send.
+    """
+
+    def __init__(self, sock, prioritized: bool = CHANNEL_PRIORITIES):
+        self.prioritized = prioritized
+        self.gated = prioritized and lowat_enabled(sock)  # Bulk waits for the kernel backlog
+        self.cond = threading.Condition()
+        self.busy = False
+        self.waiting = 0                    # Interactive frames queued for the socket
+
+    def send(self, sock, data: bytes, bulk: bool = False):
+        bulk = bulk and self.prioritized
+        with self.cond:
+            if bulk:
+                deadline = time.monotonic() + BULK_HOLD
+                while self.busy or self.waiting or not self._has_room(sock, len(data), deadline):
+                    self.cond.wait(BULK_POLL if self.gated else None)
+            else:
+                self.waiting += 1
+                while self.busy:
+                    self.cond.wait()
+                self.waiting -= 1
+            self.busy = True
+        try:
+            sock.sendall(data)
+        finally:
+            with self.cond:
+                self.busy = False
+                self.cond.notify_all()
+
+    def backlogged(self) -> bool:
+        """A write is still in progress, or frames are waiting for the socket."""
+        return self.busy or self.waiting > 0
+
+    def _has_room(self, sock, size: int, deadline: float) -> bool:
+        """
+        A bulk frame of `size` bytes leaves the kernel below its low-water
+        mark once written, so the next interactive write does not block.
+        """
+        if not self.gated or time.monotonic() >= deadline:
+            return True
+        return unsent_bytes(sock) < max(SOCKET_NOTSENT_LOWAT - size, 1)
@@ -4,28 +4,40 @@ Enhanced Chat Client with Modern Features
 Students: Adir Buskila & Liav Weizman
 """
 
+import os
 import socket
+import ssl
 import threading
 import time
 import tkinter as tk
+from collections import deque
 from tkinter import messagebox, filedialog
 from datetime import datetime
-from typing import Optional
+from typing import Callable, Deque, Optional, Tuple
 
 from config import (
     DEFAULT_HOST, DEFAULT_PORT, BUFFER_SIZE, PING_INTERVAL,
-    COLORS, FONTS, STATUS_ONLINE, STATUS_AWAY, STATUS_BUSY
+    COLORS, FONTS, STATUS_ONLINE, STATUS_AWAY, STATUS_BUSY, RESUME_RETRY_DELAYS,
+    RELIABLE_DELIVERY, TLS_ENABLED, SOCKET_NODELAY, TYPING_REFRESH,
+    MULTICAST_ENABLED, MULTICAST_GROUP, MULTICAST_PORT, MULTICAST_INTERFACE,
+    UI_TICK_MS, UI_FRAMES_PER_TICK, UI_TICK_BUDGET_MS,
+    CHAT_RENDER_WINDOW, CHAT_PAGE_SIZE, CHAT_SCROLLBACK
 )
 from utils import (
     ChatHistory, ChatLogger, parse_address, format_timestamp,
     validate_username, validate_message, replace_emoji_shortcuts,
-    play_notification_sound, parse_command
+    play_notification_sound, parse_command, parse_user_list, apply_socket_options,
+    format_bytes, open_connection
 )
 from ui_components import (
     CyberButton, CyberEntry, CyberLabel, StatusIndicator,
-    PingIndicator, MessageBubble, TypingIndicator, UserListItem,
-    CyberDialog, EmojiPicker
+    PingIndicator, ChatView, TypingIndicator, RosterView,
+    CyberDialog, EmojiPicker, TransferPanel
 )
+from transfer import TransferManager, FILE_FRAMES, default_download_path
+from channels import PrioritySender
+from multicast import MulticastReceiver
+import tls
 
 
 # ═══════════════════════════════════════════════════════════════
@@ -35,7 +47,7 @@ from ui_components import (
 class CyberClient:
     """Enhanced Chat Client with Modern UI and Features."""
     
-    def __init__(self):
+    def __init__(self, use_tls: bool = TLS_ENABLED):
         self.root = tk.Tk()
         self.root.title("💬 CYBER CHAT")
         self.root.geometry("900x650")
@@ -48,21 +60,49 @@ class CyberClient:
         self.username: Optional[str] = None
         self.running = True
         self.my_status = STATUS_ONLINE
+        self.server_address = (DEFAULT_HOST, DEFAULT_PORT)
+        self.recv_buffer = b''
+        # File chunks are sent from their own threads; chat and control go first
+        self.sender: Optional[PrioritySender] = None
+        
+        # Session resume: token from SESSION| and the sequenced frames counted so far
+        self.resume_token: Optional[str] = None
+        self.session_seq = 0
+        self.acked_seq = 0  # Reliable mode: highest sequence number acknowledged
+        
+        # Broadcasts from the UDP group once the server confirms (MULTICAST|)
+        self.multicast: Optional[MulticastReceiver] = None
+        
+        # TLS: the session from the last handshake lets a reconnect resume it
+        self.use_tls = use_tls
+        self.tls_context: Optional[ssl.SSLContext] = None
+        self.tls_session: Optional[ssl.SSLSession] = None
         
         # Features
         self.history: Optional[ChatHistory] = None
         self.logger = ChatLogger('CyberClient')
         self.typing_timer = None
+        self.ping_timer = None
+        self.ui_timer = None
         self.is_typing = False
+        self.typing_reported = 0.0  # When TYPING was last sent
         self.last_ping_time = 0
         self.current_ping = 0
         
         # Online users with statuses
         self.online_users = {}  # {username: status}
         
+        # File transfers (FILE_* frames are handled on the receive thread)
+        self.transfers = TransferManager(self.send, self.on_transfer_event)
+        
+        # Work for the UI thread from the receive and worker threads, in
+        # arrival order; drained in batches once per tick (see drain_ui)
+        self.ui_queue: Deque[Tuple[Callable, tuple]] = deque()
+        
         # Start with login screen
         self.show_login()
         self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.ui_timer = self.root.after(UI_TICK_MS, self.drain_ui)
     
     # ─────────────────────────────────────────────────────────────
     # LOGIN SCREEN
@@ -70,6 +110,8 @@ class CyberClient:
     
     def show_login(self):
         """Display the login screen."""
+        self.ui_queue.clear()  # Updates for the chat screen that is going away
+        
         # Clear any existing widgets
         for widget in self.root.winfo_children():
             widget.destroy()
@@ -98,7 +140,7 @@ class CyberClient:
         tk.Frame(card, bg=COLORS['accent_cyan'], height=2).pack(fill='x', pady=15)
         
         # Server input
-        tk.Label(card, text="SERVER ADDRESS",
+        tk.Label(card, text="SERVER ADDRESS  (host:port or unix:path)",
                 font=FONTS['small_bold'], fg=COLORS['text_dim'],
                 bg=COLORS['bg_card']).pack(anchor='w', pady=(15, 5))
         
@@ -122,6 +164,15 @@ class CyberClient:
         self.user_entry.bind('<Return>', lambda e: self.connect())
         self.user_entry.focus()
         
+        # Encryption toggle
+        self.tls_var = tk.BooleanVar(value=self.use_tls)
+        tk.Checkbutton(card, text="🔒 Encrypt (TLS)", variable=self.tls_var,
+                       font=FONTS['small_bold'], fg=COLORS['text_secondary'],
+                       bg=COLORS['bg_card'], selectcolor=COLORS['bg_light'],
+                       activebackground=COLORS['bg_card'],
+                       activeforeground=COLORS['accent_cyan'],
+                       relief='flat', highlightthickness=0).pack(anchor='w', pady=(15, 0))
+        
         # Connect button
         self.connect_btn = CyberButton(card, "⚡ CONNECT ⚡",
                                        command=self.connect, color='accent_cyan')
@@ -223,28 +274,9 @@ class CyberClient:
                                           bg=COLORS['bg_card'])
         self.users_count_label.pack(side='left', padx=5)
         
-        # Users list frame (scrollable)
-        users_container = tk.Frame(left, bg=COLORS['bg_card'])
-        users_container.pack(fill='both', expand=True, padx=5)
-        
-        self.users_canvas = tk.Canvas(users_container, bg=COLORS['bg_card'],
-                                      highlightthickness=0)
-        self.users_scrollbar = tk.Scrollbar(users_container, orient='vertical',
-                                            command=self.users_canvas.yview)
-        self.users_frame = tk.Frame(self.users_canvas, bg=COLORS['bg_card'])
-        
-        self.users_canvas.configure(yscrollcommand=self.users_scrollbar.set)
-        self.users_scrollbar.pack(side='right', fill='y')
-        self.users_canvas.pack(side='left', fill='both', expand=True)
-        
-        self.users_window = self.users_canvas.create_window(
-            (0, 0), window=self.users_frame, anchor='nw'
-        )
-        
-        self.users_frame.bind('<Configure>', 
-            lambda e: self.users_canvas.configure(scrollregion=self.users_canvas.bbox('all')))
-        self.users_canvas.bind('<Configure>', 
-            lambda e: self.users_canvas.itemconfig(self.users_window, width=e.width))
+        # Users list (keyed, only visible rows rendered)
+        self.roster = RosterView(left, me=self.username, on_click=self.open_dm_dialog)
+        self.roster.pack(fill='both', expand=True, padx=5)
         
         # Buttons at bottom
         btn_frame = tk.Frame(left, bg=COLORS['bg_card'])
@@ -268,28 +300,16 @@ class CyberClient:
         messages_container = tk.Frame(right, bg=COLORS['bg_medium'])
         messages_container.pack(fill='both', expand=True)
         
-        self.chat_canvas = tk.Canvas(messages_container, bg=COLORS['bg_medium'],
-                                     highlightthickness=0)
-        self.chat_scrollbar = tk.Scrollbar(messages_container, orient='vertical',
-                                           command=self.chat_canvas.yview)
-        self.messages_frame = tk.Frame(self.chat_canvas, bg=COLORS['bg_medium'])
-        
-        self.chat_canvas.configure(yscrollcommand=self.chat_scrollbar.set)
-        self.chat_scrollbar.pack(side='right', fill='y')
-        self.chat_canvas.pack(side='left', fill='both', expand=True)
-        
-        self.chat_window = self.chat_canvas.create_window(
-            (0, 0), window=self.messages_frame, anchor='nw'
-        )
-        
-        self.messages_frame.bind('<Configure>',
-            lambda e: self.chat_canvas.configure(scrollregion=self.chat_canvas.bbox('all')))
-        self.chat_canvas.bind('<Configure>',
-            lambda e: self.chat_canvas.itemconfig(self.chat_window, width=e.width))
+        self.chat_view = ChatView(messages_container, window=CHAT_RENDER_WINDOW,
+                                  page=CHAT_PAGE_SIZE, scrollback=CHAT_SCROLLBACK)
+        self.chat_view.pack(fill='both', expand=True)
         
         # Typing indicator
         self.typing_indicator = TypingIndicator(right)
         
+        # File transfer progress
+        self.transfer_panel = TransferPanel(right, on_cancel=self.transfers.cancel)
+        
         # Input area
         input_container = tk.Frame(right, bg=COLORS['bg_light'], height=60)
         input_container.pack(fill='x', side='bottom')
@@ -353,13 +373,19 @@ class CyberClient:
         
         try:
             # Create socket and connect
-            self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            self.socket.settimeout(5)  # 5 second timeout for connection
-            self.socket.connect((host, port))
+            if self.tls_var.get() != self.use_tls:
+                self.use_tls = self.tls_var.get()
+                self.tls_session = None
+            self.socket = self.open_socket(host, port)
+            self.sender = PrioritySender(self.socket)
             self.socket.settimeout(None)  # Remove timeout for normal operation
             
             self.connected = True
             self.username = username
+            self.server_address = (host, port)
+            self.recv_buffer = b''
+            self.resume_token = None
+            self.session_seq = self.acked_seq = 0
             
             # Initialize chat history
             self.history = ChatHistory(username)
@@ -369,7 +395,11 @@ class CyberClient:
             
             # Send username (server expects it after welcome)
             time.sleep(0.2)
-            self.socket.send(username.encode())
+            self.socket.send(f"{username}\n".encode())
+            if RELIABLE_DELIVERY:
+                self.socket.send(b"RELIABLE\n")
+            if MULTICAST_ENABLED and port is not None and not self.use_tls:
+                self.join_multicast()
             time.sleep(0.2)
             
             # Show chat interface
@@ -389,6 +419,13 @@ class CyberClient:
             )
             self.connect_btn.configure(state='normal')
             
+        except ssl.SSLError as e:
+            self.status_label.configure(
+                text=f"❌ TLS error: {e.reason or e}",
+                fg=COLORS['accent_red']
+            )
+            self.connect_btn.configure(state='normal')
+            
         except Exception as e:
             self.status_label.configure(
                 text=f"❌ Error: {str(e)}",
@@ -396,8 +433,30 @@ class CyberClient:
             )
             self.connect_btn.configure(state='normal')
     
+    def open_socket(self, host: str, port: Optional[int]) -> socket.socket:
+        """
+        TCP connection to the server (5s timeout), wrapped in TLS if enabled.
+        port None: the Unix socket at path `host` (same host, never TLS).
+        """
+        sock = open_connection(host, port, timeout=5)
+        apply_socket_options(sock, nodelay=SOCKET_NODELAY or self.use_tls)
+        if not self.use_tls or port is None:
+            return sock
+        try:
+            if self.tls_context is None:
+                self.tls_context = tls.client_context()
+            # Offering the previous session lets the server skip the full handshake
+            return self.tls_context.wrap_socket(sock, server_hostname=host,
+                                                session=self.tls_session)
+        except Exception:
+            sock.close()
+            raise
+    
     def disconnect(self):
         """Disconnect from the server."""
+        self.resume_token = None  # Leaving on purpose - nothing to resume
+        self.transfers.cancel_all()
+        self.leave_multicast()
         if self.connected:
             try:
                 self.send("QUIT")
@@ -418,13 +477,16 @@ class CyberClient:
     # MESSAGING
     # ─────────────────────────────────────────────────────────────
     
-    def send(self, message: str):
+    def send(self, message: str) -> bool:
         """Send a raw message to the server."""
         if self.connected and message:
             try:
-                self.socket.send(message.encode())
+                self.sender.send(self.socket, f"{message}\n".encode(),
+                                 bulk=message.startswith("FILE_CHUNK:"))
+                return True
             except Exception:
                 pass
+        return False
     
     def send_chat(self):
         """Send a chat message (from input field)."""
@@ -461,6 +523,7 @@ class CyberClient:
             self.add_system("📖 Available commands:")
             self.add_system("  /status <online|away|busy> - Change your status")
             self.add_system("  /dm <user> <message> - Send private message")
+            self.add_system("  /send <user> - Send a file")
             self.add_system("  /clear - Clear chat window")
             self.add_system("  /save - Save chat history")
             self.add_system("  /ping - Check connection latency")
@@ -482,6 +545,12 @@ class CyberClient:
             else:
                 self.add_system("❌ Usage: /dm <username> <message>")
                 
+        elif command == 'send':
+            if args.strip():
+                self.send_file(args.strip())
+            else:
+                self.add_system("❌ Usage: /send <username>")
+                
         elif command == 'clear':
             self.clear_chat()
             
@@ -500,26 +569,164 @@ class CyberClient:
     
     def receive_loop(self):
         """Receive messages from the server."""
+        sock = self.socket
+        keep_session = self.use_tls
         while self.connected and self.running:
             try:
-                data = self.socket.recv(BUFFER_SIZE)
+                data = sock.recv(BUFFER_SIZE)
                 if not data:
                     break
+                if keep_session:
+                    # TLS 1.3 tickets arrive after the handshake, with the first data
+                    self.tls_session = sock.session
+                    keep_session = False
                 
-                # Handle multiple messages in one packet
-                messages = data.decode().strip().split('\n')
-                for msg in messages:
-                    if '|' in msg:
-                        msg_type, content = msg.split('|', 1)
-                        self.root.after(0, lambda t=msg_type, c=content: 
-                            self.process_message(t, c))
+                # Handle multiple messages per packet and messages split across packets
+                for msg in self.split_frames(data):
+                    self.dispatch(msg)
+                self.send_ack()
                             
             except Exception as e:
                 self.logger.error(f"Receive error: {e}")
                 break
         
-        # Connection lost
-        self.root.after(0, self.on_disconnect)
+        # Connection lost (unless a reconnect already replaced this socket)
+        if sock is self.socket:
+            self.post(self.on_disconnect)  # After the frames already queued
+    
+    def split_frames(self, data: bytes) -> list:
+        """Split received bytes into complete frames, keeping any partial one."""
+        self.recv_buffer += data
+        if self.recv_buffer.startswith(b"WELCOME|"):
+            # The username prompt is the only frame without a newline
+            end = self.recv_buffer.find(b": ")
+            if end < 0:
+                return []
+            self.recv_buffer = self.recv_buffer[end + 2:]
+        *frames, self.recv_buffer = self.recv_buffer.split(b'\n')
+        return [frame.decode(errors='replace') for frame in frames]
+    
+    def dispatch(self, msg: str):
+        """Hand one complete frame to the UI thread."""
+        if msg.startswith(("MC|", "MCLOST|")):
+            if self.multicast:
+                self.multicast.accept(msg)  # Group frames repaired over TCP
+            return
+        if msg.startswith("SEQ|"):
+            # Reliable mode: SEQ|n|<frame> - skip anything we already have
+            parts = msg.split('|', 2)
+            if len(parts) != 3 or not parts[1].isdigit():
+                return  # Malformed - dropped rather than ending the receive loop
+            number, msg = int(parts[1]), parts[2]
+            if number <= self.session_seq:
+                return
+            self.session_seq = number - 1  # on_frame() counts the frame itself
+        if '|' in msg:
+            msg_type, content = msg.split('|', 1)
+            if msg_type in FILE_FRAMES:
+                self.transfers.handle(msg_type, content)
+                return
+            if msg_type == "MULTICAST":
+                seq = content.rsplit(":", 1)[-1]
+                if self.multicast and seq.isdigit():
+                    self.multicast.start(int(seq))
+                return
+            self.on_frame(msg_type, content)
+            self.post(self.process_message, msg_type, content)
+    
+    def on_frame(self, msg_type: str, content: str):
+        """Session bookkeeping, done in arrival order on the receive thread."""
+        if msg_type in ("MSG", "SENT", "SYSTEM"):
+            self.session_seq += 1
+        elif msg_type == "SESSION":
+            token, _, seq = content.partition(":")
+            seq = int(seq) if seq.isdigit() else 0
+            if self.resume_token == token and seq > self.session_seq:
+                missed = seq - self.session_seq
+                self.post(self.add_system,
+                          f"⚠️ {missed} message(s) were missed while reconnecting")
+            self.resume_token = token
+            self.session_seq = seq
+    
+    def send_ack(self):
+        """Acknowledge everything received so far (one ACK per read, not per frame)."""
+        if RELIABLE_DELIVERY and self.resume_token and self.session_seq > self.acked_seq:
+            self.acked_seq = self.session_seq
+            self.send(f"ACK:{self.session_seq}")
+    
+    # ─────────────────────────────────────────────────────────────
+    # MULTICAST
+    # ─────────────────────────────────────────────────────────────
+    
+    def join_multicast(self):
+        """Join the broadcast group, then ask the server to use it for us."""
+        self.leave_multicast()
+        receiver = MulticastReceiver(self.username, self.on_group_frame,
+                                     self.send, self.on_group_lost)
+        try:
+            # The interface that reaches the server is the one on its LAN
+            interface = MULTICAST_INTERFACE or self.socket.getsockname()[0]
+            receiver.listen(MULTICAST_GROUP, MULTICAST_PORT, interface)
+        except OSError as e:
+            self.logger.error(f"Multicast unavailable, broadcasts stay on TCP: {e}")
+            return
+        self.multicast = receiver
+        self.socket.send(b"MULTICAST\n")
+    
+    def leave_multicast(self):
+        if self.multicast:
+            self.multicast.close()
+            self.multicast = None
+    
+    def on_group_frame(self, frame: str):
+        """A broadcast from the group, in order (not part of the session count)."""
+        msg_type, _, content = frame.partition('|')
+        self.post(self.process_message, msg_type, content)
+    
+    def on_group_lost(self, count: int):
+        self.post(self.add_system, f"⚠️ {count} broadcast message(s) could not be recovered")
+    
+    def reconnect(self) -> bool:
+        """Reopen the connection and resume the session (background thread)."""
+        for delay in RESUME_RETRY_DELAYS:
+            time.sleep(delay)
+            if not self.running or not self.resume_token:
+                return False
+            try:
+                sock = self.open_socket(*self.server_address)
+            except OSError:
+                continue
+            
+            try:
+                sock.sendall(f"RESUME:{self.resume_token}:{self.session_seq}\n".encode())
+                self.recv_buffer = b''
+                reply = []
+                while not reply:
+                    data = sock.recv(BUFFER_SIZE)
+                    if not data:
+                        raise ConnectionError("Server closed the connection")
+                    reply = self.split_frames(data)
+                sock.settimeout(None)
+            except OSError:
+                sock.close()
+                continue
+            
+            if not reply[0].startswith("OK|"):
+                sock.close()
+                return False  # Session expired on the server
+            
+            # Frames that came with the reply go through the normal path
+            if self.use_tls:
+                self.tls_session = sock.session
+            self.sender = PrioritySender(sock)
+            self.socket = sock
+            self.connected = True
+            for msg in reply[1:]:
+                self.dispatch(msg)
+            self.send_ack()
+            threading.Thread(target=self.receive_loop, daemon=True).start()
+            return True
+        return False
     
     def process_message(self, msg_type: str, content: str):
         """Process a received message."""
@@ -562,6 +769,9 @@ class CyberClient:
         elif msg_type == "USERS":
             self.update_users(content)
             
+        elif msg_type == "PRESENCE":
+            self.apply_presence(content)
+            
         elif msg_type == "ERROR":
             self.add_system(f"❌ {content}")
             
@@ -570,8 +780,8 @@ class CyberClient:
             self.disconnect()
             
         elif msg_type == "TYPING":
-            # Someone is typing
-            self.typing_indicator.add_user(content)
+            # Everyone typing right now (the server coalesces the updates)
+            self.typing_indicator.set_users(u for u in content.split(',') if u)
             
         elif msg_type == "STOP_TYPING":
             self.typing_indicator.remove_user(content)
@@ -590,70 +800,38 @@ class CyberClient:
     
     def add_message(self, sender: str, message: str, msg_type: str = 'recv'):
         """Add a message to the chat display."""
-        bubble = MessageBubble(self.messages_frame, sender, message, msg_type)
-        bubble.pack(fill='x')
-        
-        # Scroll to bottom
-        self.chat_canvas.update_idletasks()
-        self.chat_canvas.yview_moveto(1.0)
+        self.chat_view.add(sender, message, msg_type)
+        if msg_type in ('sent', 'private_sent'):
+            self.chat_view.jump_to_latest()  # Your own message: back to the bottom
     
     def add_system(self, message: str):
         """Add a system message to the chat."""
-        bubble = MessageBubble(self.messages_frame, "", message, 'system')
-        bubble.pack(fill='x')
-        
-        # Scroll to bottom
-        self.chat_canvas.update_idletasks()
-        self.chat_canvas.yview_moveto(1.0)
+        self.chat_view.add("", message, 'system')
     
     def update_users(self, users_str: str):
         """Update the users list display."""
-        # Clear existing users
-        for widget in self.users_frame.winfo_children():
-            widget.destroy()
-        
         # Parse users (format: "Online: user1(status), user2(status), ...")
-        users_part = users_str.replace("Online:", "").strip()
-        if not users_part:
-            return
-        
-        users = []
-        for user_entry in users_part.split(","):
-            user_entry = user_entry.strip()
-            if not user_entry:
-                continue
-            
-            # Parse "username(status)" format
-            if "(" in user_entry:
-                username = user_entry.split("(")[0].strip()
-                status = user_entry.split("(")[1].rstrip(")").strip()
-            else:
-                username = user_entry
-                status = STATUS_ONLINE
-            
-            users.append((username, status))
-            self.online_users[username] = status
-        
-        # Update count
-        self.users_count_label.configure(text=f"({len(users)})")
-        
-        # Create user list items
-        for username, status in users:
-            is_self = username == self.username
-            
-            item = UserListItem(
-                self.users_frame,
-                username,
-                status,
-                is_self=is_self,
-                on_click=self.open_dm_dialog if not is_self else None
-            )
-            item.pack(fill='x', pady=1)
+        self.online_users = dict(parse_user_list(users_str))
+        self.render_users()
+    
+    def apply_presence(self, changes: str):
+        """PRESENCE| frame: status changes batched by the server."""
+        changed = False
+        for username, status in parse_user_list(changes):
+            if self.online_users.get(username, status) != status:
+                self.online_users[username] = status
+                changed = True
+        if changed:
+            self.render_users()
+    
+    def render_users(self):
+        """Show online_users in the roster (only changed rows are touched)."""
+        self.users_count_label.configure(text=f"({len(self.online_users)})")
+        self.roster.set_users(self.online_users)
     
     def clear_chat(self):
         """Clear the chat display."""
-        for widget in self.messages_frame.winfo_children():
-            widget.destroy()
+        self.chat_view.clear()
         self.add_system("Chat cleared.")
     
     # ─────────────────────────────────────────────────────────────
@@ -683,11 +861,79 @@ class CyberClient:
             
             entry.bind('<Return>', lambda e: send_dm())
             
-            CyberButton(frame, "SEND", command=send_dm,
-                       color='accent_purple', size='small').pack(pady=15)
+            buttons = tk.Frame(frame, bg=COLORS['bg_card'])
+            buttons.pack(pady=15)
+            CyberButton(buttons, "SEND", command=send_dm,
+                       color='accent_purple', size='small').pack(side='left', padx=5)
+            CyberButton(buttons, "📎 FILE",
+                       command=lambda: (dialog.destroy(), self.send_file(username)),
+                       color='accent_cyan', size='small').pack(side='left', padx=5)
         
         dialog.add_content(create_content)
     
+    def send_file(self, username: str):
+        """Pick a file and offer it to a user."""
+        if username == self.username:
+            self.add_system("❌ You cannot send a file to yourself")
+            return
+        path = filedialog.askopenfilename(title=f"Send a file to {username}")
+        if not path:
+            return
+        try:
+            transfer = self.transfers.offer(username, path)
+        except OSError as e:
+            self.add_system(f"❌ Cannot send {path}: {e.strerror or e}")
+            return
+        self.add_system(f"📤 Offered '{transfer.name}' ({format_bytes(transfer.size)}) "
+                        f"to {username} - waiting for them to accept")
+    
+    def on_transfer_event(self, kind: str, transfer):
+        """TransferManager callback (receive or sender thread): hand over to Tk."""
+        self.post(self.show_transfer, kind, transfer)
+    
+    def show_transfer(self, kind: str, transfer):
+        """Reflect a file transfer event in the UI."""
+        if kind == 'offer':
+            play_notification_sound()
+            if not messagebox.askyesno(
+                    "Incoming file",
+                    f"{transfer.peer} wants to send you '{transfer.name}' "
+                    f"({format_bytes(transfer.size)}).\nAccept it?"):
+                self.transfers.reject(transfer.id)
+                return
+            suggested = default_download_path(transfer.name)
+            os.makedirs(os.path.dirname(suggested), exist_ok=True)
+            path = filedialog.asksaveasfilename(
+                title="Save file as", initialdir=os.path.dirname(suggested),
+                initialfile=transfer.name)
+            if path:
+                self.transfers.accept(transfer.id, path)
+            else:
+                self.transfers.reject(transfer.id)
+            return
+        
+        if not hasattr(self, 'transfer_panel') or not self.transfer_panel.winfo_exists():
+            return  # Back on the login screen
+        arrow = f"⬆ {transfer.name} → {transfer.peer}" if transfer.outgoing \
+            else f"⬇ {transfer.name} ← {transfer.peer}"
+        
+        if kind == 'progress':
+            self.transfer_panel.set_progress(
+                transfer.id,
+                f"{arrow}  {transfer.fraction():.0%} · {format_bytes(transfer.rate())}/s",
+                transfer.fraction())
+            return
+        
+        self.transfer_panel.remove(transfer.id)
+        if kind == 'done':
+            elapsed = time.monotonic() - transfer.started
+            verb = "Sent" if transfer.outgoing else "Received"
+            where = "" if transfer.outgoing else f" → {transfer.path}"
+            self.add_system(f"📁 {verb} '{transfer.name}' ({format_bytes(transfer.size)} "
+                            f"in {elapsed:.1f}s, {format_bytes(transfer.rate())}/s){where}")
+        else:
+            self.add_system(f"❌ Transfer of '{transfer.name}' stopped: {transfer.reason}")
+    
     def show_emoji_picker(self):
         """Show the emoji picker popup."""
         def insert_emoji(emoji: str):
@@ -731,10 +977,16 @@ class CyberClient:
     
     def on_typing(self, event):
         """Handle typing events."""
-        if not self.is_typing:
+        if not self.msg_entry.get():
+            # Cleared, or the Return that just sent the message
+            self.stop_typing_indicator()
+            return
+        now = time.monotonic()
+        if not self.is_typing or now - self.typing_reported >= TYPING_REFRESH:
+            # Once per burst, then a refresh so the server does not time us out
             self.is_typing = True
-            # Optionally send typing indicator to server
-            # self.send(f"TYPING:{self.username}")
+            self.typing_reported = now
+            self.send("TYPING")
         
         # Reset timer
         if self.typing_timer:
@@ -746,43 +998,111 @@ class CyberClient:
         """Stop the typing indicator."""
         if self.is_typing:
             self.is_typing = False
-            # Optionally send stop typing to server
-            # self.send(f"STOP_TYPING:{self.username}")
+            self.send("STOP_TYPING")
+    
+    # ─────────────────────────────────────────────────────────────
+    # UI QUEUE
+    # ─────────────────────────────────────────────────────────────
+    
+    def post(self, func: Callable, *args):
+        """Run func(*args) on the UI thread at the next tick (any thread, order kept)."""
+        self.ui_queue.append((func, args))
+    
+    def drain_ui(self):
+        """
+        Tick: run queued UI work in one batch - at most UI_FRAMES_PER_TICK
+        items or UI_TICK_BUDGET_MS, so input and redraws always get the
+        rest of the tick however fast frames arrive.
+        """
+        if not self.running:
+            return
+        # Rescheduled first: a dialog opened below runs its own event loop,
+        # and the chat keeps updating behind it
+        self.ui_timer = self.root.after(UI_TICK_MS, self.drain_ui)
+        
+        queue = self.ui_queue
+        deadline = time.perf_counter() + UI_TICK_BUDGET_MS / 1000
+        for _ in range(UI_FRAMES_PER_TICK):
+            if not queue:
+                break
+            func, args = queue.popleft()
+            try:
+                func(*args)
+            except Exception as e:
+                self.logger.error(f"UI update failed: {e}")
+            if time.perf_counter() >= deadline:
+                break
     
     # ─────────────────────────────────────────────────────────────
     # PING
     # ─────────────────────────────────────────────────────────────
     
     def start_ping(self):
-        """Start periodic ping to measure latency."""
+        """Start periodic ping to measure latency (replacing any running loop)."""
+        if self.ping_timer:
+            self.root.after_cancel(self.ping_timer)
+            self.ping_timer = None
         self.do_ping()
     
     def do_ping(self):
         """Send a ping and schedule next one."""
+        self.ping_timer = None
         if not self.connected:
             return
         
         self.last_ping_time = time.time()
-        # For simplicity, we use LIST command which server always responds to
-        # A proper implementation would have PING/PONG messages
+        self.send("PING")  # PONG comes back on the control channel
         
         # Schedule next ping
-        self.root.after(PING_INTERVAL * 1000, self.do_ping)
+        self.ping_timer = self.root.after(PING_INTERVAL * 1000, self.do_ping)
     
     # ─────────────────────────────────────────────────────────────
     # LIFECYCLE
     # ─────────────────────────────────────────────────────────────
     
     def on_disconnect(self):
-        """Handle disconnection from server."""
-        if self.connected:
-            self.connected = False
-            messagebox.showwarning("Disconnected", "Lost connection to server")
-            self.show_login()
+        """Handle disconnection from server (resume the session if we can)."""
+        if not self.connected:
+            return
+        self.connected = False
+        
+        if self.resume_token and self.running:
+            self.add_system("🔄 Connection lost - reconnecting...")
+            
+            def attempt():
+                ok = self.reconnect()
+                self.post(self.on_reconnected if ok else self.on_resume_failed)
+            threading.Thread(target=attempt, daemon=True).start()
+            return
+        
+        self.transfers.cancel_all()
+        self.leave_multicast()
+        messagebox.showwarning("Disconnected", "Lost connection to server")
+        self.show_login()
+    
+    def on_reconnected(self):
+        self.add_system("✅ Reconnected")
+        self.start_ping()
+    
+    def on_resume_failed(self):
+        if not self.running or self.resume_token is None:
+            return  # Closed or logged out while we were retrying
+        self.resume_token = None
+        self.transfers.cancel_all()
+        self.leave_multicast()
+        messagebox.showwarning("Disconnected", "Lost connection to server")
+        self.show_login()
     
     def on_close(self):
         """Handle window close."""
         self.running = False
+        # Pending callbacks would fire into a destroyed root
+        for timer in (self.ui_timer, self.ping_timer, self.typing_timer):
+            if timer:
+                self.root.after_cancel(timer)
+        self.ui_timer = self.ping_timer = self.typing_timer = None
+        self.transfers.cancel_all()
+        self.leave_multicast()
         
         if self.connected:
             try:
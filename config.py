@@ -14,6 +14,141 @@ MAX_CLIENTS = 50
 BUFFER_SIZE = 4096
 PING_INTERVAL = 5  # seconds
 
+# ═══════════════════════════════════════════════════════════════
+# UNIX DOMAIN SOCKET
+# ═══════════════════════════════════════════════════════════════
+
+UNIX_SOCKET_PATH = ""                 # also listen here for same-host clients ("" = TCP only)
+UNIX_SOCKET_MODE = "660"              # octal permissions of the socket file - who may connect
+
+# ═══════════════════════════════════════════════════════════════
+# MULTICAST FAN-OUT
+# ═══════════════════════════════════════════════════════════════
+
+MULTICAST_ENABLED = False             # broadcasts go once to a UDP group; clients opt in
+MULTICAST_GROUP = '239.255.42.99'     # administratively scoped - stays inside the site
+MULTICAST_PORT = 12346
+MULTICAST_TTL = 1                     # router hops (1 = local subnet only)
+MULTICAST_INTERFACE = ''              # local address to send/join on ('' = the chat socket's)
+MULTICAST_REPAIR_FRAMES = 4096        # recent group frames kept for NACK repair
+MULTICAST_REPAIR_BYTES = 256 * 1024   # most one NACK is answered with over TCP (the rest: MCLOST)
+MULTICAST_HEARTBEAT = 1.0             # seconds between MCHB| frames so a lost tail is noticed
+MULTICAST_NACK_DELAY = 0.05           # a gap may be reordering: wait this long before NACK
+MULTICAST_RCVBUF = 1024 * 1024        # client SO_RCVBUF for the group socket
+
+# ═══════════════════════════════════════════════════════════════
+# CONNECTION POOL
+# ═══════════════════════════════════════════════════════════════
+
+POOL_WORKERS = 4                      # selector loops (0 = one thread per client)
+POOL_MAX_CONNECTIONS = 2500           # hard cap on sockets across all workers
+OUTBOX_HIGH_WATERMARK = 1024 * 1024   # queued bytes before a slow client is cut off
+SEND_BATCH_BYTES = 64 * 1024          # max bytes coalesced into one send() call
+CLOSE_LINGER = 2.0                    # seconds to flush queued frames before closing
+SHUTDOWN_DRAIN_SECONDS = 5.0          # deadline for flushing clients on server stop
+POOL_TICK_SECONDS = 0.5               # worker wake-up for linger/handshake deadlines
+
+# ═══════════════════════════════════════════════════════════════
+# SOCKET OPTIONS
+# ═══════════════════════════════════════════════════════════════
+
+SOCKET_RCVBUF = 0                     # SO_RCVBUF bytes per client socket (0 = OS default)
+SOCKET_SNDBUF = 0                     # SO_SNDBUF bytes per client socket (0 = OS default)
+SOCKET_NODELAY = False                # TCP_NODELAY - always on for TLS connections
+SOCKET_KEEPALIVE = False              # TCP keepalive probes on idle connections
+SOCKET_KEEPALIVE_IDLE = 60            # seconds idle before the first probe
+SOCKET_KEEPALIVE_INTERVAL = 10        # seconds between probes
+SOCKET_KEEPALIVE_COUNT = 5            # unanswered probes before the peer counts as gone
+SOCKET_NOTSENT_LOWAT = 64 * 1024      # bulk frames wait while the kernel holds this much unsent (0 = off)
+
+# ═══════════════════════════════════════════════════════════════
+# CHANNEL PRIORITIES
+# ═══════════════════════════════════════════════════════════════
+
+CHANNEL_PRIORITIES = True             # False: one FIFO outbox per client (for comparison)
+CHANNEL_WEIGHTS = (8, 4, 1)           # chat, presence, bulk share of a congested socket
+CHANNEL_QUANTUM = 1024                # bytes per weight unit per round (control always first)
+
+# ═══════════════════════════════════════════════════════════════
+# HOT RESTART
+# ═══════════════════════════════════════════════════════════════
+
+HOT_RESTART = False                   # accept socket takeovers from a new process (--hot-restart)
+HANDOFF_SOCKET = "/tmp/cyber_chat_{port}.sock"
+HANDOFF_TIMEOUT = 10.0                # seconds for the whole socket transfer
+
+# ═══════════════════════════════════════════════════════════════
+# SESSION RESUME
+# ═══════════════════════════════════════════════════════════════
+
+RESUME_GRACE_SECONDS = 60.0           # a dropped user's name is held this long
+RESUME_BUFFER_FRAMES = 500            # chat frames kept per session for catch-up
+RESUME_RETRY_DELAYS = (0.5, 1, 2, 4, 8)   # client reconnect backoff (seconds)
+RELIABLE_DELIVERY = False             # client asks for numbered frames and sends ACKs (opt-in)
+
+# ═══════════════════════════════════════════════════════════════
+# TYPING INDICATORS
+# ═══════════════════════════════════════════════════════════════
+
+TYPING_FLUSH_INTERVAL = 0.5           # at most one TYPING| frame per client per interval (0 = at once)
+TYPING_TIMEOUT = 6.0                  # typing state lapses without a fresh report
+TYPING_REFRESH = 3.0                  # client repeats TYPING this often while typing
+
+# ═══════════════════════════════════════════════════════════════
+# PRESENCE
+# ═══════════════════════════════════════════════════════════════
+
+PRESENCE_WINDOW = 0.5                 # STATUS changes merged into one PRESENCE| frame (0 = at once)
+PRESENCE_ANNOUNCE = False             # also post "'x' is now away" SYSTEM lines
+
+# ═══════════════════════════════════════════════════════════════
+# FILE TRANSFER
+# ═══════════════════════════════════════════════════════════════
+
+FILE_CHUNK_SIZE = 16 * 1024           # file bytes per FILE_CHUNK frame (base64 on the wire)
+FILE_WINDOW_CHUNKS = 8                # unacknowledged chunks in flight per transfer
+FILE_MAX_SIZE = 2 * 1024 ** 3         # largest file the server relays
+FILE_PROGRESS_INTERVAL = 0.25         # seconds between progress updates in the client
+DOWNLOAD_DIR = "downloads"
+
+# ═══════════════════════════════════════════════════════════════
+# TLS
+# ═══════════════════════════════════════════════════════════════
+
+TLS_ENABLED = False                   # wrap client connections in TLS (server and client)
+TLS_CERT_FILE = "certs/cyber_chat.crt"   # self-signed on first use; clients trust it
+TLS_KEY_FILE = "certs/cyber_chat.key"
+TLS_CERT_DAYS = 365
+TLS_VERIFY = True                     # client checks the certificate and hostname
+TLS_HANDSHAKE_TIMEOUT = 5.0           # seconds before a stalled handshake is dropped
+TLS_SESSION_TICKETS = 2               # TLS 1.3 resumption tickets per handshake
+
+# ═══════════════════════════════════════════════════════════════
+# METRICS ENDPOINT
+# ═══════════════════════════════════════════════════════════════
+
+METRICS_HOST = '127.0.0.1'
+METRICS_PORT = 9108                   # Prometheus /metrics over HTTP (0 = disabled)
+SEND_LATENCY_SAMPLE_EVERY = 32        # fan-outs between per-recipient send timings
+
+# ═══════════════════════════════════════════════════════════════
+# MESSAGE TRACING
+# ═══════════════════════════════════════════════════════════════
+
+TRACE_SAMPLE_RATE = 0.0               # fraction of inbound frames traced (0 = off)
+TRACE_RING_SIZE = 2000                # most recent traces kept in memory
+
+# ═══════════════════════════════════════════════════════════════
+# CLIENT UI
+# ═══════════════════════════════════════════════════════════════
+
+UI_TICK_MS = 16                       # received frames reach the UI once per tick (~60 Hz)
+UI_FRAMES_PER_TICK = 200              # most queued updates handled in one tick...
+UI_TICK_BUDGET_MS = 10                # ...or until this much of the tick is used; the rest wait
+CHAT_RENDER_WINDOW = 80               # most message bubbles alive in the chat area at once
+CHAT_PAGE_SIZE = 20                   # messages paged in when scrolling past the rendered window
+CHAT_SCROLLBACK = 10000               # messages kept for scrolling back (older ones are dropped)
+
 # ═══════════════════════════════════════════════════════════════
 # USER STATUS TYPES
 # ═══════════════════════════════════════════════════════════════
@@ -96,10 +231,31 @@ LOGO = """
 
 ADMIN_PASSWORD = "admin123"  # For server admin commands
 
+# ═══════════════════════════════════════════════════════════════
+# PROFILING
+# ═══════════════════════════════════════════════════════════════
+
+PROFILE_DIR = "profiles"
+PROFILE_DEFAULT_SECONDS = 30          # window length when none is given
+PROFILE_MAX_SECONDS = 600             # longest window an admin can request
+PROFILE_SAMPLE_INTERVAL = 0.005       # seconds between stack samples
+
 # ═══════════════════════════════════════════════════════════════
 # FILE PATHS
 # ═══════════════════════════════════════════════════════════════
 
 LOG_FILE = "cyber_chat.log"
 HISTORY_DIR = "chat_history"
+MAX_LOG_LINES = 2000  # Lines kept in the server dashboard log view
+
+# ═══════════════════════════════════════════════════════════════
+# TUNING OVERRIDES
+# ═══════════════════════════════════════════════════════════════
+# cyber_chat.json (or $CYBER_CHAT_CONFIG) and CYBER_CHAT_<NAME> environment
+# variables replace the values above; main.py adds --set NAME=VALUE.
 
+import tuning
+try:
+    tuning.load(globals())
+except (ValueError, OSError) as e:
+    raise SystemExit(f"❌ Configuration error: {e}")
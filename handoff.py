@@ -0,0 +1,218 @@
+"""
+⚡ CYBER CHAT - Hot Restart Module
+Passes the listening sockets and live client sockets to a new server
+process over a Unix socket (SCM_RIGHTS), so upgrades keep users connected
+Students: Adir Buskila & Liav Weizman
+
+Flow (the new process drives it):
+    new → old   TAKEOVER
+    old → new   state message + listening sockets, then client sockets in batches
+    new → old   OK (objects rebuilt, not reading yet) or FAIL
+The old process stops reading before it sends anything, closes its copies
+once it gets OK, and resumes serving if it does not.
+"""
+
+import json
+import os
+import socket
+import stat
+import struct
+import threading
+from typing import Any, Dict, List, Tuple
+
+from config import HANDOFF_SOCKET, HANDOFF_TIMEOUT
+
+
+FDS_PER_MESSAGE = 200   # Linux caps SCM_RIGHTS at 253 descriptors per message
+SUPPORTED = hasattr(socket, 'AF_UNIX') and hasattr(socket, 'send_fds')
+
+
+def handoff_path(port: int) -> str:
+    """Unix socket path the server on `port` listens on for takeovers."""
+    return HANDOFF_SOCKET.format(port=port)
+
+
+def remove_stale(path: str):
+    """
+    Delete the socket at `path` left by a server that is gone. Raises
+    OSError if something still answers there or the path is not a socket.
+    """
+    if not stat.S_ISSOCK(os.lstat(path).st_mode):
+        raise OSError(f"{path} exists and is not a socket")
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    probe.settimeout(1.0)
+    try:
+        probe.connect(path)
+    except ConnectionRefusedError:
+        os.unlink(path)  # Nobody listening: stale socket from a previous run
+        return
+    finally:
+        probe.close()
+    raise OSError(f"{path} is in use by another process")
+
+
+# ═══════════════════════════════════════════════════════════════
+# FRAMING
+# ═══════════════════════════════════════════════════════════════
+
+def send_message(channel: socket.socket, payload: bytes, fds: List[int] = ()):
+    """Length-prefixed message; descriptors ride on the 4-byte header."""
+    header = struct.pack('!I', len(payload))
+    if fds:
+        socket.send_fds(channel, [header], list(fds))
+    else:
+        channel.sendall(header)
+    channel.sendall(payload)
+
+
+def _recv_exact(channel: socket.socket, size: int) -> bytes:
+    data = b''
+    while len(data) < size:
+        chunk = channel.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError("Handoff channel closed")
+        data += chunk
+    return data
+
+
+def recv_message(channel: socket.socket) -> Tuple[bytes, List[int]]:
+    """Receive one message and the descriptors attached to it."""
+    header, fds, _, _ = socket.recv_fds(channel, 4, FDS_PER_MESSAGE)
+    if not header:
+        raise ConnectionError("Handoff channel closed")
+    header += _recv_exact(channel, 4 - len(header))
+    (size,) = struct.unpack('!I', header)
+    return _recv_exact(channel, size), fds
+
+
+def send_state(channel: socket.socket, listeners: List[socket.socket],
+               state: Dict[str, Any], client_sockets: List[socket.socket]):
+    """Send the server state, the listening sockets and every client socket."""
+    send_message(channel, json.dumps(state).encode(), [s.fileno() for s in listeners])
+    for i in range(0, len(client_sockets), FDS_PER_MESSAGE):
+        batch = client_sockets[i:i + FDS_PER_MESSAGE]
+        send_message(channel, str(len(batch)).encode(), [s.fileno() for s in batch])
+
+
+def recv_state(channel: socket.socket) -> Tuple[List[socket.socket], Dict[str, Any],
+                                                List[socket.socket]]:
+    """Inverse of send_state(): (listeners, state, client sockets in order)."""
+    payload, fds = recv_message(channel)
+    state = json.loads(payload)
+    listeners = [socket.socket(fileno=fd) for fd in fds]
+
+    expected = len(state['clients'])
+    sockets: List[socket.socket] = []
+    while len(sockets) < expected:
+        _, fds = recv_message(channel)
+        sockets.extend(socket.socket(fileno=fd) for fd in fds)
+    return listeners, state, sockets
+
+
+# ═══════════════════════════════════════════════════════════════
+# NEW PROCESS SIDE
+# ═══════════════════════════════════════════════════════════════
+
+def request_takeover(port: int, timeout: float = HANDOFF_TIMEOUT):
+    """
+    Ask the running server on `port` for its sockets.
+    Returns (channel, listeners, state, client sockets); reply on the
+    channel with acknowledge() once the state has been adopted.
+    """
+    channel = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    channel.settimeout(timeout)
+    channel.connect(handoff_path(port))
+    channel.sendall(b"TAKEOVER\n")
+    listeners, state, sockets = recv_state(channel)
+    return channel, listeners, state, sockets
+
+
+def acknowledge(channel: socket.socket, ok: bool = True):
+    """Tell the old process whether the takeover succeeded."""
+    try:
+        channel.sendall(b"OK\n" if ok else b"FAIL\n")
+    finally:
+        channel.close()
+
+
+# ═══════════════════════════════════════════════════════════════
+# OLD PROCESS SIDE
+# ═══════════════════════════════════════════════════════════════
+
+class HandoffListener(threading.Thread):
+    """Waits on the Unix socket for a new process asking to take over."""
+
+    def __init__(self, server, port: int):
+        super().__init__(name="handoff-listener", daemon=True)
+        self.server = server
+        self.path = handoff_path(port)
+        self.running = False
+
+        if os.path.lexists(self.path):
+            remove_stale(self.path)
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        old_umask = os.umask(0o077)  # Only our user may collect the sockets
+        try:
+            self.sock.bind(self.path)
+        finally:
+            os.umask(old_umask)
+        os.chmod(self.path, 0o600)
+        self.sock.listen(1)
+        self.sock.settimeout(0.5)
+
+    def run(self):
+        self.running = True
+        handed_off = False
+        while self.running:
+            try:
+                channel, _ = self.sock.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+
+            try:
+                channel.settimeout(HANDOFF_TIMEOUT)
+                if not self._same_user(channel) or channel.recv(16) != b"TAKEOVER\n":
+                    continue
+                if self.server.hand_off(channel):
+                    handed_off = True
+                    break
+            except OSError:
+                pass
+            finally:
+                channel.close()
+        # After a handoff the path already belongs to the new process
+        self.close(unlink=not handed_off)
+
+    @staticmethod
+    def _same_user(channel: socket.socket) -> bool:
+        """Refuse peers running as another user (Linux SO_PEERCRED)."""
+        if not hasattr(socket, 'SO_PEERCRED'):
+            return True
+        creds = channel.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED,
+                                   struct.calcsize('3i'))
+        _, uid, _ = struct.unpack('3i', creds)
+        return uid == os.getuid()
+
+    def stop(self):
+        self.running = False
+
+    def close(self, unlink: bool = True):
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+        if unlink:
+            try:
+                os.unlink(self.path)
+            except OSError:
+                pass
+
+
+def wait_for_ack(channel: socket.socket) -> bool:
+    """True if the new process confirmed the takeover."""
+    try:
+        return channel.recv(16).startswith(b"OK")
+    except OSError:
+        return False
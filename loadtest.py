@@ -0,0 +1,415 @@
+"""
+⚡ CYBER CHAT - Load Generator
+Headless bot clients that drive a running server with a traffic mix
+Students: Adir Buskila & Liav Weizman
+
+Usage:
+    python main.py loadtest                          # 50 bots, 30 s, 100 ops/s
+    python main.py loadtest --bots 500 --rate 400 --duration 60
+    python main.py loadtest --mix chat=60,dm=20,status=10,list=10
+    python main.py loadtest --unix /tmp/cyber_chat.sock    # same-host bots
+    python main.py loadtest --compare loadtest_20260101_120000.json
+"""
+
+import argparse
+import json
+import random
+import selectors
+import socket
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional
+
+from config import DEFAULT_HOST, DEFAULT_PORT, STATUS_ONLINE, STATUS_AWAY, STATUS_BUSY
+from utils import format_bytes, percentile, format_address, open_connection
+
+
+DEFAULT_MIX = {'chat': 70, 'dm': 10, 'status': 10, 'list': 10}
+
+
+# ═══════════════════════════════════════════════════════════════
+# BOT CLIENT
+# ═══════════════════════════════════════════════════════════════
+
+class BotClient:
+    """One headless chat connection driven by the load generator."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.socket: Optional[socket.socket] = None
+        self.recv_buffer = b''
+        self.send_buffer = b''
+        self.connected = False
+        self.connect_started = 0.0
+        self.connect_time: Optional[float] = None
+        self.bytes_sent = 0
+
+        # Outstanding request/response timings (FIFO per bot)
+        self.pending_status: Deque[float] = deque()
+        self.pending_list: Deque[float] = deque()
+
+    def open(self, host: str, port: Optional[int]):
+        """Connect and send the username (the server's handshake). port None: Unix socket."""
+        self.connect_started = time.perf_counter()
+        self.socket = open_connection(host, port, timeout=10)
+        self.socket.setblocking(False)
+        self.queue(self.name)
+
+    def queue(self, frame: str):
+        """Queue a newline-terminated frame for sending."""
+        self.send_buffer += f"{frame}\n".encode()
+
+    def flush(self) -> bool:
+        """Send as much as the socket accepts. Returns True when drained."""
+        if self.send_buffer:
+            try:
+                sent = self.socket.send(self.send_buffer)
+                self.send_buffer = self.send_buffer[sent:]
+                self.bytes_sent += sent
+            except (BlockingIOError, InterruptedError):
+                pass
+        return not self.send_buffer
+
+
+# ═══════════════════════════════════════════════════════════════
+# LOAD GENERATOR
+# ═══════════════════════════════════════════════════════════════
+
+class LoadGenerator:
+    """Runs all bots from one selector loop and records timings."""
+
+    def __init__(self, host: str, port: Optional[int], bots: int, rate: float,
+                 duration: float, mix: Dict[str, int], prefix: str = 'bot'):
+        self.host = host
+        self.port = port
+        self.rate = rate
+        self.duration = duration
+        self.mix = {op: weight for op, weight in mix.items() if weight > 0}
+        self.bots = [BotClient(f"{prefix}{i:04d}") for i in range(bots)]
+        self.selector = selectors.DefaultSelector()
+
+        # Measurements
+        self.sent_at: Dict[int, float] = {}
+        self.latencies: Dict[str, List[float]] = {op: [] for op in DEFAULT_MIX}
+        self.ops_sent: Dict[str, int] = {op: 0 for op in DEFAULT_MIX}
+        self.frames_received = 0
+        self.bytes_received = 0
+        self.errors = 0
+        self.disconnects = 0
+        self.next_id = 0
+        self.drive_elapsed = 0.0
+
+    # ─────────────────────────────────────────────────────────────
+    # PHASES
+    # ─────────────────────────────────────────────────────────────
+
+    def connect_all(self, timeout: float = 30.0):
+        """Open every bot connection and wait for the welcome frames."""
+        for bot in self.bots:
+            try:
+                bot.open(self.host, self.port)
+            except OSError:
+                self.errors += 1
+                continue
+            self.selector.register(bot.socket, selectors.EVENT_READ | selectors.EVENT_WRITE, bot)
+            self.poll(0)
+
+        deadline = time.monotonic() + timeout
+        while (time.monotonic() < deadline and
+               any(bot.socket and not bot.connected for bot in self.bots)):
+            self.poll(0.1)
+
+    def drive(self):
+        """Send the configured traffic mix for the configured duration."""
+        live = [bot for bot in self.bots if bot.connected]
+        if not live:
+            return
+
+        ops = list(self.mix)
+        weights = [self.mix[op] for op in ops]
+        interval = 1.0 / self.rate
+        started = time.perf_counter()
+        next_send = started
+
+        try:
+            while time.perf_counter() - started < self.duration:
+                now = time.perf_counter()
+                while next_send <= now:
+                    op = random.choices(ops, weights)[0]
+                    self.send_op(op, random.choice(live), live)
+                    next_send += interval
+                self.poll(max(0.0, next_send - time.perf_counter()))
+        finally:
+            self.drive_elapsed = time.perf_counter() - started
+
+    def settle(self, quiet: float = 1.0, limit: float = 10.0):
+        """Keep reading until the server goes quiet (late deliveries count)."""
+        deadline = time.monotonic() + limit
+        while time.monotonic() < deadline and self.poll(quiet):
+            pass
+
+    def close(self):
+        """Disconnect every bot."""
+        for bot in self.bots:
+            if bot.socket:
+                try:
+                    bot.socket.sendall(b"QUIT\n")
+                except OSError:
+                    pass
+                try:
+                    bot.socket.close()
+                except OSError:
+                    pass
+        self.selector.close()
+
+    # ─────────────────────────────────────────────────────────────
+    # TRAFFIC
+    # ─────────────────────────────────────────────────────────────
+
+    def send_op(self, op: str, bot: BotClient, live: List[BotClient]):
+        """Queue one operation of the given kind from a bot."""
+        if bot.socket is None:
+            return  # Disconnected mid-run
+        now = time.perf_counter()
+
+        if op == 'chat':
+            op_id = self._new_id(now)
+            bot.queue(f"lt {op_id} the quick brown fox jumps over the lazy dog")
+        elif op == 'dm':
+            target = random.choice(live)
+            op_id = self._new_id(now)
+            bot.queue(f"TO:{target.name}:ltdm {op_id} psst")
+        elif op == 'status':
+            bot.pending_status.append(now)
+            bot.queue(f"STATUS:{random.choice([STATUS_ONLINE, STATUS_AWAY, STATUS_BUSY])}")
+        elif op == 'list':
+            bot.pending_list.append(now)
+            bot.queue("LIST")
+
+        self.ops_sent[op] += 1
+        if not bot.flush():
+            self.selector.modify(bot.socket, selectors.EVENT_READ | selectors.EVENT_WRITE, bot)
+
+    def _new_id(self, now: float) -> int:
+        op_id = self.next_id
+        self.next_id += 1
+        self.sent_at[op_id] = now
+        return op_id
+
+    # ─────────────────────────────────────────────────────────────
+    # RECEIVING
+    # ─────────────────────────────────────────────────────────────
+
+    def poll(self, timeout: float) -> int:
+        """Service ready sockets. Returns the number of events handled."""
+        events = self.selector.select(timeout)
+        for key, mask in events:
+            bot = key.data
+            if mask & selectors.EVENT_WRITE and bot.flush():
+                self.selector.modify(bot.socket, selectors.EVENT_READ, bot)
+            if mask & selectors.EVENT_READ:
+                self._read(bot)
+        return len(events)
+
+    def _read(self, bot: BotClient):
+        try:
+            data = bot.socket.recv(65536)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError:
+            data = b''
+
+        if not data:
+            self.disconnects += 1
+            self.selector.unregister(bot.socket)
+            bot.socket.close()
+            bot.socket = None
+            bot.connected = False
+            return
+
+        now = time.perf_counter()
+        self.bytes_received += len(data)
+        *lines, bot.recv_buffer = (bot.recv_buffer + data).split(b'\n')
+        for line in lines:
+            self.frames_received += 1
+            self._on_frame(bot, line.decode(errors='replace'), now)
+
+    def _on_frame(self, bot: BotClient, frame: str, now: float):
+        # The welcome prompt has no newline, so it prefixes the first frame
+        if frame.startswith("WELCOME|"):
+            frame = frame.split(": ", 1)[1] if ": " in frame else ""
+        if '|' not in frame:
+            return
+        msg_type, content = frame.split('|', 1)
+
+        if msg_type == "MSG" or msg_type == "SENT":
+            _, _, body = content.partition("]: ")
+            tag, _, rest = body.partition(" ")
+            if tag == "lt":
+                op = 'chat'
+            elif tag == "ltdm" and msg_type == "MSG":
+                op = 'dm'
+            else:
+                return
+            op_id = int(rest.split(" ", 1)[0])
+            self.latencies[op].append(now - self.sent_at[op_id])
+
+        elif msg_type == "OK":
+            if content.startswith("Welcome"):
+                bot.connected = True
+                bot.connect_time = now - bot.connect_started
+            elif content.startswith("Status changed") and bot.pending_status:
+                self.latencies['status'].append(now - bot.pending_status.popleft())
+
+        elif msg_type == "USERS" and bot.pending_list:
+            # LIST replies share the USERS frame with roster broadcasts, so
+            # this is the time to the first roster after the request
+            self.latencies['list'].append(now - bot.pending_list.popleft())
+
+        elif msg_type in ("ERROR", "KICK"):
+            self.errors += 1
+
+    # ─────────────────────────────────────────────────────────────
+    # RESULTS
+    # ─────────────────────────────────────────────────────────────
+
+    def results(self) -> Dict[str, Any]:
+        """Summarize the run as a JSON-serializable dict."""
+        def summary(values: List[float]) -> Dict[str, float]:
+            values = sorted(values)
+            return {
+                'count': len(values),
+                'p50_ms': percentile(values, 50) * 1000,
+                'p95_ms': percentile(values, 95) * 1000,
+                'p99_ms': percentile(values, 99) * 1000,
+                'max_ms': (values[-1] * 1000) if values else 0.0,
+            }
+
+        connect_times = [bot.connect_time for bot in self.bots if bot.connect_time is not None]
+        total_ops = sum(self.ops_sent.values())
+        bytes_sent = sum(bot.bytes_sent for bot in self.bots)
+        elapsed = self.drive_elapsed
+        return {
+            'timestamp': datetime.now().isoformat(),
+            'config': {
+                'host': self.host,
+                'port': self.port,
+                'bots': len(self.bots),
+                'rate': self.rate,
+                'duration': self.duration,
+                'mix': self.mix,
+            },
+            'connected': len(connect_times),
+            'elapsed_s': elapsed,
+            'ops_sent': dict(self.ops_sent),
+            'throughput': {
+                'ops_per_s': total_ops / elapsed if elapsed else 0.0,
+                'frames_recv_per_s': self.frames_received / elapsed if elapsed else 0.0,
+                'bytes_recv_per_s': self.bytes_received / elapsed if elapsed else 0.0,
+                'bytes_sent_per_s': bytes_sent / elapsed if elapsed else 0.0,
+            },
+            'connect_time': summary(connect_times),
+            'latency': {op: summary(values) for op, values in self.latencies.items()},
+            'errors': self.errors,
+            'disconnects': self.disconnects,
+        }
+
+
+# ═══════════════════════════════════════════════════════════════
+# REPORTING
+# ═══════════════════════════════════════════════════════════════
+
+def print_report(results: Dict[str, Any], baseline: Optional[Dict[str, Any]] = None):
+    """Print a run summary, with deltas against a previous run if given."""
+    def delta(path: List[str]) -> str:
+        if not baseline:
+            return ""
+        old, new = baseline, results
+        for key in path:
+            old, new = old.get(key, {}), new.get(key, {})
+        if not old:
+            return ""
+        change = (new - old) / old * 100
+        return f"  ({change:+.1f}%)"
+
+    cfg = results['config']
+    tp = results['throughput']
+    print()
+    print(f"═══ LOAD TEST: {cfg['bots']} bots · {cfg['rate']:.0f} ops/s · {cfg['duration']:.0f} s ═══")
+    print(f"Connected        {results['connected']}/{cfg['bots']}   "
+          f"errors {results['errors']}   disconnects {results['disconnects']}")
+    print(f"Ops sent         {results['ops_sent']}")
+    print(f"Throughput       {tp['ops_per_s']:.1f} ops/s{delta(['throughput', 'ops_per_s'])}   "
+          f"{tp['frames_recv_per_s']:.1f} frames/s recv{delta(['throughput', 'frames_recv_per_s'])}")
+    print(f"Bandwidth        {format_bytes(tp['bytes_sent_per_s'])}/s out   "
+          f"{format_bytes(tp['bytes_recv_per_s'])}/s in")
+    print()
+    print(f"{'':<14}{'count':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    rows = [('connect', results['connect_time'], ['connect_time', 'p99_ms'])]
+    rows += [(op, stats, ['latency', op, 'p99_ms']) for op, stats in results['latency'].items()]
+    for name, stats, path in rows:
+        if not stats['count']:
+            continue
+        print(f"{name:<14}{stats['count']:>9}{stats['p50_ms']:>10.2f}{stats['p95_ms']:>10.2f}"
+              f"{stats['p99_ms']:>10.2f}{stats['max_ms']:>10.2f}{delta(path)}")
+    print()
+
+
+def parse_mix(text: str) -> Dict[str, int]:
+    """Parse 'chat=70,dm=10,...' into a weight dict."""
+    mix = {op: 0 for op in DEFAULT_MIX}
+    for part in text.split(','):
+        op, _, weight = part.partition('=')
+        op = op.strip().lower()
+        if op not in mix:
+            raise argparse.ArgumentTypeError(f"Unknown operation '{op}' (use {', '.join(mix)})")
+        mix[op] = int(weight)
+    return mix
+
+
+def main(argv: Optional[List[str]] = None):
+    """Command-line entry point (python main.py loadtest ...)."""
+    parser = argparse.ArgumentParser(prog="main.py loadtest",
+                                     description="Drive a Cyber Chat server with bot clients")
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--unix', metavar='PATH', help="connect to the server's Unix socket instead")
+    parser.add_argument('--bots', type=int, default=50, help="number of bot connections")
+    parser.add_argument('--rate', type=float, default=100.0, help="total operations per second")
+    parser.add_argument('--duration', type=float, default=30.0, help="seconds of traffic")
+    parser.add_argument('--mix', type=parse_mix, default=dict(DEFAULT_MIX),
+                        help="operation weights, e.g. chat=70,dm=10,status=10,list=10")
+    parser.add_argument('--prefix', default='bot', help="bot username prefix")
+    parser.add_argument('--output', help="results file (default: loadtest_<timestamp>.json)")
+    parser.add_argument('--compare', help="previous results file to compare against")
+    args = parser.parse_args(argv)
+
+    address = (args.unix, None) if args.unix else (args.host, args.port)
+    generator = LoadGenerator(*address, args.bots, args.rate, args.duration, args.mix, args.prefix)
+    print(f"⚡ Connecting {args.bots} bots to {format_address(address)}...")
+    try:
+        generator.connect_all()
+        print(f"⚡ Sending traffic for {args.duration:.0f} s...")
+        generator.drive()
+        generator.settle()
+    except KeyboardInterrupt:
+        print("Interrupted - reporting partial results")
+    finally:
+        generator.close()
+
+    results = generator.results()
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+    print_report(results, baseline)
+
+    output = args.output or f"loadtest_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print(f"💾 Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -9,14 +9,29 @@ Choose between Server or Client mode.
 Usage:
     python main.py           # Opens launcher GUI
     python main.py server    # Directly start server
+    python main.py server --headless   # Server without the dashboard
+    python main.py server --metrics-port 9108   # /metrics port (0 = off)
+    python main.py server --trace-rate 0.01     # Trace 1% of messages
+    python main.py server --hot-restart   # Let a later --takeover replace this server
+    python main.py server --takeover   # Hot restart: adopt the running server's sockets
+    python main.py server --tls        # Encrypt client connections
     python main.py client    # Directly start client
+    python main.py client --tls        # Connect over TLS
+    python main.py loadtest  # Bot load generator (see --help)
+    python main.py bench     # Micro-benchmarks vs. stored baseline
+    python main.py soak      # Long-running leak/soak test
+
+Any mode also takes tuning overrides (see tuning.py):
+    python main.py server --config tuned.json --set POOL_WORKERS=8 --set SOCKET_NODELAY=on
 """
 
 import sys
 import tkinter as tk
 from tkinter import ttk
 
-from config import COLORS, FONTS, LOGO, DEFAULT_HOST, DEFAULT_PORT
+import config
+import tuning
+from config import COLORS, FONTS, LOGO
 
 
 # ═══════════════════════════════════════════════════════════════
@@ -166,7 +181,7 @@ class CyberLauncher:
         tk.Label(info_frame, text="💡",
                 font=FONTS['small'],
                 fg=COLORS['accent_cyan'], bg=COLORS['bg_light']).pack(side='left')
-        tk.Label(info_frame, text=f" Default: {DEFAULT_HOST}:{DEFAULT_PORT}  •  Start SERVER first!",
+        tk.Label(info_frame, text=f" Default: {config.DEFAULT_HOST}:{config.DEFAULT_PORT}  •  Start SERVER first!",
                 font=FONTS['tiny'],
                 fg=COLORS['text_secondary'], bg=COLORS['bg_light']).pack(side='left')
         
@@ -228,25 +243,82 @@ class CyberLauncher:
 # MAIN ENTRY POINT
 # ═══════════════════════════════════════════════════════════════
 
+def option_value(args, flag: str, default, convert=str):
+    """
+    The value after `flag` in args, converted (default if the flag is
+    absent). ValueError with a readable message if it is missing or bad.
+    """
+    if flag not in args:
+        return default
+    i = args.index(flag)
+    if i + 1 >= len(args) or args[i + 1].startswith('--'):
+        raise ValueError(f"{flag} needs a value")
+    try:
+        return convert(args[i + 1])
+    except ValueError:
+        raise ValueError(f"{flag}: invalid value {args[i + 1]!r}") from None
+
+
 def main():
     """Main entry point with command-line argument support."""
     
+    # Tuning flags first: server/client modules must see the final values
+    try:
+        argv = tuning.apply_cli(sys.argv[1:])
+    except (ValueError, OSError) as e:
+        print(f"❌ Configuration error: {e}")
+        sys.exit(2)
+    
     # Check for command-line arguments
-    if len(sys.argv) > 1:
-        mode = sys.argv[1].lower()
+    if argv:
+        mode = argv[0].lower()
+        args = argv[1:]
         
         if mode == 'server':
             from server import CyberServer
-            print("⚡ Starting CYBER CHAT Server...")
-            server = CyberServer()
+            from config import (METRICS_PORT, TRACE_SAMPLE_RATE, TLS_ENABLED, UNIX_SOCKET_PATH,
+                                HOT_RESTART)
+            headless = '--headless' in args
+            takeover = '--takeover' in args
+            hot_restart = '--hot-restart' in args or takeover or HOT_RESTART
+            use_tls = '--tls' in args or TLS_ENABLED
+            try:
+                metrics_port = option_value(args, '--metrics-port', METRICS_PORT, int)
+                trace_rate = option_value(args, '--trace-rate', TRACE_SAMPLE_RATE, float)
+                if not 0.0 <= trace_rate <= 1.0:
+                    raise ValueError(f"--trace-rate must be between 0 and 1, got {trace_rate:g}")
+                unix_path = option_value(args, '--unix', UNIX_SOCKET_PATH)
+            except ValueError as e:
+                print(f"❌ {e} (see: python main.py --help)")
+                sys.exit(2)
+            print("⚡ Starting CYBER CHAT Server" + (" (headless)..." if headless else "..."))
+            print(tuning.format_profile())
+            server = CyberServer(headless=headless, metrics_port=metrics_port,
+                                 trace_rate=trace_rate, takeover=takeover,
+                                 use_tls=use_tls, unix_path=unix_path,
+                                 hot_restart=hot_restart)
             server.run()
             
         elif mode == 'client':
             from client import CyberClient
+            from config import TLS_ENABLED
             print("⚡ Starting CYBER CHAT Client...")
-            client = CyberClient()
+            print(tuning.format_profile())
+            client = CyberClient(use_tls='--tls' in args or TLS_ENABLED)
             client.run()
             
+        elif mode == 'loadtest':
+            from loadtest import main as loadtest_main
+            loadtest_main(args)
+            
+        elif mode == 'bench':
+            from benchmarks.micro import main as bench_main
+            sys.exit(bench_main(args))
+            
+        elif mode == 'soak':
+            from soak import main as soak_main
+            sys.exit(soak_main(args))
+            
         elif mode in ['--help', '-h', 'help']:
             print("""
 ╔═══════════════════════════════════════════════════════════╗
@@ -256,9 +328,23 @@ def main():
 ║  Usage:                                                   ║
 ║    python main.py           Launch GUI chooser            ║
 ║    python main.py server    Start server directly         ║
+║      --headless             ...without the dashboard      ║
+║      --hot-restart          ...replaceable by --takeover  ║
+║      --takeover             ...replacing the running one  ║
+║      --tls                  ...encrypting connections     ║
+║      --unix PATH            ...and on a Unix socket       ║
 ║    python main.py client    Start client directly         ║
+║      --tls                  ...over TLS                   ║
+║    python main.py loadtest  Run bot load generator        ║
+║    python main.py bench     Run micro-benchmarks          ║
+║    python main.py soak      Run leak/soak test            ║
 ║    python main.py --help    Show this help                ║
 ║                                                           ║
+║  Tuning (any mode):                                       ║
+║    --config FILE            JSON settings file            ║
+║    --set NAME=VALUE         Override one config.py value  ║
+║    env CYBER_CHAT_<NAME>    Same, from the environment    ║
+║                                                           ║
 ║  Project by: Adir Buskila & Liav Weizman                  ║
 ║                                                           ║
 ╚═══════════════════════════════════════════════════════════╝
@@ -266,7 +352,7 @@ def main():
             
         else:
             print(f"❌ Unknown mode: {mode}")
-            print("   Use: server, client, or --help")
+            print("   Use: server, client, loadtest, bench, soak, or --help")
             
     else:
         # No arguments - show launcher GUI
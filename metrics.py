@@ -0,0 +1,369 @@
+"""
+⚡ CYBER CHAT - Metrics Module
+Prometheus text-format /metrics endpoint served from its own thread
+Students: Adir Buskila & Liav Weizman
+"""
+
+import json
+import math
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from config import METRICS_HOST, METRICS_PORT
+
+
+# Exported latency buckets in seconds (50 µs .. 5 s)
+DEFAULT_BUCKETS = (
+    0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+    0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+# ═══════════════════════════════════════════════════════════════
+# LATENCY HISTOGRAM
+# ═══════════════════════════════════════════════════════════════
+
+SUB_BUCKET_BITS = 5     # 32 sub-buckets per power of two (~3% relative error)
+MAX_MAGNITUDE = 36      # Values up to ~2^41 ns (about 36 minutes)
+
+
+class LatencyHistogram:
+    """
+    HDR-style histogram: nanosecond values land in log-spaced buckets,
+    each power of two split into linear sub-buckets. Recording is a few
+    integer ops, memory is fixed and percentiles keep ~3% precision.
+    """
+
+    HALF = 1 << (SUB_BUCKET_BITS - 1)
+
+    def __init__(self):
+        self.counts = [0] * ((MAX_MAGNITUDE + 2) * self.HALF)
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+        self.lock = threading.Lock()
+
+    @classmethod
+    def _index(cls, ns: int) -> int:
+        magnitude = ns.bit_length() - SUB_BUCKET_BITS
+        if magnitude <= 0:
+            return ns
+        if magnitude > MAX_MAGNITUDE:
+            return (MAX_MAGNITUDE + 2) * cls.HALF - 1  # Clamp into the top bucket
+        return magnitude * cls.HALF + (ns >> magnitude)
+
+    @classmethod
+    def _upper_ns(cls, index: int) -> int:
+        """Largest value that falls in bucket `index`."""
+        if index < 2 * cls.HALF:
+            return index
+        magnitude = index // cls.HALF - 1
+        sub = index - magnitude * cls.HALF
+        return ((sub + 1) << magnitude) - 1
+
+    def record(self, seconds: float):
+        """Record one duration."""
+        ns = int(seconds * 1e9) if seconds > 0 else 0
+        index = self._index(ns)
+        with self.lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.total_ns += ns
+            if ns > self.max_ns:
+                self.max_ns = ns
+
+    def record_many(self, durations: Sequence[float]):
+        """Record a batch of durations under a single lock acquisition."""
+        values = [int(seconds * 1e9) if seconds > 0 else 0 for seconds in durations]
+        indexes = [self._index(ns) for ns in values]
+        with self.lock:
+            counts = self.counts
+            for index in indexes:
+                counts[index] += 1
+            self.count += len(values)
+            self.total_ns += sum(values)
+            self.max_ns = max(self.max_ns, max(values, default=0))
+
+    def _copy(self) -> Tuple[List[int], int, int, int]:
+        with self.lock:
+            return list(self.counts), self.count, self.total_ns, self.max_ns
+
+    def percentile(self, pct: float) -> float:
+        """Value in seconds at or below which pct% of samples fall."""
+        counts, count, _, max_ns = self._copy()
+        return self._percentile(counts, count, max_ns, pct)
+
+    def _percentile(self, counts: List[int], count: int, max_ns: int, pct: float) -> float:
+        if not count:
+            return 0.0
+        rank = max(1, math.ceil(pct / 100 * count))
+        seen = 0
+        for index, c in enumerate(counts):
+            seen += c
+            if seen >= rank:
+                return min(self._upper_ns(index), max_ns) / 1e9
+        return max_ns / 1e9
+
+    def cumulative(self, bounds: Sequence[float]) -> Tuple[List[int], int, float]:
+        """
+        Counts at or below each bound (seconds) plus total count and sum,
+        taken from one consistent copy for fixed-bucket export.
+        """
+        counts, count, total_ns, _ = self._copy()
+        result = []
+        seen = 0
+        index = 0
+        for bound in bounds:
+            limit = bound * 1e9
+            while index < len(counts) and self._upper_ns(index) <= limit:
+                seen += counts[index]
+                index += 1
+            result.append(seen)
+        return result, count, total_ns / 1e9
+
+    def summary(self) -> Dict[str, float]:
+        """Count, mean and the usual percentiles, in milliseconds."""
+        counts, count, total_ns, max_ns = self._copy()
+        result = {'count': count, 'mean_ms': total_ns / count / 1e6 if count else 0.0}
+        for label, pct in (('p50', 50), ('p90', 90), ('p99', 99), ('p999', 99.9)):
+            result[f"{label}_ms"] = self._percentile(counts, count, max_ns, pct) * 1000
+        result['max_ms'] = max_ns / 1e6
+        return result
+
+
+# ═══════════════════════════════════════════════════════════════
+# TEXT EXPOSITION
+# ═══════════════════════════════════════════════════════════════
+
+class MetricsWriter:
+    """Builds a Prometheus text exposition document."""
+
+    def __init__(self, prefix: str = "cyber_"):
+        self.prefix = prefix
+        self.lines: List[str] = []
+
+    @staticmethod
+    def _labels(labels: Optional[Dict[str, str]]) -> str:
+        if not labels:
+            return ""
+        return "{" + ",".join(f'{k}="{v}"' for k, v in labels.items()) + "}"
+
+    def header(self, name: str, kind: str, help_text: str):
+        self.lines.append(f"# HELP {self.prefix}{name} {help_text}")
+        self.lines.append(f"# TYPE {self.prefix}{name} {kind}")
+
+    def sample(self, name: str, value: float, labels: Optional[Dict[str, str]] = None):
+        self.lines.append(f"{self.prefix}{name}{self._labels(labels)} {value:.10g}")
+
+    def metric(self, name: str, kind: str, help_text: str, value: float):
+        """One unlabelled counter or gauge."""
+        self.header(name, kind, help_text)
+        self.sample(name, value)
+
+    def histogram(self, name: str, help_text: str, histogram: LatencyHistogram,
+                  bounds: Sequence[float] = DEFAULT_BUCKETS):
+        """Fold a latency histogram into fixed Prometheus buckets."""
+        buckets, count, total = histogram.cumulative(bounds)
+        self.header(name, 'histogram', help_text)
+        for bound, value in zip(bounds, buckets):
+            self.sample(f"{name}_bucket", value, {'le': f"{bound:g}"})
+        self.sample(f"{name}_bucket", count, {'le': "+Inf"})
+        self.sample(f"{name}_sum", total)
+        self.sample(f"{name}_count", count)
+
+    def render(self) -> str:
+        return "\n".join(self.lines) + "\n"
+
+
+def render_metrics(server, rate: float) -> str:
+    """Read the server's counters and gauges (never blocks message handling)."""
+    writer = MetricsWriter()
+    stats = dict(server.stats)
+    clients = len(server.clients)
+
+    writer.metric('up', 'gauge', "1 while the chat server accepts connections.",
+                  1 if server.running else 0)
+    writer.metric('uptime_seconds', 'gauge', "Seconds since the server started.",
+                  time.time() - server.start_time if server.start_time else 0)
+    writer.metric('clients', 'gauge', "Registered clients.", clients)
+    writer.metric('peak_clients', 'gauge', "Most clients seen at once.", stats['peak_clients'])
+    writer.metric('connections_total', 'counter', "Connections accepted (TCP and Unix socket).",
+                  stats['total_connections'])
+    writer.metric('unix_connections_total', 'counter', "Connections accepted on the Unix socket.",
+                  stats.get('unix_connections', 0))
+    writer.metric('messages_total', 'counter', "Client messages handled.", stats['messages'])
+    writer.metric('message_rate', 'gauge', "Messages per second since the previous scrape.", rate)
+    writer.metric('bytes_sent_total', 'counter', "Bytes sent to clients.", stats['bytes_sent'])
+    writer.metric('bytes_received_total', 'counter', "Bytes received from clients.",
+                  stats['bytes_recv'])
+    writer.metric('tls_handshakes_total', 'counter', "Completed TLS handshakes.",
+                  stats.get('tls_handshakes', 0))
+    writer.metric('tls_resumed_total', 'counter',
+                  "TLS handshakes that resumed a session (no full key exchange).",
+                  stats.get('tls_resumed', 0))
+    writer.metric('threads', 'gauge', "Live Python threads.", threading.active_count())
+    writer.histogram('parse_seconds', "Time to split received bytes into frames.",
+                     server.parse_latency)
+    writer.histogram('fanout_seconds', "Time to hand one chat message to every recipient.",
+                     server.fanout_latency)
+    writer.histogram('send_seconds', "Time to hand a frame to one recipient's socket or outbox.",
+                     server.send_latency)
+    writer.histogram('delivery_lag_seconds', "Time from sending a frame to its ACK (reliable clients).",
+                     server.delivery_lag)
+
+    reliable = [d for d in server.delivery_report() if d['reliable']]
+    writer.metric('reliable_sessions', 'gauge', "Sessions in reliable (ACKed) mode.", len(reliable))
+    writer.metric('unacked_frames', 'gauge', "Frames sent but not yet acknowledged.",
+                  sum(d['unacked'] for d in reliable))
+    writer.metric('unacked_frames_max', 'gauge', "Largest unacknowledged window of one client.",
+                  max((d['unacked'] for d in reliable), default=0))
+    writer.metric('replay_overflow_total', 'counter',
+                  "Unacknowledged frames pushed out of a full replay window.",
+                  sum(d['overflowed'] for d in reliable))
+
+    typing = server.typing
+    writer.metric('typing_reports_total', 'counter', "TYPING reports received from clients.",
+                  typing.reports)
+    writer.metric('typing_frames_total', 'counter', "Aggregated TYPING frames sent.",
+                  typing.frames_sent)
+    writer.metric('typing_dropped_total', 'counter',
+                  "TYPING frames skipped for clients behind on writes.", typing.frames_dropped)
+
+    presence = server.presence
+    writer.metric('presence_changes_total', 'counter', "STATUS changes received from clients.",
+                  presence.changes)
+    writer.metric('presence_updates_total', 'counter',
+                  "Per-user presence updates sent after merging.", presence.updates_sent)
+    writer.metric('presence_frames_total', 'counter', "Batched PRESENCE frames sent.",
+                  presence.frames_sent)
+
+    files = server.files
+    writer.metric('file_transfers_active', 'gauge', "File transfers offered or in progress.",
+                  files.active())
+    writer.metric('file_transfers_completed_total', 'counter', "File transfers delivered.",
+                  files.completed)
+    writer.metric('file_bytes_relayed_total', 'counter',
+                  "File bytes relayed between users, resends included.", files.bytes_relayed)
+
+    group = server.multicast
+    if group is not None:
+        group_stats = group.stats()
+        writer.metric('multicast_members', 'gauge',
+                      "Sessions taking broadcasts from the multicast group.",
+                      sum(1 for s in server.sessions.snapshot() if s.multicast is not None))
+        writer.metric('multicast_frames_total', 'counter',
+                      "Broadcast frames sent once to the multicast group.", group_stats['seq'])
+        writer.metric('multicast_datagrams_total', 'counter',
+                      "Datagrams sent to the group, heartbeats included.", group_stats['datagrams'])
+        writer.metric('multicast_bytes_total', 'counter', "Bytes sent to the multicast group.",
+                      group_stats['bytes_sent'])
+        writer.metric('multicast_send_errors_total', 'counter',
+                      "Group sends that failed (left to NACK repair).", group_stats['send_errors'])
+        writer.metric('multicast_nacks_total', 'counter', "NACK repair requests from members.",
+                      group_stats['nacks'])
+        writer.metric('multicast_repaired_frames_total', 'counter',
+                      "Group frames resent over TCP after a NACK.", group_stats['repaired'])
+        writer.metric('multicast_lost_frames_total', 'counter',
+                      "NACKed frames already gone from the repair window.", group_stats['lost'])
+
+    pool = server.pool
+    if pool is not None:
+        pool_stats = pool.stats(sample=False)
+        writer.metric('pool_workers', 'gauge', "Selector worker loops.", pool_stats['workers'])
+        writer.metric('pool_max_connections', 'gauge', "Connection cap across all workers.",
+                      pool_stats['max_connections'])
+        writer.metric('pool_queue_depth', 'gauge', "Accepted sockets waiting for a worker.",
+                      pool_stats['queue_depth'])
+        writer.metric('pool_queue_wait_seconds_max', 'gauge',
+                      "Longest accept-to-worker hand-off.", pool_stats['queue_wait_max_ms'] / 1000)
+        writer.metric('pool_outbox_bytes', 'gauge', "Bytes queued in client outboxes.",
+                      pool_stats['outbox_bytes'])
+        writer.metric('pool_dropped_frames_total', 'counter',
+                      "Frames discarded when slow clients were cut off.",
+                      pool_stats['dropped_frames'])
+        writer.metric('pool_rejected_total', 'counter', "Connections refused at capacity.",
+                      pool_stats['rejected'])
+
+        writer.header('pool_connections', 'gauge', "Sockets owned by each worker.")
+        for i, worker in enumerate(pool_stats['per_worker']):
+            writer.sample('pool_connections', worker['connections'], {'worker': str(i)})
+        writer.header('pool_busy_seconds_total', 'counter', "Time each worker spent handling events.")
+        for i, worker in enumerate(pool_stats['per_worker']):
+            writer.sample('pool_busy_seconds_total', worker['busy_seconds'], {'worker': str(i)})
+
+    return writer.render()
+
+
+# ═══════════════════════════════════════════════════════════════
+# HTTP ENDPOINT
+# ═══════════════════════════════════════════════════════════════
+
+class MetricsServer(threading.Thread):
+    """
+    Serves GET /metrics (Prometheus text), /latency (JSON percentiles),
+    /delivery (per-client ACK state as JSON) and /traces (sampled traces
+    as JSON lines) on its own thread, separate from the chat sockets.
+    """
+
+    def __init__(self, server, host: str = METRICS_HOST, port: int = METRICS_PORT):
+        super().__init__(name="metrics-http", daemon=True)
+        self.server = server
+        self.rate_lock = threading.Lock()
+        self.last_scrape = (time.monotonic(), server.stats['messages'])
+
+        exporter = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                path = self.path.split('?', 1)[0]
+                if path == '/metrics':
+                    body = render_metrics(exporter.server, exporter.message_rate()).encode()
+                    content_type = CONTENT_TYPE
+                elif path == '/latency':
+                    body = json.dumps(exporter.server.latency_summary(), indent=2).encode()
+                    content_type = "application/json"
+                elif path == '/delivery':
+                    body = json.dumps(exporter.server.delivery_report(), indent=2).encode()
+                    content_type = "application/json"
+                elif path == '/traces':
+                    body = "".join(json.dumps(t) + "\n"
+                                   for t in exporter.server.tracer.snapshot()).encode()
+                    content_type = "application/x-ndjson"
+                else:
+                    self.send_error(404, "Try /metrics, /latency, /delivery or /traces")
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # Scrapes every few seconds would flood the server log
+
+        # Bind now so a busy port is reported by start_server()
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        return self.httpd.server_address[:2]
+
+    def message_rate(self) -> float:
+        """Messages per second since the previous scrape."""
+        now, messages = time.monotonic(), self.server.stats['messages']
+        with self.rate_lock:
+            then, before = self.last_scrape
+            self.last_scrape = (now, messages)
+        return (messages - before) / (now - then) if now > then else 0.0
+
+    def run(self):
+        self.httpd.serve_forever(poll_interval=0.5)
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
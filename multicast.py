@@ -0,0 +1,400 @@
+"""
+⚡ CYBER CHAT - Multicast Module
+Broadcast fan-out over UDP multicast, repaired over TCP
+Students: Adir Buskila & Liav Weizman
+
+With MULTICAST_ENABLED the server sends each chat broadcast and SYSTEM
+notice once to MULTICAST_GROUP:MULTICAST_PORT instead of once per TCP
+connection. Every datagram holds one frame and a group-wide number:
+
+    MC|n|skip|MSG|[alice]: hi       skip: user who must not show it ("" = nobody)
+    MCHB|n                          heartbeat - n is the latest number sent
+
+A client on the same network opts in with MULTICAST after logging in and
+is told where to listen:
+
+    MULTICAST|group:port:n          frames after n come from the group
+
+Frames up to n still reach it over TCP, so none fall between the two.
+The sender's own SENT echo, private messages, user lists and all control
+frames stay on TCP; so does everything for TLS clients (the group is
+cleartext) and for clients that never opt in.
+
+UDP may lose or reorder datagrams. The receiver delivers in number order
+and holds early frames back; a gap that is still open after
+MULTICAST_NACK_DELAY is requested over TCP with NACK:first-last. The
+server resends from its last MULTICAST_REPAIR_FRAMES frames as MC| lines
+on the connection, and answers MCLOST|first-last for any that are gone.
+Only members are repaired, only from the frame after the one they joined
+at, and one NACK gets at most MULTICAST_REPAIR_BYTES of frames - the rest
+of its range is answered as lost, so a repair never floods the outbox.
+
+Group frames are not part of the per-session sequence: RESUME replays
+only what was sent over TCP, and a member that was away catches up on
+the group by NACK.
+"""
+
+import base64
+import socket
+import threading
+import time
+from collections import deque
+from itertools import islice
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from config import (
+    MULTICAST_GROUP, MULTICAST_PORT, MULTICAST_TTL, MULTICAST_INTERFACE,
+    MULTICAST_REPAIR_FRAMES, MULTICAST_REPAIR_BYTES, MULTICAST_HEARTBEAT, MULTICAST_NACK_DELAY,
+    MULTICAST_RCVBUF
+)
+from activity import Ticker
+
+
+NACK_RETRY = 0.5        # Seconds before the same gap is requested again
+NACK_MAX_RANGES = 8     # Gaps requested per check
+
+
+def parse_range(text: str) -> Optional[Tuple[int, int]]:
+    """'first-last' → (first, last), or None if malformed."""
+    first, sep, last = text.strip().partition("-")
+    if not sep or not first.isdigit() or not last.isdigit() or int(first) > int(last):
+        return None
+    return int(first), int(last)
+
+
+def _interface(address: str) -> bytes:
+    """Packed IPv4 address of the interface to use ('' or wildcard: let the OS pick)."""
+    if not address or address == '0.0.0.0':
+        return socket.inet_aton('0.0.0.0')
+    return socket.inet_aton(socket.gethostbyname(address))
+
+
+# ═══════════════════════════════════════════════════════════════
+# SERVER SIDE
+# ═══════════════════════════════════════════════════════════════
+
+class MulticastFanout(Ticker):
+    """Numbers broadcast frames, sends each once to the group and keeps them for repair."""
+
+    name = "multicast-heartbeat"
+
+    def __init__(self, group: str = MULTICAST_GROUP, port: int = MULTICAST_PORT,
+                 ttl: int = MULTICAST_TTL, interface: str = MULTICAST_INTERFACE,
+                 capacity: int = MULTICAST_REPAIR_FRAMES, heartbeat: float = MULTICAST_HEARTBEAT):
+        super().__init__(heartbeat)
+        self.group = group
+        self.port = port
+        self.ttl = ttl
+        self.interface = interface
+        self.seq = 0
+        self.ring: Deque[Tuple[int, bytes]] = deque(maxlen=capacity)  # (n, datagram)
+        self.sock: Optional[socket.socket] = None
+
+        # Accounting
+        self.datagrams = 0
+        self.bytes_sent = 0
+        self.send_errors = 0
+        self.nacks = 0
+        self.repaired = 0               # Frames resent over TCP
+        self.lost = 0                   # Frames asked for after they left the window
+
+    def open(self):
+        """Create the sending socket (raises OSError if multicast is unavailable)."""
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+        try:
+            sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, self.ttl)
+            sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_LOOP, 1)  # Same-host clients
+            sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_IF, _interface(self.interface))
+        except OSError:
+            sock.close()
+            raise
+        self.sock = sock
+
+    def close(self):
+        sock, self.sock = self.sock, None
+        if sock is not None:
+            try:
+                sock.close()
+            except OSError:
+                pass
+
+    @property
+    def address(self) -> str:
+        return f"{self.group}:{self.port}"
+
+    def _send(self, datagram: bytes):
+        try:
+            self.sock.sendto(datagram, (self.group, self.port))
+            self.datagrams += 1
+            self.bytes_sent += len(datagram)
+        except (OSError, AttributeError):
+            self.send_errors += 1  # Receivers notice the gap and NACK it
+
+    def publish(self, frame: bytes, skip: str = '') -> int:
+        """Send one frame to the group; returns its number."""
+        with self.lock:
+            self.seq += 1
+            datagram = b"MC|%d|%s|" % (self.seq, skip.encode()) + frame
+            self.ring.append((self.seq, datagram))
+            self._send(datagram)  # Under the lock: datagrams leave in number order
+            return self.seq
+
+    def join(self, session) -> int:
+        """
+        Make a session a member: group frames after the returned number
+        reach it by multicast only. Recorded under the lock, so a frame
+        being published goes either to the group or over TCP, never neither.
+        """
+        with self.lock:
+            session.multicast = self.seq
+            return self.seq
+
+    def repair(self, first: int, last: int, budget: int = MULTICAST_REPAIR_BYTES
+               ) -> Tuple[List[bytes], List[Tuple[int, int]]]:
+        """
+        Frames first..last still in the window, up to `budget` bytes, and
+        the ranges left out: those that are gone and any over the budget.
+        """
+        with self.lock:
+            self.nacks += 1
+            last = min(last, self.seq)
+            if first > last:
+                return [], []
+            oldest = self.ring[0][0] if self.ring else self.seq + 1
+            lost = [(first, min(last, oldest - 1))] if first < oldest else []
+            frames = []
+            size = 0
+            start = max(first, oldest)
+            window = islice(self.ring, start - oldest, last - oldest + 1) if last >= oldest else ()
+            for number, datagram in window:
+                if frames and size + len(datagram) > budget:
+                    lost.append((number, last))
+                    break
+                frames.append(datagram)
+                size += len(datagram)
+            self.repaired += len(frames)
+            self.lost += sum(end - start + 1 for start, end in lost)
+            return frames, lost
+
+    def flush(self):
+        """Heartbeat: lets receivers notice that the latest frames never arrived."""
+        with self.lock:
+            if self.seq:
+                self._send(b"MCHB|%d\n" % self.seq)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'seq': self.seq,
+            'datagrams': self.datagrams,
+            'bytes_sent': self.bytes_sent,
+            'send_errors': self.send_errors,
+            'nacks': self.nacks,
+            'repaired': self.repaired,
+            'lost': self.lost,
+        }
+
+    def export_state(self) -> Dict[str, Any]:
+        """Numbering and repair window for a hot restart."""
+        with self.lock:
+            return {
+                'seq': self.seq,
+                'ring': [[n, base64.b64encode(d).decode()] for n, d in self.ring],
+            }
+
+    def restore(self, state: Optional[Dict[str, Any]]):
+        if not state:
+            return
+        with self.lock:
+            self.seq = state['seq']
+            self.ring.clear()
+            self.ring.extend((n, base64.b64decode(d)) for n, d in state['ring'])
+
+
+# ═══════════════════════════════════════════════════════════════
+# CLIENT SIDE
+# ═══════════════════════════════════════════════════════════════
+
+class MulticastReceiver:
+    """
+    Group socket plus reordering: listen() joins the group before asking
+    for MULTICAST, start() takes the reply. deliver(frame) gets each frame in
+    number order, request(line) sends a NACK over TCP (False while
+    disconnected - it is retried), lost(count) reports frames the server
+    could no longer repair. Repairs and MCLOST come in through accept().
+    """
+
+    def __init__(self, username: str, deliver: Callable[[str], None],
+                 request: Callable[[str], bool], lost: Callable[[int], None],
+                 nack_delay: float = MULTICAST_NACK_DELAY):
+        self.username = username
+        self.deliver = deliver
+        self.request = request
+        self.on_lost = lost
+        self.nack_delay = nack_delay
+        self.lock = threading.Lock()
+        self.sock: Optional[socket.socket] = None
+        self.group: Optional[Tuple[str, int]] = None
+        self.running = False
+
+        self.started = False                    # MULTICAST| reply seen: numbering known
+        self.expected = 1                       # Next number to deliver
+        self.latest = 0                         # Highest number known to exist
+        self.held: Dict[int, Tuple[str, str]] = {}  # Arrived early: {n: (skip, frame)}
+        self.gaps: Dict[int, Tuple[float, float]] = {}  # {first missing: (noticed, NACKed)}
+
+        # Accounting
+        self.received = 0
+        self.duplicates = 0
+        self.nacks = 0
+        self.lost = 0
+
+    def listen(self, group: str, port: int, interface: str = MULTICAST_INTERFACE):
+        """Join group:port (raises OSError if this host cannot)."""
+        if self.group == (group, port):
+            return
+        self.close()
+        self.sock = self._open(group, port, interface)
+        self.group = (group, port)
+        self.running = True
+        threading.Thread(target=self._run, args=(self.sock,),
+                         name="multicast-recv", daemon=True).start()
+
+    def start(self, seq: int):
+        """MULTICAST| reply: frames up to seq came over TCP, the rest come from here."""
+        with self.lock:
+            if not self.started:
+                self.expected = seq + 1
+                self.latest = seq
+                self.started = True
+
+    @staticmethod
+    def _open(group: str, port: int, interface: str) -> socket.socket:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+        try:
+            # Every client on this host binds the same port and gets its own copy
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            if hasattr(socket, 'SO_REUSEPORT'):
+                try:
+                    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+                except OSError:
+                    pass
+            if MULTICAST_RCVBUF:
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, MULTICAST_RCVBUF)
+            sock.bind(('', port))
+            sock.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP,
+                            socket.inet_aton(group) + _interface(interface))
+        except OSError:
+            sock.close()
+            raise
+        return sock
+
+    def close(self):
+        self.running = False
+        sock, self.sock = self.sock, None
+        self.group = None
+        if sock is not None:
+            try:
+                sock.close()
+            except OSError:
+                pass
+
+    # ─────────────────────────────────────────────────────────────
+    # FRAMES
+    # ─────────────────────────────────────────────────────────────
+
+    def accept(self, line: str):
+        """One MC|, MCHB| or MCLOST| line, from the group or from a TCP repair."""
+        kind, _, rest = line.partition("|")
+        if kind == "MC":
+            number, _, rest = rest.partition("|")
+            skip, _, frame = rest.partition("|")
+            if number.isdigit():
+                self._frame(int(number), skip, frame)
+        elif kind == "MCHB" and rest.isdigit() and self.started:
+            with self.lock:
+                self.latest = max(self.latest, int(rest))
+                self._advance()
+        elif kind == "MCLOST":
+            gone = parse_range(rest)
+            if gone:
+                self._give_up(*gone)
+
+    def _frame(self, number: int, skip: str, frame: str):
+        with self.lock:
+            if not self.started:
+                return  # Before the reply: it may have come over TCP, else it is NACKed
+            if number < self.expected or number in self.held:
+                self.duplicates += 1
+                return
+            self.received += 1
+            self.held[number] = (skip, frame)
+            self.latest = max(self.latest, number)
+            self._advance()
+
+    def _give_up(self, first: int, last: int):
+        with self.lock:
+            missing = [n for n in range(max(first, self.expected), last + 1) if n not in self.held]
+            for number in missing:
+                self.held[number] = ('', '')  # Delivered as nothing
+            self.lost += len(missing)
+            self.latest = max(self.latest, last)
+            self._advance()
+        if missing:
+            self.on_lost(len(missing))
+
+    def _advance(self):
+        """Deliver everything now in order (hold `lock` - keeps delivery ordered)."""
+        while self.expected in self.held:
+            skip, frame = self.held.pop(self.expected)
+            self.expected += 1
+            if frame and skip != self.username:
+                try:
+                    self.deliver(frame)
+                except Exception:
+                    pass
+
+    # ─────────────────────────────────────────────────────────────
+    # GAP REPAIR
+    # ─────────────────────────────────────────────────────────────
+
+    def check_gaps(self):
+        """NACK each gap that has stayed open longer than the reorder allowance."""
+        now = time.monotonic()
+        requests = []
+        with self.lock:
+            if not self.started or self.latest < self.expected:
+                self.gaps.clear()
+                return
+            gaps = {}
+            previous = self.expected - 1
+            for number in sorted(self.held) + [self.latest + 1]:
+                if number > previous + 1:
+                    first = previous + 1
+                    noticed, nacked = self.gaps.get(first, (now, 0.0))
+                    if (now - noticed >= self.nack_delay and now - nacked >= NACK_RETRY
+                            and len(requests) < NACK_MAX_RANGES):
+                        requests.append((first, number - 1))
+                        nacked = now
+                    gaps[first] = (noticed, nacked)
+                previous = number
+            self.gaps = gaps
+        for first, last in requests:
+            if self.request(f"NACK:{first}-{last}"):
+                self.nacks += 1
+
+    def _run(self, sock: socket.socket):
+        sock.settimeout(max(self.nack_delay, 0.01))
+        while self.running and sock is self.sock:
+            try:
+                data = sock.recv(65536)
+            except socket.timeout:
+                data = b''
+            except OSError:
+                return
+            if data:
+                self.datagram(data)
+            self.check_gaps()
+
+    def datagram(self, data: bytes):
+        """One datagram off the group socket."""
+        self.accept(data.rstrip(b'\n').decode(errors='replace'))
@@ -0,0 +1,443 @@
+"""
+⚡ CYBER CHAT - Connection Pool Module
+Selector-based worker loops that multiplex client sockets
+Students: Adir Buskila & Liav Weizman
+"""
+
+import queue
+import selectors
+import socket
+import ssl
+import threading
+import time
+from typing import Any, Dict, List, Tuple
+
+from config import (
+    BUFFER_SIZE, CLOSE_LINGER, POOL_MAX_CONNECTIONS, POOL_TICK_SECONDS, POOL_WORKERS,
+    TLS_HANDSHAKE_TIMEOUT
+)
+
+
+# ═══════════════════════════════════════════════════════════════
+# SELECTOR WORKER
+# ═══════════════════════════════════════════════════════════════
+
+class SelectorWorker(threading.Thread):
+    """
+    One event loop serving many client sockets.
+    Reads are dispatched to the server; writes drain each connection's outbox.
+    """
+
+    def __init__(self, server, index: int):
+        super().__init__(name=f"pool-worker-{index}", daemon=True)
+        self.server = server
+        self.selector = selectors.DefaultSelector()
+        self.running = False
+
+        # Wakeup channel so other threads can interrupt select()
+        self.wake_r, self.wake_w = socket.socketpair()
+        self.wake_r.setblocking(False)
+        self.wake_w.setblocking(False)
+        self.selector.register(self.wake_r, selectors.EVENT_READ, None)
+
+        # Connections handed over by the accept thread: (conn, enqueued_at)
+        self.inbox: "queue.SimpleQueue" = queue.SimpleQueue()
+        self.connections = set()
+
+        # Connections whose write interest or close state changed
+        self.pending = set()
+        self.pending_lock = threading.Lock()
+        self.lingering: Dict[Any, float] = {}  # {conn: close deadline}
+        self.handshakes: Dict[Any, float] = {}  # {conn: TLS handshake deadline}
+
+        # Accounting
+        self.busy_time = 0.0
+        self.sampled_at = time.perf_counter()
+        self.sampled_busy = 0.0
+        self.queue_wait_total = 0.0
+        self.queue_wait_max = 0.0
+        self.handoffs = 0
+        self.dropped_frames = 0
+
+    # ─────────────────────────────────────────────────────────────
+    # CROSS-THREAD API
+    # ─────────────────────────────────────────────────────────────
+
+    def submit(self, conn):
+        """Hand a new connection to this worker."""
+        self.inbox.put((conn, time.perf_counter()))
+        self._wake()
+
+    def notify(self, conn):
+        """Ask the loop to re-check a connection's outbox or close state."""
+        with self.pending_lock:
+            self.pending.add(conn)
+        if threading.current_thread() is not self:
+            self._wake()
+
+    def load(self) -> int:
+        """Number of sockets owned or about to be owned by this worker."""
+        return len(self.connections) + self.inbox.qsize()
+
+    def _wake(self):
+        try:
+            self.wake_w.send(b'\0')
+        except (BlockingIOError, OSError):
+            pass  # Already signalled (or shutting down)
+
+    # ─────────────────────────────────────────────────────────────
+    # EVENT LOOP
+    # ─────────────────────────────────────────────────────────────
+
+    def run(self):
+        """Serve sockets until stopped."""
+        self.running = True
+        while self.running:
+            events = self.selector.select(timeout=POOL_TICK_SECONDS)
+            started = time.perf_counter()
+            self.server.profiler.attach()
+
+            for key, mask in events:
+                conn = key.data
+                if conn is None:
+                    self._drain_wakeups()
+                    continue
+                if conn.handshaking:
+                    if conn in self.connections:
+                        self._handshake(conn)
+                    continue
+                if mask & selectors.EVENT_WRITE:
+                    self._on_writable(conn)
+                if mask & selectors.EVENT_READ and conn in self.connections:
+                    self._on_readable(conn)
+
+            self._process_handoffs()
+            self._process_pending()
+            self._process_lingering()
+            self._process_handshakes()
+
+            self.busy_time += time.perf_counter() - started
+
+    def stop(self):
+        """Stop the loop and close every socket it owns."""
+        self.running = False
+        self._wake()
+        if self.is_alive() and threading.current_thread() is not self:
+            self.join(timeout=2)
+
+        for conn in list(self.connections):
+            self._close(conn)
+        while not self.inbox.empty():
+            conn, _ = self.inbox.get_nowait()
+            self._close_socket(conn)
+
+        for sock in (self.wake_r, self.wake_w):
+            try:
+                sock.close()
+            except Exception:
+                pass
+        self.selector.close()
+
+    def detach(self) -> List[Any]:
+        """
+        Stop the loop but leave every socket open (hot restart).
+        Returns the connections it owned or had queued.
+        """
+        self.running = False
+        self._wake()
+        if self.is_alive() and threading.current_thread() is not self:
+            self.join(timeout=2)
+
+        conns = list(self.connections)
+        while not self.inbox.empty():
+            conns.append(self.inbox.get_nowait()[0])
+        self.connections.clear()
+        self.lingering.clear()
+        self.handshakes.clear()
+
+        for sock in (self.wake_r, self.wake_w):
+            try:
+                sock.close()
+            except Exception:
+                pass
+        self.selector.close()
+        for conn in conns:
+            conn.worker = None
+        return conns
+
+    def _drain_wakeups(self):
+        try:
+            while self.wake_r.recv(BUFFER_SIZE):
+                pass
+        except (BlockingIOError, OSError):
+            pass
+
+    def _process_handoffs(self):
+        """Register connections handed over since the last iteration."""
+        while True:
+            try:
+                conn, enqueued_at = self.inbox.get_nowait()
+            except queue.Empty:
+                return
+
+            wait = time.perf_counter() - enqueued_at
+            self.queue_wait_total += wait
+            self.queue_wait_max = max(self.queue_wait_max, wait)
+            self.handoffs += 1
+
+            try:
+                self.selector.register(conn.socket, self._interest(conn), conn)
+            except (ValueError, OSError):
+                self._close_socket(conn)
+                self.server.release_client(conn)
+                continue
+            self.connections.add(conn)
+            if conn.handshaking:
+                self.handshakes[conn] = time.monotonic() + TLS_HANDSHAKE_TIMEOUT
+            if conn.closing:
+                self.notify(conn)
+
+    def _process_pending(self):
+        """Apply outbox and close-state changes flagged by other threads."""
+        with self.pending_lock:
+            pending, self.pending = self.pending, set()
+
+        for conn in pending:
+            if conn not in self.connections:
+                continue  # Registration picks the state up
+            if conn.closing:
+                if not conn.outbox:
+                    self._close(conn)
+                    continue
+                self.lingering.setdefault(conn, conn.linger_until or time.monotonic() + CLOSE_LINGER)
+            if conn.handshaking:
+                continue  # Interest follows the handshake until it completes
+            self.selector.modify(conn.socket, self._interest(conn), conn)
+
+    def _process_lingering(self):
+        """Force-close connections that could not flush in time."""
+        if not self.lingering:
+            return
+        now = time.monotonic()
+        for conn, deadline in list(self.lingering.items()):
+            if now >= deadline:
+                self._close(conn)
+
+    def _process_handshakes(self):
+        """Drop TLS clients that stall mid-handshake."""
+        if not self.handshakes:
+            return
+        now = time.monotonic()
+        for conn, deadline in list(self.handshakes.items()):
+            if now >= deadline:
+                self._close(conn)
+
+    # ─────────────────────────────────────────────────────────────
+    # SOCKET EVENTS
+    # ─────────────────────────────────────────────────────────────
+
+    def _interest(self, conn) -> int:
+        if conn.outbox:
+            return selectors.EVENT_READ | selectors.EVENT_WRITE
+        return selectors.EVENT_READ
+
+    def _handshake(self, conn):
+        """Advance a non-blocking TLS handshake by one step."""
+        try:
+            conn.socket.do_handshake()
+        except ssl.SSLWantReadError:
+            self.selector.modify(conn.socket, selectors.EVENT_READ, conn)
+            return
+        except ssl.SSLWantWriteError:
+            self.selector.modify(conn.socket, selectors.EVENT_READ | selectors.EVENT_WRITE, conn)
+            return
+        except OSError:
+            self._close(conn)  # Bad certificate, plaintext client, reset...
+            return
+
+        with conn.send_lock:
+            conn.handshaking = False
+        self.handshakes.pop(conn, None)
+        self.server.on_tls_established(conn.socket)
+        self.notify(conn)  # Flush what was queued meanwhile (WELCOME)
+        if conn.socket.pending():
+            self._on_readable(conn)
+
+    def _on_readable(self, conn):
+        while True:
+            try:
+                data = conn.socket.recv(BUFFER_SIZE)
+            except (BlockingIOError, InterruptedError,
+                    ssl.SSLWantReadError, ssl.SSLWantWriteError):
+                return
+            except OSError:
+                data = b''
+
+            if not data:
+                self._close(conn)
+                return
+            if conn.closing:
+                return  # Input after QUIT/KICK is ignored
+
+            try:
+                keep = self.server.on_client_data(conn, data)
+            except Exception as e:
+                self.server.ui_call(self.server.log, f"Client error: {e}", 'error')
+                keep = False
+            if not keep:
+                conn.close()
+                return
+            # TLS may hold decrypted bytes the selector cannot see
+            if not isinstance(conn.socket, ssl.SSLSocket) or not conn.socket.pending():
+                return
+
+    def _on_writable(self, conn):
+        if conn not in self.connections:
+            return
+        drained = conn.flush()
+        if conn.closing and drained:
+            self._close(conn)
+        elif drained:
+            self.selector.modify(conn.socket, selectors.EVENT_READ, conn)
+
+    def _close(self, conn):
+        """Unregister, close and release a connection."""
+        if conn not in self.connections:
+            return
+        self.connections.discard(conn)
+        self.lingering.pop(conn, None)
+        self.handshakes.pop(conn, None)
+        try:
+            self.selector.unregister(conn.socket)
+        except (KeyError, ValueError, OSError):
+            pass
+        self._close_socket(conn)
+        self.server.release_client(conn)
+
+    def _close_socket(self, conn):
+        if conn.outbox:
+            conn.cut_off = True  # Closed before everything was written
+        conn.closing = True
+        try:
+            conn.socket.close()
+        except Exception:
+            pass
+
+
+# ═══════════════════════════════════════════════════════════════
+# CONNECTION POOL
+# ═══════════════════════════════════════════════════════════════
+
+class ConnectionPool:
+    """Bounded set of selector workers sharing the server's client sockets."""
+
+    def __init__(self, server, workers: int = POOL_WORKERS,
+                 max_connections: int = POOL_MAX_CONNECTIONS):
+        self.server = server
+        self.max_connections = max_connections
+        self.workers: List[SelectorWorker] = [
+            SelectorWorker(server, i) for i in range(workers)
+        ]
+        self.rejected = 0
+        self.draining = False  # Set by drain(): submit() refuses from then on
+
+    def start(self):
+        """Start all worker loops."""
+        for worker in self.workers:
+            worker.start()
+
+    def stop(self):
+        """Stop all worker loops and close their sockets."""
+        for worker in self.workers:
+            worker.stop()
+
+    def detach(self) -> List[Any]:
+        """Stop all worker loops without closing sockets; returns their connections."""
+        return [conn for worker in self.workers for conn in worker.detach()]
+
+    def drain(self, farewell: bytes, deadline: float) -> Tuple[int, int]:
+        """
+        Queue a farewell frame on every connection and let all workers
+        flush in parallel until `deadline` (time.monotonic()). Anything still
+        open is closed by stop(). Returns (drained cleanly, cut off).
+        Connections still in a worker's inbox are registered first, so they
+        get the farewell too; new ones are refused.
+        """
+        self.draining = True
+        while time.monotonic() < deadline and any(not w.inbox.empty() for w in self.workers):
+            time.sleep(0.01)
+        
+        conns = [conn for worker in self.workers for conn in list(worker.connections)]
+        for conn in conns:
+            conn.send(farewell)
+            conn.close(linger_until=deadline)
+        
+        while time.monotonic() < deadline and any(w.connections for w in self.workers):
+            time.sleep(0.02)
+        unregistered = sum(worker.inbox.qsize() for worker in self.workers)
+        self.stop()
+        
+        cut_off = sum(1 for conn in conns if conn.cut_off) + unregistered
+        return len(conns) + unregistered - cut_off, cut_off
+
+    def submit(self, conn) -> bool:
+        """
+        Assign a connection to the least loaded worker.
+        Returns False if the pool is at capacity or draining.
+        """
+        if self.draining:
+            return False
+        loads = [worker.load() for worker in self.workers]
+        if sum(loads) >= self.max_connections:
+            self.rejected += 1
+            return False
+
+        worker = self.workers[loads.index(min(loads))]
+        conn.socket.setblocking(False)
+        conn.worker = worker
+        worker.submit(conn)
+        return True
+
+    def stats(self, sample: bool = True) -> Dict[str, Any]:
+        """
+        Snapshot of pool health. Utilization covers the time since the
+        previous sampling call, so a periodic caller sees a rolling value;
+        pass sample=False to read without moving that window.
+        """
+        now = time.perf_counter()
+        per_worker = []
+        wait_total = 0.0
+        wait_max = 0.0
+        handoffs = 0
+
+        for worker in self.workers:
+            busy = worker.busy_time
+            window = now - worker.sampled_at
+            utilization = (busy - worker.sampled_busy) / window if window > 0 else 0.0
+            if sample:
+                worker.sampled_at, worker.sampled_busy = now, busy
+
+            per_worker.append({
+                'connections': len(worker.connections),
+                'utilization': min(utilization, 1.0),
+                'busy_seconds': busy,
+            })
+            wait_total += worker.queue_wait_total
+            wait_max = max(wait_max, worker.queue_wait_max)
+            handoffs += worker.handoffs
+
+        return {
+            'workers': len(self.workers),
+            'connections': sum(w['connections'] for w in per_worker),
+            'max_connections': self.max_connections,
+            'utilization': (sum(w['utilization'] for w in per_worker) / len(per_worker)
+                            if per_worker else 0.0),
+            'queue_depth': sum(worker.inbox.qsize() for worker in self.workers),
+            'queue_wait_avg_ms': (wait_total / handoffs * 1000) if handoffs else 0.0,
+            'queue_wait_max_ms': wait_max * 1000,
+            'outbox_bytes': sum(conn.outbox_bytes for worker in self.workers
+                                for conn in list(worker.connections)),
+            'dropped_frames': sum(worker.dropped_frames for worker in self.workers),
+            'rejected': self.rejected,
+            'per_worker': per_worker,
+        }
@@ -0,0 +1,218 @@
+"""
+⚡ CYBER CHAT - Profiler Module
+On-demand cProfile / stack-sampling sessions for a running server
+Students: Adir Buskila & Liav Weizman
+"""
+
+import cProfile
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Callable, List, Optional, Tuple
+
+from config import (
+    PROFILE_DIR, PROFILE_DEFAULT_SECONDS, PROFILE_MAX_SECONDS,
+    PROFILE_SAMPLE_INTERVAL
+)
+
+
+PROFILE_MODES = ('sample', 'cprofile')
+
+
+# ═══════════════════════════════════════════════════════════════
+# STACK SAMPLER
+# ═══════════════════════════════════════════════════════════════
+
+class StackSampler(threading.Thread):
+    """
+    Low-overhead profiler: snapshots every thread's stack at a fixed
+    interval and counts identical stacks (collapsed-stack format).
+    """
+
+    def __init__(self, interval: float = PROFILE_SAMPLE_INTERVAL):
+        super().__init__(name="profiler-sampler", daemon=True)
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.stop_event = threading.Event()
+
+    def run(self):
+        own = threading.get_ident()
+        while not self.stop_event.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                self.stacks[self._collapse(names.get(ident, str(ident)), frame)] += 1
+            self.samples += 1
+
+    @staticmethod
+    def _collapse(thread_name: str, frame) -> str:
+        """Render a frame chain as 'thread;outer;...;inner'."""
+        parts = []
+        while frame is not None:
+            code = frame.f_code
+            parts.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:"
+                         f"{code.co_firstlineno})")
+            frame = frame.f_back
+        parts.append(thread_name)
+        return ";".join(part.replace(";", ":") for part in reversed(parts))
+
+    def dump(self, path: str):
+        """Write one 'stack count' line per distinct stack."""
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+# ═══════════════════════════════════════════════════════════════
+# CPROFILE SESSION
+# ═══════════════════════════════════════════════════════════════
+
+class CProfileSession:
+    """
+    cProfile only traces the thread that enables it, so each server
+    thread opts in from its own loop via ServerProfiler.attach().
+    """
+
+    def __init__(self):
+        self.active = True
+        self.lock = threading.Lock()
+        self.attached = 0
+        self.finished: List[cProfile.Profile] = []
+
+    def join(self) -> cProfile.Profile:
+        profile = cProfile.Profile()
+        with self.lock:
+            self.attached += 1
+        profile.enable()
+        return profile
+
+    def leave(self, profile: cProfile.Profile):
+        profile.disable()
+        with self.lock:
+            self.finished.append(profile)
+
+    def dump(self, path: str, wait: float = 2.0) -> Tuple[int, int]:
+        """
+        Merge every detached thread's stats into one pstats file.
+        Threads still blocked (e.g. thread-per-client recv) are left out.
+        Returns (threads merged, threads that attached).
+        """
+        deadline = time.monotonic() + wait
+        while time.monotonic() < deadline:
+            with self.lock:
+                if len(self.finished) >= self.attached:
+                    break
+            time.sleep(0.05)
+
+        with self.lock:
+            profiles, attached = list(self.finished), self.attached
+        if profiles:
+            pstats.Stats(*profiles).dump_stats(path)
+        return len(profiles), attached
+
+
+# ═══════════════════════════════════════════════════════════════
+# SERVER PROFILER
+# ═══════════════════════════════════════════════════════════════
+
+class ServerProfiler:
+    """Starts, times out and stops one profiling window at a time."""
+
+    def __init__(self, output_dir: str = PROFILE_DIR):
+        self.output_dir = output_dir
+        self.lock = threading.Lock()
+        self.mode: Optional[str] = None
+        self.started_at = 0.0
+        self.sampler: Optional[StackSampler] = None
+        self.session: Optional[CProfileSession] = None
+        self.timer: Optional[threading.Timer] = None
+        self.on_finished: Optional[Callable[[Optional[str], str], None]] = None
+        self.local = threading.local()
+
+    @property
+    def active(self) -> bool:
+        return self.mode is not None
+
+    def start(self, mode: str = 'sample', seconds: float = PROFILE_DEFAULT_SECONDS,
+              on_finished: Optional[Callable[[Optional[str], str], None]] = None) -> float:
+        """
+        Begin a profiling window that stops by itself after `seconds`.
+        on_finished(path, summary) is called from the stopping thread;
+        path is None if nothing was captured.
+        """
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Unknown profile mode '{mode}' (use {' or '.join(PROFILE_MODES)})")
+        seconds = max(1.0, min(float(seconds), PROFILE_MAX_SECONDS))
+
+        with self.lock:
+            if self.mode is not None:
+                raise RuntimeError(f"A {self.mode} profile is already running")
+            self.mode = mode
+            self.started_at = time.monotonic()
+            self.on_finished = on_finished
+            if mode == 'sample':
+                self.sampler = StackSampler()
+                self.sampler.start()
+            else:
+                self.session = CProfileSession()
+            self.timer = threading.Timer(seconds, self.stop)
+            self.timer.name = "profiler-timer"
+            self.timer.daemon = True
+            self.timer.start()
+        return seconds
+
+    def stop(self) -> Optional[str]:
+        """End the current window and write its results. Returns the file path."""
+        with self.lock:
+            mode, self.mode = self.mode, None
+            sampler, self.sampler = self.sampler, None
+            session, self.session = self.session, None
+            timer, self.timer = self.timer, None
+            on_finished, self.on_finished = self.on_finished, None
+        if mode is None:
+            return None
+        if timer is not None and timer is not threading.current_thread():
+            timer.cancel()
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        elapsed = time.monotonic() - self.started_at
+
+        if sampler is not None:
+            sampler.stop_event.set()
+            sampler.join(timeout=2)
+            path = os.path.join(self.output_dir, f"profile_{stamp}.collapsed")
+            sampler.dump(path)
+            summary = f"{sampler.samples} samples over {elapsed:.1f} s"
+        else:
+            session.active = False
+            self.attach()  # Retire the caller's own profile, if it holds one
+            path = os.path.join(self.output_dir, f"profile_{stamp}.pstats")
+            merged, attached = session.dump(path)
+            summary = f"{merged}/{attached} thread(s) over {elapsed:.1f} s"
+            if not merged:
+                path = None
+
+        if on_finished:
+            on_finished(path, summary)
+        return path
+
+    def attach(self):
+        """
+        Called by server threads once per loop iteration: enables cProfile
+        for the calling thread while a session runs and retires it after.
+        """
+        held = getattr(self.local, 'held', None)
+        session = self.session
+        if held is None:
+            if session is not None and session.active:
+                self.local.held = (session, session.join())
+        elif held[0] is not session or not session.active:
+            held[0].leave(held[1])
+            self.local.held = None
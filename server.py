@@ -4,26 +4,51 @@ Enhanced TCP Server with Admin Features
 Students: Adir Buskila & Liav Weizman
 """
 
+import base64
+import errno
+import hmac
+import json
+import os
 import socket
+import stat
+import ssl
 import threading
 import time
 import tkinter as tk
 from tkinter import scrolledtext, messagebox
 from datetime import datetime
-from typing import Dict, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 from config import (
     DEFAULT_HOST, DEFAULT_PORT, MAX_CLIENTS, BUFFER_SIZE,
     COLORS, FONTS, STATUS_ONLINE, STATUS_AWAY, STATUS_BUSY,
-    ADMIN_PASSWORD, PING_INTERVAL
+    ADMIN_PASSWORD, PING_INTERVAL, POOL_WORKERS, POOL_MAX_CONNECTIONS,
+    OUTBOX_HIGH_WATERMARK, SEND_BATCH_BYTES, MAX_LOG_LINES, SHUTDOWN_DRAIN_SECONDS,
+    PROFILE_DEFAULT_SECONDS, METRICS_HOST, METRICS_PORT, TRACE_SAMPLE_RATE,
+    HOT_RESTART, RESUME_GRACE_SECONDS, SEND_LATENCY_SAMPLE_EVERY,
+    TLS_ENABLED, TLS_CERT_FILE, TLS_HANDSHAKE_TIMEOUT, SOCKET_NODELAY,
+    UNIX_SOCKET_PATH, UNIX_SOCKET_MODE, MULTICAST_ENABLED, MULTICAST_INTERFACE
 )
 from utils import (
     ChatLogger, format_uptime, format_timestamp, 
-    format_bytes, sanitize_username
+    format_bytes, sanitize_username, apply_socket_options, format_address
 )
 from ui_components import (
     CyberButton, StatsCard, StatusIndicator, GradientHeader
 )
+from pool import ConnectionPool
+from profiler import ServerProfiler, PROFILE_MODES
+from metrics import LatencyHistogram, MetricsServer
+from tracing import Tracer
+from sessions import SessionStore, is_sequenced
+from activity import TypingTracker, PresenceBatcher, IDLE_FRAME
+from transfer import TransferRelay
+from channels import Outbox, PrioritySender, channel_of, bulk_window_open, lowat_enabled, BULK
+from multicast import MulticastFanout, parse_range
+import handoff
+import tls
+import tuning
 
 
 # ═══════════════════════════════════════════════════════════════
@@ -31,12 +56,21 @@ from ui_components import (
 # ═══════════════════════════════════════════════════════════════
 
 class ClientConnection:
-    """Represents a connected client with metadata."""
+    """
+    Represents a connected client with metadata.
     
-    def __init__(self, socket: socket.socket, address: tuple, username: str):
+    In pool mode the socket is non-blocking and owned by a selector worker:
+    send() queues frames in a per-channel outbox that is written inline
+    when possible and drained by the worker otherwise, control and chat
+    ahead of bulk. Without a worker, send() writes directly on the
+    blocking socket (one thread per client), interactive frames first.
+    """
+    
+    def __init__(self, socket: socket.socket, address: tuple,
+                 username: Optional[str] = None):
         self.socket = socket
         self.address = address
-        self.username = username
+        self.username = username  # None until the handshake completes
         self.status = STATUS_ONLINE
         self.connected_at = datetime.now()
         self.last_ping = time.time()
@@ -44,19 +78,197 @@ class ClientConnection:
         self.messages_sent = 0
         self.bytes_sent = 0
         self.bytes_received = 0
+        
+        # Pool mode state
+        self.worker = None
+        self.outbox = Outbox()
+        self.outbox_bytes = 0
+        self.bulk_gate = socket is not None and lowat_enabled(socket)
+        self.send_lock = threading.Lock()
+        self.sender: Optional[PrioritySender] = None  # Thread mode: one writer at a time
+        self.closing = False
+        self.linger_until: Optional[float] = None  # monotonic close deadline
+        self.cut_off = False  # Queued frames were discarded
+        self.handshaking = False  # TLS handshake still running on the worker
+        
+        # Receive framing
+        self.recv_buffer = b''
+        self.line_framed = False
+        
+        self.session = None  # Resumable session, once logged in
+        self.typing_sent = IDLE_FRAME  # Last TYPING| snapshot delivered
     
     def send(self, data: bytes) -> bool:
         """Send data to client. Returns success status."""
-        try:
-            self.socket.send(data)
-            self.bytes_sent += len(data)
-            return True
-        except Exception:
-            return False
+        channel = channel_of(data)
+        if self.worker is None:
+            try:
+                if self.sender is None:
+                    self.sender = PrioritySender(self.socket)
+                self.sender.send(self.socket, data, bulk=channel == BULK)
+                self.bytes_sent += len(data)
+                return True
+            except Exception:
+                return False
+        
+        with self.send_lock:
+            if self.closing:
+                return False
+            
+            if self.outbox_bytes + len(data) > OUTBOX_HIGH_WATERMARK:
+                # Slow consumer - cut it off instead of buffering without bound
+                self.worker.dropped_frames += 1 + len(self.outbox)
+                self.outbox.clear()
+                self.outbox_bytes = 0
+                self.closing = True
+                self.cut_off = True
+            else:
+                # Only bulk queued means it is just held back: try the new frame now
+                waiting = self.outbox.interactive() or (channel == BULK and bool(self.outbox))
+                self.outbox.append(data, channel)
+                self.outbox_bytes += len(data)
+                if waiting:
+                    return True  # Worker is already waiting for writability
+                self._flush_locked()
+                if not self.outbox and not self.closing:
+                    return True
+        
+        self.worker.notify(self)
+        return not self.closing
+    
+    def backlogged(self) -> bool:
+        """
+        Behind on writes: interactive frames still queued (pool mode), or a
+        write still blocked on the socket (thread per client).
+        """
+        if self.worker is None:
+            return self.sender is not None and self.sender.backlogged()
+        return self.outbox.interactive()
+    
+    def push(self, data: bytes) -> bool:
+        """
+        Send a frame that may be sequenced (MSG/SENT/SYSTEM). With a session
+        it is numbered, kept for replay and sent to whichever connection
+        carries the session now - possibly a newer one after a resume.
+        """
+        session = self.session
+        if session is None or not is_sequenced(data):
+            return self.send(data)
+        with session.lock:
+            return session.conn.send(session.wire(session.record(data), data))
+    
+    def flush(self) -> bool:
+        """Write queued frames without blocking. Returns True once drained."""
+        with self.send_lock:
+            self._flush_locked()
+            return not self.outbox
+    
+    def _flush_locked(self):
+        if self.handshaking:
+            return  # The worker flushes once the TLS handshake completes
+        while self.outbox:
+            # Small frames are coalesced into a single syscall, in priority order
+            bulk_ok = not (self.bulk_gate and self.outbox.queues[BULK]) \
+                or bulk_window_open(self.socket)
+            chunk = self.outbox.take(SEND_BATCH_BYTES, bulk_ok)
+            if not chunk:
+                return  # Only bulk left and the kernel still has plenty unsent
+            try:
+                sent = self.socket.send(chunk)
+            except (BlockingIOError, InterruptedError,
+                    ssl.SSLWantWriteError, ssl.SSLWantReadError):
+                self.outbox.put_back(chunk)
+                return
+            except OSError:
+                # Peer is gone - nothing left worth delivering
+                self.outbox.clear()
+                self.outbox_bytes = 0
+                self.closing = True
+                self.cut_off = True
+                return
+            
+            self.bytes_sent += sent
+            self.outbox_bytes -= sent
+            if sent < len(chunk):
+                self.outbox.put_back(chunk[sent:])
+                return
+    
+    def close(self, linger_until: Optional[float] = None):
+        """
+        Close the connection (after queued frames drain, in pool mode).
+        linger_until overrides the CLOSE_LINGER flush deadline.
+        """
+        if self.worker is None:
+            try:
+                self.socket.shutdown(socket.SHUT_RDWR)
+            except Exception:
+                pass
+            try:
+                self.socket.close()
+            except Exception:
+                pass
+            return
+        
+        with self.send_lock:
+            self.closing = True
+            if linger_until is not None:
+                self.linger_until = linger_until
+        self.worker.notify(self)
+    
+    def feed(self, data: bytes) -> List[str]:
+        """
+        Split received bytes into protocol frames.
+        Clients that terminate frames with a newline get proper reassembly
+        across reads; older clients that never send one are treated as
+        one frame per read.
+        """
+        if not self.line_framed:
+            if b'\n' not in data:
+                return [data.decode(errors='replace')]
+            self.line_framed = True
+        
+        *frames, self.recv_buffer = (self.recv_buffer + data).split(b'\n')
+        return [frame.decode(errors='replace') for frame in frames]
     
     def is_alive(self) -> bool:
         """Check if connection is still alive."""
         return time.time() - self.last_ping < PING_INTERVAL * 3
+    
+    def export_state(self) -> Dict[str, Any]:
+        """Session state a new server process needs to adopt this socket."""
+        with self.send_lock:
+            outbox = b''.join(self.outbox)
+        session = None
+        if self.session is not None and self.session.conn is self and not self.session.ended:
+            with self.session.lock:
+                session = self.session.export_state()
+        return {
+            'address': list(self.address),
+            'username': self.username,
+            'status': self.status,
+            'connected_at': self.connected_at.isoformat(),
+            'messages_sent': self.messages_sent,
+            'bytes_sent': self.bytes_sent,
+            'bytes_received': self.bytes_received,
+            'closing': self.closing,
+            'line_framed': self.line_framed,
+            'recv_buffer': base64.b64encode(self.recv_buffer).decode(),
+            'outbox': base64.b64encode(outbox).decode(),
+            'session': session,
+        }
+    
+    @classmethod
+    def from_state(cls, sock: socket.socket, state: Dict[str, Any]) -> 'ClientConnection':
+        """Rebuild a connection handed over by the previous server process."""
+        conn = cls(sock, tuple(state['address']), state['username'])
+        conn.status = state['status']
+        conn.connected_at = datetime.fromisoformat(state['connected_at'])
+        conn.messages_sent = state['messages_sent']
+        conn.bytes_sent = state['bytes_sent']
+        conn.bytes_received = state['bytes_received']
+        conn.line_framed = state['line_framed']
+        conn.recv_buffer = base64.b64decode(state['recv_buffer'])
+        return conn
 
 
 # ═══════════════════════════════════════════════════════════════
@@ -66,19 +278,38 @@ class ClientConnection:
 class CyberServer:
     """Enhanced Chat Server with Dashboard and Admin Features."""
     
-    def __init__(self):
-        self.root = tk.Tk()
-        self.root.title("🖥️ CYBER CHAT SERVER")
-        self.root.geometry("950x650")
-        self.root.configure(bg=COLORS['bg_dark'])
-        self.root.minsize(800, 500)
+    def __init__(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT,
+                 workers: int = POOL_WORKERS, headless: bool = False,
+                 metrics_port: int = METRICS_PORT, trace_rate: float = TRACE_SAMPLE_RATE,
+                 takeover: bool = False, use_tls: bool = TLS_ENABLED,
+                 unix_path: str = UNIX_SOCKET_PATH, multicast: bool = MULTICAST_ENABLED,
+                 hot_restart: bool = HOT_RESTART):
+        self.host = host
+        self.port = port
+        self.unix_path = unix_path.format(port=port)  # '' = TCP only
+        self.workers = workers
+        self.metrics_port = metrics_port
+        self.takeover = takeover  # Adopt the sockets of a server already on this port
+        self.hot_restart = hot_restart  # Listen for a later process taking over from us
+        self.use_tls = use_tls
+        self.tls_context: Optional[ssl.SSLContext] = None
         
         # Server state
         self.server_socket: Optional[socket.socket] = None
+        self.unix_socket: Optional[socket.socket] = None  # Same-host clients, no TLS
         self.clients: Dict[str, ClientConnection] = {}
         self.lock = threading.Lock()
         self.running = False
         self.start_time: Optional[float] = None
+        self.pool: Optional[ConnectionPool] = None
+        self.profiler = ServerProfiler()
+        self.metrics_server: Optional[MetricsServer] = None
+        self.accepting = False
+        self.accept_threads: List[threading.Thread] = []
+        self.handoff_listener: Optional[handoff.HandoffListener] = None
+        self.sessions = SessionStore()
+        # Broadcasts sent once to a UDP group for clients that opt in
+        self.multicast = MulticastFanout(interface=MULTICAST_INTERFACE or host) if multicast else None
         
         # Statistics
         self.stats = {
@@ -86,15 +317,67 @@ class CyberServer:
             'bytes_sent': 0,
             'bytes_recv': 0,
             'peak_clients': 0,
-            'total_connections': 0
+            'total_connections': 0,
+            'unix_connections': 0,
+            'tls_handshakes': 0,
+            'tls_resumed': 0
         }
         
+        # Latency histograms: frame parsing, whole fan-out, one recipient's send
+        self.parse_latency = LatencyHistogram()
+        self.fanout_latency = LatencyHistogram()
+        self.send_latency = LatencyHistogram()
+        self.fanouts = 0  # Every SEND_LATENCY_SAMPLE_EVERY-th fan-out times each send
+        self.delivery_lag = LatencyHistogram()  # Send to cumulative ACK, reliable clients
+        self.tracer = Tracer(trace_rate)
+        
+        # Command registry: "OPCODE:" for commands with arguments, "OPCODE" for bare words
+        self.commands: Dict[str, Callable[[str, str], None]] = {}
+        self.redacted_commands = set()
+        self.quiet_commands = set()
+        self.exact_commands = set()
+        self.max_opcode_length = 0
+        self.register_command("QUIT", self.cmd_quit, args=False)
+        self.register_command("PING", self.cmd_ping, args=False, quiet=True, exact=True)
+        self.register_command("LIST", self.cmd_list, args=False)
+        self.register_command("STATUS", self.cmd_status)
+        self.register_command("TO", self.cmd_private)
+        self.register_command("PROFILE", self.handle_profile_command, redact=True)
+        self.register_command("RELIABLE", self.cmd_reliable, args=False, exact=True)
+        self.register_command("ACK", self.cmd_ack, quiet=True, exact=True)
+        self.register_command("TYPING", self.cmd_typing, args=False, quiet=True, exact=True)
+        self.register_command("STOP_TYPING", self.cmd_stop_typing, args=False, quiet=True,
+                              exact=True)
+        self.register_command("MULTICAST", self.cmd_multicast, args=False, exact=True)
+        self.register_command("NACK", self.cmd_nack, quiet=True, exact=True)
+        
+        # Typing indicators, coalesced into one snapshot per client per interval
+        self.typing = TypingTracker(self)
+        self.presence = PresenceBatcher(self)
+        
+        # File transfer: chunks are relayed, never stored
+        self.files = TransferRelay(self)
+        self.register_command("FILE_OFFER", self.files.cmd_offer, quiet=True, exact=True)
+        self.register_command("FILE_ACCEPT", self.files.cmd_accept, quiet=True, exact=True)
+        self.register_command("FILE_REJECT", self.files.cmd_reject, quiet=True, exact=True)
+        self.register_command("FILE_CANCEL", self.files.cmd_cancel, quiet=True, exact=True)
+        self.register_command("FILE_CHUNK", self.files.cmd_chunk, quiet=True, exact=True)
+        self.register_command("FILE_ACK", self.files.cmd_ack, quiet=True, exact=True)
+        
         # Logger
         self.logger = ChatLogger('CyberServer')
-        
-        # Setup UI
-        self.setup_ui()
-        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.echo_logs = True  # Headless only: mirror log lines to stdout
+        
+        # Setup UI (headless servers have no Tk root at all)
+        self.root: Optional[tk.Tk] = None
+        if not headless:
+            self.root = tk.Tk()
+            self.root.title("🖥️ CYBER CHAT SERVER")
+            self.root.geometry("950x650")
+            self.root.configure(bg=COLORS['bg_dark'])
+            self.root.minsize(800, 500)
+            self.setup_ui()
+            self.root.protocol("WM_DELETE_WINDOW", self.on_close)
         
     # ─────────────────────────────────────────────────────────────
     # UI SETUP
@@ -151,7 +434,7 @@ class CyberServer:
         addr_frame = tk.Frame(ctrl_section, bg=COLORS['bg_light'])
         addr_frame.pack(fill='x', pady=(0, 10))
         
-        tk.Label(addr_frame, text=f"📍 {DEFAULT_HOST}:{DEFAULT_PORT}",
+        tk.Label(addr_frame, text=f"📍 {self.host}:{self.port}",
                 font=FONTS['small'], fg=COLORS['text_secondary'],
                 bg=COLORS['bg_light']).pack(pady=5)
         
@@ -192,6 +475,12 @@ class CyberServer:
         self.stat_data = StatsCard(stats_section, "📦", "Data TX/RX", "0 B")
         self.stat_data.pack(fill='x', pady=2)
         
+        self.stat_pool = StatsCard(stats_section, "🧵", "Pool Load", "--")
+        self.stat_pool.pack(fill='x', pady=2)
+        
+        self.stat_latency = StatsCard(stats_section, "⏲️", "Fan-out p50/p99", "--")
+        self.stat_latency.pack(fill='x', pady=2)
+        
         # Separator
         tk.Frame(left, bg=COLORS['border'], height=1).pack(fill='x', padx=15, pady=10)
         
@@ -244,6 +533,18 @@ class CyberServer:
                  relief='flat', cursor='hand2',
                  command=self.export_logs).pack(side='right', padx=5)
         
+        # Export latency percentiles button
+        tk.Button(logs_header, text="⏲️ Latency", font=FONTS['tiny'],
+                 bg=COLORS['bg_light'], fg=COLORS['text_secondary'],
+                 relief='flat', cursor='hand2',
+                 command=self.export_latency).pack(side='right')
+        
+        # Dump sampled message traces button
+        tk.Button(logs_header, text="🧭 Traces", font=FONTS['tiny'],
+                 bg=COLORS['bg_light'], fg=COLORS['text_secondary'],
+                 relief='flat', cursor='hand2',
+                 command=self.export_traces).pack(side='right', padx=5)
+        
         # Log text area
         self.log_text = scrolledtext.ScrolledText(right, font=FONTS['small'],
                                                   bg=COLORS['bg_medium'],
@@ -288,6 +589,18 @@ class CyberServer:
         CyberButton(admin_content, "📢 Broadcast", command=self.send_broadcast,
                    color='accent_purple', size='small').pack(side='left')
         
+        # Profiler controls
+        self.profile_btn = CyberButton(admin_content, "🔬 Profile", command=self.toggle_profiler,
+                                       color='accent_blue', size='small')
+        self.profile_btn.pack(side='right')
+        
+        self.profile_mode = tk.StringVar(value=PROFILE_MODES[0])
+        mode_menu = tk.OptionMenu(admin_content, self.profile_mode, *PROFILE_MODES)
+        mode_menu.configure(font=FONTS['small'], bg=COLORS['bg_light'],
+                            fg=COLORS['text_primary'], activebackground=COLORS['bg_hover'],
+                            highlightthickness=0, relief='flat')
+        mode_menu.pack(side='right', padx=10)
+        
         # Initial log
         self.log("Server initialized. Ready to start...", 'info')
     
@@ -295,13 +608,32 @@ class CyberServer:
     # LOGGING
     # ─────────────────────────────────────────────────────────────
     
+    def ui_call(self, func: Callable, *args):
+        """Run func on the Tk thread, or inline when headless."""
+        if self.root is None:
+            func(*args)
+        else:
+            self.root.after(0, func, *args)
+    
     def log(self, message: str, tag: str = 'info'):
         """Add a log entry to the log display."""
         timestamp = format_timestamp()
         
+        if self.root is None:
+            if self.echo_logs and tag != 'msg':
+                print(f"[{timestamp}] {message}")
+            self.logger.info(f"[{tag.upper()}] {message}")
+            return
+        
         self.log_text.configure(state='normal')
         self.log_text.insert('end', f"[{timestamp}] ", 'system')
         self.log_text.insert('end', f"{message}\n", tag)
+        
+        # Keep the widget bounded - the full history is in the log file
+        lines = int(self.log_text.index('end-1c').split('.')[0])
+        if lines > MAX_LOG_LINES:
+            self.log_text.delete('1.0', f"{lines - MAX_LOG_LINES}.0")
+        
         self.log_text.see('end')
         self.log_text.configure(state='disabled')
         
@@ -336,21 +668,56 @@ class CyberServer:
         except Exception as e:
             self.log(f"Failed to export logs: {e}", 'error')
     
+    def latency_summary(self) -> Dict[str, Dict[str, float]]:
+        """Percentiles for every latency histogram, in milliseconds."""
+        return {
+            'parse': self.parse_latency.summary(),
+            'fanout': self.fanout_latency.summary(),
+            'send': self.send_latency.summary(),
+            'delivery': self.delivery_lag.summary(),
+        }
+    
+    def export_latency(self):
+        """Export latency percentiles to a JSON file."""
+        try:
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            filename = f"server_latency_{timestamp}.json"
+            
+            with open(filename, 'w', encoding='utf-8') as f:
+                json.dump({
+                    'exported': datetime.now().isoformat(timespec='seconds'),
+                    'messages': self.stats['messages'],
+                    'latency': self.latency_summary(),
+                }, f, indent=2)
+            
+            self.log(f"Latency percentiles exported to {filename}", 'success')
+        except Exception as e:
+            self.log(f"Failed to export latency: {e}", 'error')
+    
+    def export_traces(self):
+        """Dump the sampled message traces as JSON lines."""
+        if not self.tracer.sample_rate:
+            self.log("Tracing is off (set TRACE_SAMPLE_RATE or --trace-rate)", 'warning')
+            return
+        try:
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            filename = f"server_traces_{timestamp}.jsonl"
+            count = self.tracer.dump(filename)
+            self.log(f"{count} traces exported to {filename}", 'success')
+        except Exception as e:
+            self.log(f"Failed to export traces: {e}", 'error')
+    
     # ─────────────────────────────────────────────────────────────
     # STATS UPDATE
     # ─────────────────────────────────────────────────────────────
     
     def update_stats(self):
         """Update the statistics display."""
-        if not self.running:
+        if not self.running or self.root is None:
             return
         
         with self.lock:
             client_count = len(self.clients)
-            
-            # Update peak
-            if client_count > self.stats['peak_clients']:
-                self.stats['peak_clients'] = client_count
         
         # Update UI
         self.stat_clients.set_value(str(client_count))
@@ -366,11 +733,26 @@ class CyberServer:
             uptime = int(time.time() - self.start_time)
             self.stat_uptime.set_value(format_uptime(uptime))
         
+        # Pool load: worker utilization and accept-to-worker queue wait
+        if self.pool:
+            pool_stats = self.pool.stats()
+            self.stat_pool.set_value(f"{pool_stats['utilization'] * 100:.0f}% · "
+                                     f"{pool_stats['queue_wait_avg_ms']:.1f}ms")
+        else:
+            self.stat_pool.set_value(f"{threading.active_count()} thr")
+        
+        fanout = self.fanout_latency.summary()
+        if fanout['count']:
+            self.stat_latency.set_value(f"{fanout['p50_ms']:.2f} / {fanout['p99_ms']:.2f}ms")
+        
         # Schedule next update
         self.root.after(1000, self.update_stats)
     
     def update_users_list(self):
         """Update the users listbox."""
+        if self.root is None:
+            return
+        
         self.users_list.delete(0, 'end')
         
         with self.lock:
@@ -381,7 +763,7 @@ class CyberServer:
                     STATUS_BUSY: '🔴'
                 }.get(conn.status, '⚪')
                 
-                addr = f"{conn.address[0]}:{conn.address[1]}"
+                addr = format_address(conn.address)
                 self.users_list.insert('end', f"  {status_icon} {username} ({addr})")
     
     # ─────────────────────────────────────────────────────────────
@@ -389,26 +771,70 @@ class CyberServer:
     # ─────────────────────────────────────────────────────────────
     
     def start_server(self):
-        """Start the TCP server."""
+        """Start the TCP server (or take over the one already running)."""
+        adopted: List[ClientConnection] = []
         try:
-            self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-            self.server_socket.bind((DEFAULT_HOST, DEFAULT_PORT))
-            self.server_socket.listen(MAX_CLIENTS)
+            if self.use_tls:
+                # One context for the server's lifetime - it holds the ticket keys
+                self.tls_context = tls.server_context()
+            if self.takeover:
+                adopted = self.take_over()
+            else:
+                self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+                self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+                # Buffer sizes set before listen() are inherited with the right window scale
+                apply_socket_options(self.server_socket, nodelay=False)
+                self.server_socket.bind((self.host, self.port))
+                self.server_socket.listen(MAX_CLIENTS)
+                self.start_time = time.time()
+            # accept() wakes up regularly so a handoff can stop it without shutdown()
+            self.server_socket.settimeout(0.5)
+            self.open_unix_listener()
+            self.open_multicast()
             
             self.running = True
-            self.start_time = time.time()
+            
+            if self.workers > 0:
+                self.pool = ConnectionPool(self, self.workers, POOL_MAX_CONNECTIONS)
+                self.pool.start()
             
             # Update UI
-            self.status_indicator.set_status('online')
-            self.start_btn.configure(state='disabled')
-            self.stop_btn.configure(state='normal')
+            if self.root:
+                self.status_indicator.set_status('online')
+                self.start_btn.configure(state='disabled')
+                self.stop_btn.configure(state='normal')
             
-            self.log(f"Server started on {DEFAULT_HOST}:{DEFAULT_PORT}", 'success')
-            self.log(f"Max clients: {MAX_CLIENTS}", 'info')
+            self.log(f"Server started on {self.host}:{self.port}", 'success')
+            if self.unix_socket:
+                self.log(f"Also listening on {format_address((self.unix_path, None))}", 'info')
+            if self.multicast:
+                self.log(f"Multicast fan-out to {self.multicast.address} "
+                         f"(TTL {self.multicast.ttl})", 'info')
+            if self.pool:
+                self.log(f"Connection pool: {self.workers} workers, "
+                         f"max {POOL_MAX_CONNECTIONS} connections", 'info')
+            else:
+                self.log("Connection handling: one thread per client", 'info')
+            if self.tls_context:
+                self.log(f"TLS enabled ({TLS_CERT_FILE}), session resumption on", 'info')
+            if tuning.sources:
+                self.log("Tuning: " + ", ".join(tuning.changed_settings()), 'info')
             
-            # Start accept thread
-            threading.Thread(target=self.accept_loop, daemon=True).start()
+            if adopted:
+                self.adopt_connections(adopted)
+            self.start_metrics()
+            self.typing.start()
+            self.presence.start()
+            if self.multicast:
+                self.multicast.start()
+            self.start_accepting()
+            
+            if self.hot_restart and handoff.SUPPORTED:
+                try:
+                    self.handoff_listener = handoff.HandoffListener(self, self.port)
+                    self.handoff_listener.start()
+                except OSError as e:
+                    self.log(f"Hot restart disabled: {e}", 'warning')
             
             # Start stats update
             self.update_stats()
@@ -416,191 +842,825 @@ class CyberServer:
         except Exception as e:
             self.log(f"Failed to start server: {e}", 'error')
     
-    def stop_server(self):
-        """Stop the TCP server."""
+    def start_metrics(self):
+        """Serve /metrics if a port is configured."""
+        if not self.metrics_port:
+            return
+        try:
+            self.metrics_server = MetricsServer(self, METRICS_HOST, self.metrics_port)
+            self.metrics_server.start()
+            host, port = self.metrics_server.address
+            self.log(f"Metrics at http://{host}:{port}/metrics", 'info')
+        except OSError as e:
+            self.log(f"Metrics endpoint disabled: {e}", 'warning')
+    
+    def start_accepting(self):
+        """Start an accept thread per listening socket."""
+        self.accepting = True
+        listeners = [(self.server_socket, "accept")]
+        if self.unix_socket:
+            listeners.append((self.unix_socket, "accept-unix"))
+        self.accept_threads = [threading.Thread(target=self.accept_loop, args=(listener,),
+                                                name=name, daemon=True)
+                               for listener, name in listeners]
+        for thread in self.accept_threads:
+            thread.start()
+    
+    # ─────────────────────────────────────────────────────────────
+    # UNIX SOCKET
+    # ─────────────────────────────────────────────────────────────
+    
+    def open_unix_listener(self):
+        """
+        Also listen on unix_path, if set: same protocol, same clients, no
+        TCP/IP stack in between. The socket file's permissions decide who
+        may connect, so these connections are never wrapped in TLS.
+        """
+        if self.unix_socket is not None:
+            if self.unix_socket.getsockname() == self.unix_path:
+                self.unix_socket.settimeout(0.5)
+                return  # Taken over along with the TCP listener
+            self.close_unix_listener()
+        if not self.unix_path:
+            return
+        if not hasattr(socket, 'AF_UNIX'):
+            self.log("Unix socket listener not supported on this platform", 'warning')
+            return
+        
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            self.remove_stale_unix_socket()
+            apply_socket_options(sock)
+            sock.bind(self.unix_path)
+            os.chmod(self.unix_path, int(UNIX_SOCKET_MODE, 8))
+            sock.listen(MAX_CLIENTS)
+            sock.settimeout(0.5)
+        except (OSError, ValueError) as e:
+            sock.close()
+            self.log(f"Unix socket disabled: {e}", 'warning')
+            return
+        self.unix_socket = sock
+    
+    def remove_stale_unix_socket(self):
+        """Delete a socket file left by a server that is gone; refuse a live one."""
+        try:
+            if not stat.S_ISSOCK(os.stat(self.unix_path).st_mode):
+                raise OSError(errno.EEXIST, f"{self.unix_path} exists and is not a socket")
+        except FileNotFoundError:
+            return
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        probe.settimeout(1.0)
+        try:
+            probe.connect(self.unix_path)
+        except OSError:
+            os.unlink(self.unix_path)  # Nobody is accepting on it
+            return
+        finally:
+            probe.close()
+        raise OSError(errno.EADDRINUSE, f"another server is listening on {self.unix_path}")
+    
+    def close_unix_listener(self, unlink: bool = True):
+        """Stop listening on the Unix socket (unlink=False: a new process owns the file)."""
+        sock, self.unix_socket = self.unix_socket, None
+        if sock is None:
+            return
+        try:
+            path = sock.getsockname()
+            sock.close()
+            if unlink and path:
+                os.unlink(path)
+        except OSError:
+            pass
+    
+    def open_multicast(self):
+        """Open the group socket; if that fails, broadcasts stay on TCP."""
+        if self.multicast is None or self.multicast.sock is not None:
+            return
+        try:
+            self.multicast.open()
+        except OSError as e:
+            self.log(f"Multicast fan-out disabled: {e}", 'warning')
+            self.multicast = None
+    
+    # ─────────────────────────────────────────────────────────────
+    # HOT RESTART
+    # ─────────────────────────────────────────────────────────────
+    
+    def take_over(self) -> List[ClientConnection]:
+        """
+        New process side: collect the listening socket, client sockets and
+        session state from the server running on our port.
+        """
+        channel, listeners, state, sockets = handoff.request_takeover(self.port)
+        self.server_socket = listeners[0]
+        self.unix_socket = listeners[1] if len(listeners) > 1 else None
+        try:
+            self.stats.update(state['stats'])
+            self.start_time = state['start_time']
+            conns = [ClientConnection.from_state(sock, info)
+                     for sock, info in zip(sockets, state['clients'])]
+            for conn, info in zip(conns, state['clients']):
+                conn.outbox.put_back(base64.b64decode(info['outbox']))
+                conn.closing = info['closing']
+                if info.get('session'):
+                    conn.session = self.sessions.restore(info['session'], conn)
+            # TLS users: no socket came over, only the session they resume into
+            for info in state.get('held', []):
+                conn = ClientConnection.from_state(None, info)
+                conn.session = self.sessions.restore(info['session'], conn)
+                conns.append(conn)
+            self.files.restore(state.get('transfers', []))
+            if self.multicast:
+                self.multicast.restore(state.get('multicast'))
+        except Exception:
+            handoff.acknowledge(channel, False)
+            raise
+        handoff.acknowledge(channel, True)
+        held = len(state.get('held', []))
+        self.log(f"Took over {self.host}:{self.port} with {len(conns) - held} live connection(s)"
+                 + (f" and {held} TLS session(s) awaiting resume" if held else ""), 'success')
+        return conns
+    
+    def adopt_connections(self, conns: List[ClientConnection]):
+        """Resume serving connections taken over from the previous process."""
+        for conn in conns:
+            pending = b''.join(conn.outbox)
+            conn.outbox.clear()
+            closing, conn.closing = conn.closing, False
+            
+            if conn.username:
+                with self.lock:
+                    self.clients[conn.username] = conn
+            
+            if conn.socket is None:
+                self.hold_session(conn)
+                continue
+            if self.pool is None:
+                conn.socket.setblocking(True)
+                threading.Thread(target=self.serve_client, args=(conn,), daemon=True).start()
+            elif not self.pool.submit(conn):
+                self.release_client(conn)
+                conn.close()
+                continue
+            
+            if pending:
+                conn.send(pending)
+            if closing:
+                conn.close()
+        self.update_users_list()
+    
+    def hand_off(self, channel: socket.socket) -> bool:
+        """
+        Old process side (handoff thread): pass every socket to the new
+        process. Resumes serving and returns False if it does not confirm.
+        """
+        self.ui_call(self.log, "Hot restart requested - handing sockets over", 'warning')
+        self.accepting = False
+        for thread in self.accept_threads:
+            thread.join(timeout=2)
+        if self.metrics_server:
+            self.metrics_server.stop()  # Frees the port for the new process
+            self.metrics_server = None
+        if self.profiler.active:
+            self.profiler.stop()
+        self.typing.stop()  # Nothing may write to the sockets while they move
+        self.presence.stop()  # Buffered changes are queued and travel in the outboxes
+        if self.multicast:
+            self.multicast.stop()  # Numbering continues in the new process
+        
+        # Pool connections move with their sockets; thread-per-client ones
+        # are blocked in recv() on this side and get drained instead
+        pooled = self.pool is not None
+        conns = self.pool.detach() if pooled else []
+        # TLS state lives in this process's OpenSSL objects, so encrypted
+        # clients are drained instead; their sessions travel without a
+        # socket and are held until the client resumes
+        encrypted = [conn for conn in conns if tls.is_tls(conn.socket)]
+        conns = [conn for conn in conns if not tls.is_tls(conn.socket)]
+        held = [conn.export_state() for conn in encrypted]
+        state = {
+            'stats': dict(self.stats),
+            'start_time': self.start_time,
+            'clients': [conn.export_state() for conn in conns],
+            'held': [info for info in held if info['session']],
+            'transfers': self.files.export_state(),
+            'multicast': self.multicast.export_state() if self.multicast else None,
+        }
+        try:
+            listeners = [self.server_socket] + ([self.unix_socket] if self.unix_socket else [])
+            handoff.send_state(channel, listeners, state,
+                               [conn.socket for conn in conns])
+            ok = handoff.wait_for_ack(channel)
+        except (OSError, ValueError):
+            ok = False
+        
+        if not ok:
+            self.ui_call(self.log, "Hot restart failed - resuming service", 'error')
+            if pooled:
+                self.pool = ConnectionPool(self, self.workers, POOL_MAX_CONNECTIONS)
+                self.pool.start()
+                for conn in conns + encrypted:
+                    if not self.pool.submit(conn):
+                        conn.close()
+            self.start_metrics()
+            self.typing.start()
+            self.presence.start()
+            if self.multicast:
+                self.multicast.start()
+            self.start_accepting()
+            return False
+        
+        # The new process owns these sockets now: drop our descriptors
+        # without shutdown(), which would end the connections for both
         self.running = False
+        for conn in conns:
+            try:
+                conn.socket.close()
+            except Exception:
+                pass
+        try:
+            self.server_socket.close()
+        except Exception:
+            pass
+        self.close_unix_listener(unlink=False)
+        if self.multicast:
+            self.multicast.close()
+        self.pool = None
         
-        # Notify and disconnect all clients
         with self.lock:
-            for username, conn in list(self.clients.items()):
-                try:
-                    conn.send("SYSTEM|Server shutting down. Goodbye!\n".encode())
-                    conn.socket.close()
-                except Exception:
-                    pass
+            threaded = [] if pooled else list(self.clients.values())
             self.clients.clear()
+        deadline = time.monotonic() + SHUTDOWN_DRAIN_SECONDS
+        if threaded:
+            farewell = "SYSTEM|Server restarting - please reconnect\n".encode()
+            self.drain_threaded(threaded, farewell, deadline)
+        if encrypted:
+            # No farewell: a sequenced frame the new process never recorded
+            # would put the client's count ahead of its session
+            self.drain_threaded(encrypted, b'', deadline)
+        
+        self.ui_call(self.log, f"Handed off {len(conns)} connection(s)"
+                               + (f" and {len(state['held'])} TLS session(s)" if encrypted else "")
+                               + " - this process can exit", 'success')
+        if self.root:
+            self.ui_call(self.status_indicator.set_status, 'offline')
+        return True
+    
+    def stop_server(self, drain: float = SHUTDOWN_DRAIN_SECONDS) -> Dict[str, Any]:
+        """
+        Stop the TCP server: stop accepting, give every client up to `drain`
+        seconds (in parallel) to receive its queued frames and the goodbye
+        notice, then force-close the rest. Returns a drain report.
+        """
+        self.running = False
+        self.accepting = False
+        started = time.monotonic()
+        deadline = started + drain
         
-        # Close server socket
+        if self.handoff_listener:
+            self.handoff_listener.stop()
+            self.handoff_listener = None
+        
+        # Stop accepting first (shutdown wakes the thread blocked in accept)
         if self.server_socket:
+            try:
+                self.server_socket.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
             try:
                 self.server_socket.close()
             except Exception:
                 pass
+        self.close_unix_listener()
+        
+        self.typing.running = False  # Joined below, once clients are gone
+        self.presence.running = False
+        
+        # Forget clients up front so closing them does not broadcast departures
+        with self.lock:
+            conns = list(self.clients.values())
+            self.clients.clear()
+        
+        farewell = "SYSTEM|Server shutting down. Goodbye!\n".encode()
+        if self.pool:
+            drained, cut_off = self.pool.drain(farewell, deadline)
+            self.pool = None
+        else:
+            drained, cut_off = self.drain_threaded(conns, farewell, deadline)
+        
+        if self.profiler.active:
+            self.profiler.stop()
+        
+        if self.metrics_server:
+            self.metrics_server.stop()
+            self.metrics_server = None
+        
+        self.typing.stop()
+        self.presence.stop()
+        if self.multicast:
+            self.multicast.stop()
+            self.multicast.close()
+        self.sessions.clear()
+        
+        report = {
+            'drained': drained,
+            'cut_off': cut_off,
+            'seconds': round(time.monotonic() - started, 3),
+        }
         
         # Update UI
-        self.status_indicator.set_status('offline')
-        self.start_btn.configure(state='normal')
-        self.stop_btn.configure(state='disabled')
+        if self.root:
+            self.status_indicator.set_status('offline')
+            self.start_btn.configure(state='normal')
+            self.stop_btn.configure(state='disabled')
         self.update_users_list()
         
+        if drained or cut_off:
+            self.log(f"Drained {drained} connection(s) cleanly, {cut_off} cut off "
+                     f"in {report['seconds']:.1f}s", 'warning' if cut_off else 'info')
         self.log("Server stopped", 'warning')
+        return report
+    
+    def drain_threaded(self, conns: List[ClientConnection], farewell: bytes,
+                       deadline: float) -> Tuple[int, int]:
+        """
+        Thread-per-client drain: blocking sockets get any queued frames and
+        the goodbye in parallel, each bounded by the deadline.
+        Returns (drained cleanly, cut off).
+        """
+        def goodbye(conn: ClientConnection) -> bool:
+            try:
+                conn.socket.settimeout(max(0.01, deadline - time.monotonic()))
+                conn.socket.sendall(b''.join(conn.outbox) + farewell)
+                return True
+            except Exception:
+                return False
+            finally:
+                conn.close()
+        
+        if not conns:
+            return 0, 0
+        with ThreadPoolExecutor(max_workers=min(32, len(conns)),
+                                thread_name_prefix="drain") as executor:
+            results = list(executor.map(goodbye, conns))
+        return results.count(True), results.count(False)
     
     # ─────────────────────────────────────────────────────────────
     # CLIENT HANDLING
     # ─────────────────────────────────────────────────────────────
     
-    def accept_loop(self):
-        """Accept incoming client connections."""
-        while self.running:
+    def accept_loop(self, listener: socket.socket):
+        """Accept incoming client connections on one listening socket."""
+        unix = listener is self.unix_socket
+        tls_context = None if unix else self.tls_context
+        while self.running and self.accepting:
             try:
-                client_socket, address = self.server_socket.accept()
-                self.stats['total_connections'] += 1
+                client_socket, address = listener.accept()
+                self.profiler.attach()
+                if unix:
+                    address = (self.unix_path, None)  # Peers are unnamed
+                # The TCP and Unix listeners each run an accept loop
+                with self.lock:
+                    self.stats['total_connections'] += 1
+                    if unix:
+                        self.stats['unix_connections'] += 1
+                
+                self.ui_call(self.log, f"New connection from {format_address(address)}", 'info')
                 
-                self.root.after(0, lambda a=address: 
-                    self.log(f"New connection from {a[0]}:{a[1]}", 'info'))
+                # TLS sends session tickets and WELCOME as separate records;
+                # with Nagle on, WELCOME waits ~40 ms for a delayed ACK
+                apply_socket_options(client_socket,
+                                     nodelay=SOCKET_NODELAY or tls_context is not None)
+                if self.pool is None:
+                    # Handle client in separate thread (TLS handshake happens there)
+                    threading.Thread(
+                        target=self.handle_client,
+                        args=(client_socket, address, tls_context),
+                        daemon=True
+                    ).start()
+                    continue
                 
-                # Handle client in separate thread
-                threading.Thread(
-                    target=self.handle_client,
-                    args=(client_socket, address),
-                    daemon=True
-                ).start()
+                if tls_context:
+                    # The worker drives the handshake without blocking its loop
+                    client_socket = tls_context.wrap_socket(
+                        client_socket, server_side=True, do_handshake_on_connect=False)
+                conn = ClientConnection(client_socket, address)
+                conn.handshaking = tls_context is not None
+                # Queue the prompt before the worker can read (and answer) any input
+                welcome = "WELCOME|Enter your username: ".encode()
+                conn.outbox.append(welcome)
+                conn.outbox_bytes += len(welcome)
+                if not self.pool.submit(conn):
+                    self.reject_connection(client_socket, "Server is full")
+                    continue
                 
+            except socket.timeout:
+                continue
             except Exception:
-                if self.running:
-                    self.root.after(0, lambda: self.log("Accept error", 'error'))
+                if self.running and self.accepting:
+                    self.ui_call(self.log, "Accept error", 'error')
                 break
     
-    def handle_client(self, client_socket: socket.socket, address: tuple):
-        """Handle a single client connection."""
-        username = None
-        
+    def reject_connection(self, client_socket: socket.socket, reason: str):
+        """Refuse a connection before it is handed to a worker."""
         try:
-            # Send welcome prompt
-            client_socket.send("WELCOME|Enter your username: ".encode())
-            
-            # Receive username
-            data = client_socket.recv(BUFFER_SIZE)
-            if not data:
+            if not tls.is_tls(client_socket):  # Mid-handshake: nothing the client could read
+                client_socket.send(f"ERROR|{reason}\n".encode())
+            client_socket.close()
+        except Exception:
+            pass
+        self.ui_call(self.log, f"Connection rejected: {reason}", 'warning')
+    
+    def handle_client(self, client_socket: socket.socket, address: tuple,
+                      tls_context: Optional[ssl.SSLContext] = None):
+        """Handle a single client connection (thread-per-client mode)."""
+        if tls_context:
+            try:
+                client_socket.settimeout(TLS_HANDSHAKE_TIMEOUT)
+                client_socket = tls_context.wrap_socket(client_socket, server_side=True)
+                client_socket.settimeout(None)
+            except (ssl.SSLError, OSError) as e:
+                self.ui_call(self.log, f"TLS handshake failed for {address[0]}: {e}", 'warning')
                 client_socket.close()
                 return
+            self.on_tls_established(client_socket)
+        conn = ClientConnection(client_socket, address)
+        # Send welcome prompt
+        conn.send("WELCOME|Enter your username: ".encode())
+        self.serve_client(conn)
+    
+    def serve_client(self, conn: ClientConnection):
+        """Read loop for one client on its own thread."""
+        try:
+            while self.running:
+                data = conn.socket.recv(BUFFER_SIZE)
+                self.profiler.attach()
+                if not data or not self.on_client_data(conn, data):
+                    break
+                
+        except Exception as e:
+            self.ui_call(self.log, f"Client error: {e}", 'error')
+        
+        finally:
+            self.release_client(conn)
+            conn.close()
+    
+    def on_tls_established(self, sock: ssl.SSLSocket):
+        """Count a completed handshake (and whether it resumed a session)."""
+        self.stats['tls_handshakes'] += 1
+        if sock.session_reused:
+            self.stats['tls_resumed'] += 1
+    
+    def on_client_data(self, conn: ClientConnection, data: bytes) -> bool:
+        """
+        Process bytes received from a client.
+        Returns False when the connection should be dropped.
+        """
+        conn.last_ping = time.time()
+        conn.bytes_received += len(data)
+        self.stats['bytes_recv'] += len(data)
+        
+        started = time.perf_counter()
+        frames = conn.feed(data)
+        decoded = time.perf_counter()
+        self.parse_latency.record(decoded - started)
+        
+        for frame in frames:
+            if conn.username is None:
+                # First frame is the username
+                if not self.register_client(conn, frame):
+                    return False
+                continue
             
-            username = sanitize_username(data.decode().strip())
+            message = frame.strip()
+            if not message:
+                continue
             
-            if not username:
-                client_socket.send("ERROR|Invalid username\n".encode())
-                client_socket.close()
-                return
+            trace = self.tracer.begin(conn.username, len(frame), started)
+            if trace is None:
+                self.handle_message(conn.username, message)
+                continue
             
+            trace.add('decode', started, decoded, frames=len(frames))
+            dispatched = time.perf_counter()
+            try:
+                self.handle_message(conn.username, message)
+            finally:
+                trace.add('dispatch', dispatched, time.perf_counter())
+                self.tracer.finish(trace)
+        
+        return True
+    
+    def register_client(self, conn: ClientConnection, raw_username: str) -> bool:
+        """Complete the username handshake. Returns False if rejected."""
+        if raw_username.startswith("RESUME:"):
+            return self.resume_client(conn, raw_username[len("RESUME:"):].strip())
+        
+        username = sanitize_username(raw_username.strip())
+        
+        if not username:
+            conn.send("ERROR|Invalid username\n".encode())
+            return False
+        
+        # The session lock keeps chat frames out until SESSION| sets the count
+        session = self.sessions.open(username, conn)
+        with session.lock:
             # Check if username is taken
             with self.lock:
                 if username in self.clients:
-                    client_socket.send(f"ERROR|Username '{username}' is already taken\n".encode())
-                    client_socket.close()
-                    return
+                    conn.send(f"ERROR|Username '{username}' is already taken\n".encode())
+                    self.sessions.end(session)
+                    return False
                 
                 # Register client
-                conn = ClientConnection(client_socket, address, username)
+                conn.username = username
+                conn.session = session
                 self.clients[username] = conn
-            
-            # Notify
-            self.root.after(0, lambda: self.log(f"'{username}' joined the chat", 'success'))
-            self.root.after(0, self.update_users_list)
+                self.stats['peak_clients'] = max(self.stats['peak_clients'], len(self.clients))
             
             # Welcome the user
-            client_socket.send(f"OK|Welcome to Cyber Chat, {username}! 🚀\n".encode())
-            
-            # Broadcast join
-            self.broadcast_system(f"'{username}' has joined the chat", exclude=username)
-            self.broadcast_userlist()
-            
-            # Main message loop
-            while self.running:
-                data = client_socket.recv(BUFFER_SIZE)
-                if not data:
-                    break
-                
-                self.stats['bytes_recv'] += len(data)
-                
-                # Update last ping
-                with self.lock:
-                    if username in self.clients:
-                        self.clients[username].last_ping = time.time()
-                
-                message = data.decode().strip()
-                if not message:
-                    continue
-                
-                self.handle_message(username, message)
-                
-        except Exception as e:
-            self.root.after(0, lambda: self.log(f"Client error: {e}", 'error'))
+            conn.send(f"OK|Welcome to Cyber Chat, {username}! 🚀\n".encode())
+            conn.send(session.greeting())
+        
+        # Notify
+        self.ui_call(self.log, f"'{username}' joined the chat", 'success')
+        self.ui_call(self.update_users_list)
+        
+        # Broadcast join
+        self.typing.refresh(username)
+        self.broadcast_system(f"'{username}' has joined the chat", exclude=username)
+        self.broadcast_userlist()
+        return True
+    
+    def resume_client(self, conn: ClientConnection, args: str) -> bool:
+        """RESUME:token:seq - reattach a session and replay what was missed."""
+        token, _, seq = args.partition(":")
+        session = self.sessions.get(token)
+        if session is None:
+            conn.send("ERROR|Session expired - please log in again\n".encode())
+            return False
         
-        finally:
-            # Cleanup
+        last_seq = int(seq) if seq.isdigit() else 0
+        session.ack(last_seq)  # The client holds everything up to last_seq
+        with session.lock:
             with self.lock:
-                if username and username in self.clients:
-                    del self.clients[username]
-            
-            if username:
-                self.root.after(0, lambda: self.log(f"'{username}' left the chat", 'warning'))
-                self.broadcast_system(f"'{username}' has left the chat")
-                self.broadcast_userlist()
-            
-            self.root.after(0, self.update_users_list)
+                old = self.clients.get(session.username)
+                if old is None or old.session is not session:
+                    conn.send("ERROR|Session expired - please log in again\n".encode())
+                    return False
+                conn.username = session.username
+                conn.status = old.status
+                conn.session = session
+                self.clients[session.username] = conn
+            session.conn = conn
+            if session.expiry is not None:
+                session.expiry.cancel()
+                session.expiry = None
             
-            try:
-                client_socket.close()
-            except Exception:
-                pass
+            start, frames = session.since(last_seq)
+            conn.send(f"OK|Welcome back, {session.username}! 🚀\n".encode())
+            conn.send(f"SESSION|{session.token}:{start}\n".encode())
+            if frames:
+                conn.send(b''.join(frames))
+        
+        # A half-open previous connection is dropped quietly
+        old.close()
+        
+        self.ui_call(self.log, f"'{session.username}' resumed the session "
+                               f"({len(frames)} frame(s) replayed)", 'success')
+        self.ui_call(self.update_users_list)
+        self.send_to_user(session.username, self.userlist_frame())
+        self.typing.refresh(session.username)
+        self.files.user_resumed(session.username)
+        return True
     
-    def handle_message(self, sender: str, message: str):
-        """Process a message from a client."""
-        self.stats['messages'] += 1
-        
-        # Log the message
-        self.root.after(0, lambda: self.log(f"[{sender}] {message}", 'msg'))
+    def hold_session(self, conn: ClientConnection):
+        """Keep a dropped client's name and session for RESUME_GRACE_SECONDS."""
+        session = conn.session
+        session.expiry = threading.Timer(RESUME_GRACE_SECONDS, self.expire_session,
+                                         args=(conn,))
+        session.expiry.daemon = True
+        session.expiry.start()
+        self.ui_call(self.log, f"'{conn.username}' dropped - holding the session for "
+                               f"{RESUME_GRACE_SECONDS:.0f}s", 'warning')
+    
+    def expire_session(self, conn: ClientConnection):
+        """Grace period over without a resume: the user leaves for real."""
+        session = conn.session
+        if session is None or session.conn is not conn:
+            return  # Resumed in the meantime
+        self.sessions.end(session)
+        self.release_client(conn)
+    
+    def end_session(self, conn: ClientConnection):
+        """Deliberate exit (QUIT, kick): the session cannot be resumed."""
+        if conn.session is not None:
+            self.sessions.end(conn.session)
+    
+    def release_client(self, conn: ClientConnection):
+        """Forget a disconnected client and tell everyone else."""
+        username = conn.username
+        session = conn.session
+        if username is not None:
+            self.typing.stop_typing(username)
         
-        # Check for commands
-        upper_msg = message.upper()
+        with self.lock:
+            registered = username is not None and self.clients.get(username) is conn
+            if (registered and self.running and session is not None
+                    and not session.ended and session.conn is conn):
+                held = session.expiry is None
+            else:
+                held = None
+            if registered and held is None:
+                del self.clients[username]
         
-        if upper_msg == "QUIT":
-            with self.lock:
-                if sender in self.clients:
-                    self.clients[sender].socket.close()
+        if held is not None:
+            if held:
+                self.hold_session(conn)
             return
         
-        elif upper_msg == "LIST":
-            with self.lock:
-                users = list(self.clients.keys())
-                statuses = {u: c.status for u, c in self.clients.items()}
-            
-            # Format user list with statuses
-            user_str = ", ".join(f"{u}({statuses[u]})" for u in users)
-            self.send_to_user(sender, f"USERS|Online: {user_str}\n")
-        
-        elif upper_msg.startswith("STATUS:"):
-            # Change status: STATUS:away
-            new_status = message.split(":", 1)[1].strip().lower()
-            if new_status in [STATUS_ONLINE, STATUS_AWAY, STATUS_BUSY]:
-                with self.lock:
-                    if sender in self.clients:
-                        self.clients[sender].status = new_status
-                self.send_to_user(sender, f"OK|Status changed to {new_status}\n")
-                self.broadcast_system(f"'{sender}' is now {new_status}")
-                self.broadcast_userlist()
-        
-        elif upper_msg.startswith("TO:"):
-            # Private message: TO:username:message
-            parts = message.split(":", 2)
-            if len(parts) >= 3:
-                target = parts[1].strip()
-                pm_content = parts[2].strip()
-                self.send_private(sender, target, pm_content)
+        if registered:
+            self.files.user_left(username)
+            self.ui_call(self.log, f"'{username}' left the chat", 'warning')
+            self.broadcast_system(f"'{username}' has left the chat")
+            self.broadcast_userlist()
         
+        self.ui_call(self.update_users_list)
+    
+    def register_command(self, opcode: str, handler: Callable[[str, str], None],
+                         args: bool = True, redact: bool = False, quiet: bool = False,
+                         exact: bool = False):
+        """
+        Plug in a protocol command. handler(sender, args) receives the text
+        after "OPCODE:" (or "" for bare-word commands when args=False).
+        Redacted commands are logged without their arguments; quiet ones
+        (protocol housekeeping) are neither logged nor counted as messages.
+        Exact ones only match in upper case, so a chat line such as
+        "reliable" is still chat; the client sends every opcode upper case.
+        """
+        key = opcode.upper() + (":" if args else "")
+        self.commands[key] = handler
+        self.max_opcode_length = max(self.max_opcode_length, len(key))
+        if redact:
+            self.redacted_commands.add(key)
+        if quiet:
+            self.quiet_commands.add(key)
+        if exact:
+            self.exact_commands.add(key)
+    
+    def resolve_command(self, message: str) -> Tuple[Optional[str], str]:
+        """
+        Find the command key for a message, or None for plain chat.
+        Only the short opcode is uppercased, never the whole message, and
+        exact commands are not matched that way.
+        """
+        colon = message.find(":", 0, self.max_opcode_length)
+        if colon >= 0:
+            key = message[:colon + 1]
+            args = message[colon + 1:]
+        elif len(message) <= self.max_opcode_length:
+            key = message
+            args = ""
         else:
-            # Regular broadcast message
+            return None, message  # Fast path: long line with no opcode
+        
+        if key in self.commands:
+            return key, args
+        key = key.upper()
+        if key in self.commands and key not in self.exact_commands:
+            return key, args
+        return None, message
+    
+    def handle_message(self, sender: str, message: str):
+        """Process a message from a client."""
+        key, args = self.resolve_command(message)
+        if key in self.quiet_commands:
+            self.commands[key](sender, args)
+            return
+        
+        self.stats['messages'] += 1
+        
+        # Log the message (never echo secrets such as the admin password)
+        shown = f"{key}***" if key in self.redacted_commands else message
+        self.ui_call(self.log, f"[{sender}] {shown}", 'msg')
+        
+        if key is None:
+            # Regular broadcast message - sending ends the typing burst
+            self.typing.stop_typing(sender)
             self.broadcast_message(sender, message)
+        else:
+            self.commands[key](sender, args)
+    
+    def cmd_quit(self, sender: str, args: str):
+        """QUIT: flush pending frames and disconnect."""
+        with self.lock:
+            conn = self.clients.get(sender)
+        if conn:
+            self.end_session(conn)
+            conn.close()
+    
+    def cmd_ping(self, sender: str, args: str):
+        """PING: answered on the control channel, ahead of any queued data."""
+        self.send_to_user(sender, "PONG|\n")
+    
+    def cmd_list(self, sender: str, args: str):
+        """LIST: send the online users with their statuses."""
+        self.send_to_user(sender, self.userlist_frame())
+    
+    def userlist_frame(self) -> str:
+        """USERS| frame with every online user and status."""
+        with self.lock:
+            user_str = ", ".join(f"{u}({c.status})" for u, c in self.clients.items())
+        return f"USERS|Online: {user_str}\n"
+    
+    def cmd_status(self, sender: str, args: str):
+        """STATUS:away - change the sender's status."""
+        new_status = args.strip().lower()
+        if new_status in [STATUS_ONLINE, STATUS_AWAY, STATUS_BUSY]:
+            with self.lock:
+                conn = self.clients.get(sender)
+                if conn is None:
+                    return
+                old_status, conn.status = conn.status, new_status
+            self.send_to_user(sender, f"OK|Status changed to {new_status}\n")
+            # Everyone else hears about it in the next batched PRESENCE| frame
+            self.presence.status_changed(sender, old_status, new_status)
+    
+    def cmd_reliable(self, sender: str, args: str):
+        """RELIABLE: number sequenced frames explicitly and expect ACKs."""
+        with self.lock:
+            conn = self.clients.get(sender)
+        if conn is None or conn.session is None:
+            return
+        with conn.session.lock:
+            conn.session.reliable = True
+        self.send_to_user(sender, "OK|Reliable delivery on\n")
+    
+    def cmd_ack(self, sender: str, args: str):
+        """ACK:n - the client has every sequenced frame up to n."""
+        with self.lock:
+            conn = self.clients.get(sender)
+        if conn is None or conn.session is None or not args.strip().isdigit():
+            return
+        lag = conn.session.ack(int(args))
+        if lag is not None:
+            self.delivery_lag.record(lag)
+    
+    def cmd_multicast(self, sender: str, args: str):
+        """MULTICAST: take broadcasts from the UDP group instead of this connection."""
+        with self.lock:
+            conn = self.clients.get(sender)
+        if conn is None or conn.session is None:
+            return
+        if self.multicast is None:
+            self.send_to_user(sender, "ERROR|Multicast is not enabled on this server\n")
+            return
+        if tls.is_tls(conn.socket):
+            self.send_to_user(sender, "ERROR|Multicast is unencrypted - staying on TLS\n")
+            return
+        seq = self.multicast.join(conn.session)
+        self.send_to_user(sender, f"MULTICAST|{self.multicast.address}:{seq}\n")
+    
+    def cmd_nack(self, sender: str, args: str):
+        """NACK:first-last - resend group frames a member missed, over TCP."""
+        span = parse_range(args)
+        if self.multicast is None or span is None:
+            return
+        with self.lock:
+            conn = self.clients.get(sender)
+        session = conn.session if conn is not None else None
+        if session is None or session.multicast is None:
+            self.send_to_user(sender, "ERROR|Not a multicast member\n")
+            return
+        # Frames up to the join reached it over TCP; earlier ones were never its to see
+        first = max(span[0], session.multicast + 1)
+        if first > span[1]:
+            return
+        frames, lost = self.multicast.repair(first, span[1])
+        if frames:
+            self.send_to_user(sender, b''.join(frames))
+        for start, end in lost:
+            self.send_to_user(sender, f"MCLOST|{start}-{end}\n")
+    
+    def delivery_report(self) -> List[Dict[str, Any]]:
+        """Per-client sequence, ACK and lag state for reliable sessions."""
+        return [session.delivery() for session in self.sessions.snapshot()]
+    
+    def cmd_typing(self, sender: str, args: str):
+        """TYPING: the sender started (or is still) typing."""
+        self.typing.start_typing(sender)
+    
+    def cmd_stop_typing(self, sender: str, args: str):
+        """STOP_TYPING: the sender's typing burst ended."""
+        self.typing.stop_typing(sender)
+    
+    def cmd_private(self, sender: str, args: str):
+        """TO:username:message - private message."""
+        parts = args.split(":", 1)
+        if len(parts) == 2:
+            target = parts[0].strip()
+            pm_content = parts[1].strip()
+            self.send_private(sender, target, pm_content)
     
     # ─────────────────────────────────────────────────────────────
     # MESSAGING
@@ -616,7 +1676,11 @@ class CyberServer:
         
         try:
             data = message.encode() if isinstance(message, str) else message
-            conn.send(data)
+            trace = self.tracer.current()
+            sent_at = time.perf_counter()
+            conn.push(data)
+            if trace:
+                trace.add('send', sent_at, time.perf_counter(), to=username)
             self.stats['bytes_sent'] += len(data)
             return True
         except Exception:
@@ -625,9 +1689,11 @@ class CyberServer:
     def send_private(self, sender: str, target: str, message: str):
         """Send a private message from one user to another."""
         with self.lock:
-            if target not in self.clients:
-                self.send_to_user(sender, f"ERROR|User '{target}' not found\n")
-                return
+            error = None if target in self.clients else f"ERROR|User '{target}' not found\n"
+        if error:
+            # Sent outside the lock: send_to_user() takes it again
+            self.send_to_user(sender, error)
+            return
         
         # Send to recipient
         self.send_to_user(target, f"MSG|[Private from {sender}]: {message}\n")
@@ -635,33 +1701,80 @@ class CyberServer:
         # Confirm to sender
         self.send_to_user(sender, f"SENT|[Private to {target}]: {message}\n")
         
-        self.root.after(0, lambda: 
-            self.log(f"[DM] {sender} → {target}: {message}", 'admin'))
+        self.ui_call(self.log, f"[DM] {sender} → {target}: {message}", 'admin')
+    
+    def has_members(self, clients: Dict[str, ClientConnection]) -> bool:
+        """Worth sending to the group: someone among `clients` listens there."""
+        return self.multicast is not None and any(
+            conn.session is not None and conn.session.multicast is not None
+            for conn in clients.values())
+    
+    @staticmethod
+    def on_group(conn: ClientConnection, seq: int) -> bool:
+        """True if group frame `seq` reaches this client by multicast (no TCP copy)."""
+        session = conn.session
+        return bool(seq) and session is not None and session.multicast is not None \
+            and seq > session.multicast
     
     def broadcast_message(self, sender: str, message: str):
         """Broadcast a message to all users."""
+        started = time.perf_counter()
+        trace = self.tracer.current()
         with self.lock:
             clients_copy = dict(self.clients)
         
+        # One datagram for every multicast member; the sender keeps its SENT echo
+        group_seq = 0
+        if self.has_members(clients_copy):
+            group_seq = self.multicast.publish(f"MSG|[{sender}]: {message}\n".encode(), sender)
+        
+        # Timing every send costs more than the send itself, so only
+        # sampled (or traced) fan-outs time each recipient
+        self.fanouts += 1
+        timed = trace is not None or self.fanouts % SEND_LATENCY_SAMPLE_EVERY == 0
+        durations = []
+        
         for username, conn in clients_copy.items():
             try:
                 if username == sender:
-                    conn.send(f"SENT|[You]: {message}\n".encode())
+                    data = f"SENT|[You]: {message}\n".encode()
+                elif self.on_group(conn, group_seq):
+                    continue
+                else:
+                    data = f"MSG|[{sender}]: {message}\n".encode()
+                if timed:
+                    sent_at = time.perf_counter()
+                    conn.push(data)
+                    done = time.perf_counter()
+                    durations.append(done - sent_at)
+                    if trace:
+                        trace.add('send', sent_at, done, to=username)
                 else:
-                    conn.send(f"MSG|[{sender}]: {message}\n".encode())
+                    conn.push(data)
                 conn.messages_sent += 1
             except Exception:
                 pass
+        
+        finished = time.perf_counter()
+        if durations:
+            self.send_latency.record_many(durations)
+        self.fanout_latency.record(finished - started)
+        if trace:
+            trace.add('fanout', started, finished, recipients=len(clients_copy))
     
     def broadcast_system(self, message: str, exclude: str = None):
         """Broadcast a system message to all users."""
         with self.lock:
             clients_copy = dict(self.clients)
         
+        group_seq = 0
+        if self.has_members(clients_copy):
+            group_seq = self.multicast.publish(f"SYSTEM|{message}\n".encode(), exclude or '')
+        
         for username, conn in clients_copy.items():
-            if username != exclude:
+            if username != exclude and not self.on_group(conn, group_seq):
                 try:
-                    conn.send(f"SYSTEM|{message}\n".encode())
+                    conn.push(f"SYSTEM|{message}\n".encode())
                 except Exception:
                     pass
     
@@ -709,8 +1822,9 @@ class CyberServer:
             conn = self.clients[username]
         
         try:
+            self.end_session(conn)
             conn.send(f"KICK|{reason}\n".encode())
-            conn.socket.close()
+            conn.close()
         except Exception:
             pass
         
@@ -729,6 +1843,67 @@ class CyberServer:
         
         self.log(f"[BROADCAST] {message}", 'admin')
     
+    def toggle_profiler(self):
+        """Start or stop a profiling window from the dashboard."""
+        if self.profiler.active:
+            threading.Thread(target=self.profiler.stop, daemon=True).start()
+            return
+        
+        mode = self.profile_mode.get()
+        seconds = self.profiler.start(mode, PROFILE_DEFAULT_SECONDS,
+                                      on_finished=self.on_profile_finished)
+        self.profile_btn.configure(text="⏹ Stop Profile")
+        self.log(f"Profiler started ({mode}, up to {seconds:.0f} s)", 'admin')
+    
+    def handle_profile_command(self, sender: str, args: str):
+        """Authenticated PROFILE:password:action[:mode[:seconds]] command."""
+        parts = [""] + args.split(":")
+        password = parts[1]
+        if not hmac.compare_digest(password.encode(), ADMIN_PASSWORD.encode()):
+            self.send_to_user(sender, "ERROR|Not authorized\n")
+            self.ui_call(self.log, f"Rejected PROFILE command from '{sender}'", 'warning')
+            return
+        
+        action = parts[2].strip().lower() if len(parts) > 2 else "start"
+        if action == "stop":
+            if not self.profiler.active:
+                self.send_to_user(sender, "ERROR|Profiler is not running\n")
+                return
+            # Writing the results can take a moment - keep this worker serving
+            threading.Thread(target=self.profiler.stop, daemon=True).start()
+            self.send_to_user(sender, "OK|Profiler stopping\n")
+            return
+        
+        if action != "start":
+            self.send_to_user(sender, "ERROR|Usage: PROFILE:password:start|stop[:mode[:seconds]]\n")
+            return
+        
+        mode = parts[3].strip().lower() if len(parts) > 3 and parts[3].strip() else PROFILE_MODES[0]
+        try:
+            seconds = float(parts[4]) if len(parts) > 4 else PROFILE_DEFAULT_SECONDS
+            seconds = self.profiler.start(
+                mode, seconds,
+                on_finished=lambda path, summary: self.on_profile_finished(path, summary, sender)
+            )
+        except (ValueError, RuntimeError) as e:
+            self.send_to_user(sender, f"ERROR|{e}\n")
+            return
+        
+        self.send_to_user(sender, f"OK|Profiler started ({mode}, up to {seconds:.0f} s)\n")
+        if self.root:
+            self.ui_call(lambda: self.profile_btn.configure(text="⏹ Stop Profile"))
+        self.ui_call(self.log, f"'{sender}' started the profiler ({mode}, {seconds:.0f} s)", 'admin')
+    
+    def on_profile_finished(self, path: Optional[str], summary: str,
+                            requester: Optional[str] = None):
+        """Report a finished profiling window (called from the stopping thread)."""
+        result = f"Profile saved to {path}" if path else "Profile captured nothing"
+        if requester:
+            self.send_to_user(requester, f"SYSTEM|{result} ({summary})\n")
+        self.ui_call(self.log, f"{result} ({summary})", 'admin')
+        if self.root:
+            self.ui_call(lambda: self.profile_btn.configure(text="🔬 Profile"))
+    
     # ─────────────────────────────────────────────────────────────
     # LIFECYCLE
     # ─────────────────────────────────────────────────────────────
@@ -744,7 +1919,18 @@ class CyberServer:
         self.root.destroy()
     
     def run(self):
-        """Start the server GUI."""
+        """Start the server GUI (headless: serve until interrupted)."""
+        if self.root is None:
+            self.start_server()
+            try:
+                while self.running:
+                    time.sleep(0.5)
+            except KeyboardInterrupt:
+                self.stop_server()
+            return
+        
+        if self.takeover:
+            self.start_server()
         self.root.mainloop()
 
 
@@ -0,0 +1,214 @@
+"""
+⚡ CYBER CHAT - Sessions Module
+Resume tokens, per-session sequence numbers and replay buffers
+Students: Adir Buskila & Liav Weizman
+
+MSG, SENT and SYSTEM frames are sequenced: the server counts every one it
+sends on a session and the client counts every one it receives, so no
+number goes on the wire per frame. SESSION|token:seq tells the client
+where the count stands; RESUME:token:seq asks for everything after it.
+
+Reliable mode (client sends RELIABLE) makes the numbers explicit -
+SEQ|n|MSG|... - and the client acknowledges cumulatively with ACK:n.
+Acknowledged frames leave the replay window, so what remains is exactly
+what must be retransmitted after a reconnect, and ACK timing gives the
+delivery lag.
+"""
+
+import base64
+import secrets
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from config import RESUME_BUFFER_FRAMES
+
+
+SEQUENCED_PREFIXES = (b"MSG|", b"SENT|", b"SYSTEM|")
+LAG_SMOOTHING = 0.2     # Weight of the newest sample in the moving lag average
+
+
+def is_sequenced(frame: bytes) -> bool:
+    """True for frames that count towards the session sequence."""
+    return frame.startswith(SEQUENCED_PREFIXES)
+
+
+# ═══════════════════════════════════════════════════════════════
+# SESSION
+# ═══════════════════════════════════════════════════════════════
+
+class Session:
+    """
+    One logged-in user, independent of the TCP connection carrying it.
+    Sequenced frames are recorded and sent under `lock`, so the replay
+    buffer always matches the order on the wire.
+    """
+
+    def __init__(self, username: str, capacity: int = RESUME_BUFFER_FRAMES,
+                 token: Optional[str] = None):
+        self.token = token or secrets.token_urlsafe(18)
+        self.username = username
+        self.seq = 0
+        # (seq, frame, monotonic send time - reliable mode only)
+        self.replay: Deque[Tuple[int, bytes, float]] = deque(maxlen=capacity)
+        self.lock = threading.Lock()
+        self.conn = None                # Connection currently carrying the session
+        self.ended = False              # QUIT, kick or expiry - no resume
+        self.expiry: Optional[threading.Timer] = None
+        self.multicast: Optional[int] = None  # Group frames after this number skip TCP
+
+        # Reliable mode
+        self.reliable = False
+        self.acked = 0
+        self.overflowed = 0             # Unacknowledged frames pushed out of the window
+        self.last_lag = 0.0
+        self.avg_lag = 0.0
+        self.max_lag = 0.0
+
+    def record(self, frame: bytes) -> int:
+        """Number a sequenced frame and keep it for replay (hold `lock`)."""
+        self.seq += 1
+        if self.reliable:
+            if len(self.replay) == self.replay.maxlen:
+                self.overflowed += 1
+            self.replay.append((self.seq, frame, time.monotonic()))
+        else:
+            self.replay.append((self.seq, frame, 0.0))
+        return self.seq
+
+    def wire(self, seq: int, frame: bytes) -> bytes:
+        """Frame as sent: explicitly numbered in reliable mode."""
+        if self.reliable:
+            return b"SEQ|%d|" % seq + frame
+        return frame
+
+    def since(self, seq: int) -> Tuple[int, List[bytes]]:
+        """
+        Buffered frames after `seq`, ready to send (hold `lock`). Also
+        returns the number just before the first - above `seq` if frames
+        were lost.
+        """
+        seq = max(0, min(seq, self.seq))
+        frames = [self.wire(number, frame) for number, frame, _ in self.replay if number > seq]
+        return self.seq - len(frames), frames
+
+    def ack(self, seq: int) -> Optional[float]:
+        """
+        Cumulative acknowledgement: drop every frame up to `seq` from the
+        window. Returns the delivery lag of frame `seq`, if it was pending.
+        """
+        with self.lock:
+            if seq <= self.acked or seq > self.seq:
+                return None
+            self.acked = seq
+            sent_at = None
+            while self.replay and self.replay[0][0] <= seq:
+                number, _, sent = self.replay.popleft()
+                if number == seq:
+                    sent_at = sent
+            if not sent_at:
+                return None  # Sent before reliable mode - no timestamp
+            lag = max(0.0, time.monotonic() - sent_at)
+            self.last_lag = lag
+            if self.avg_lag:
+                self.avg_lag += LAG_SMOOTHING * (lag - self.avg_lag)
+            else:
+                self.avg_lag = lag
+            self.max_lag = max(self.max_lag, lag)
+            return lag
+
+    def delivery(self) -> Dict[str, Any]:
+        """Per-client delivery state for the dashboard and /delivery."""
+        with self.lock:
+            oldest = self.replay[0][2] if self.reliable and self.replay else None
+            return {
+                'user': self.username,
+                'reliable': self.reliable,
+                'seq': self.seq,
+                'acked': self.acked,
+                'unacked': self.seq - self.acked if self.reliable else 0,
+                'overflowed': self.overflowed,
+                'oldest_unacked_ms': (time.monotonic() - oldest) * 1000 if oldest else 0.0,
+                'lag_ms': self.last_lag * 1000,
+                'lag_avg_ms': self.avg_lag * 1000,
+                'lag_max_ms': self.max_lag * 1000,
+            }
+
+    def greeting(self) -> bytes:
+        return f"SESSION|{self.token}:{self.seq}\n".encode()
+
+    def export_state(self) -> Dict[str, Any]:
+        """Serializable form for a hot restart (hold `lock`)."""
+        return {
+            'token': self.token,
+            'username': self.username,
+            'seq': self.seq,
+            'reliable': self.reliable,
+            'acked': self.acked,
+            'multicast': self.multicast,
+            'replay': [[n, base64.b64encode(f).decode(), t] for n, f, t in self.replay],
+        }
+
+
+# ═══════════════════════════════════════════════════════════════
+# SESSION STORE
+# ═══════════════════════════════════════════════════════════════
+
+class SessionStore:
+    """Live sessions by token."""
+
+    def __init__(self, capacity: int = RESUME_BUFFER_FRAMES):
+        self.capacity = capacity
+        self.sessions: Dict[str, Session] = {}
+        self.lock = threading.Lock()
+
+    def open(self, username: str, conn) -> Session:
+        session = Session(username, self.capacity)
+        session.conn = conn
+        with self.lock:
+            self.sessions[session.token] = session
+        return session
+
+    def restore(self, state: Dict[str, Any], conn) -> Session:
+        """Rebuild a session exported by the previous server process."""
+        session = Session(state['username'], self.capacity, state['token'])
+        session.seq = state['seq']
+        session.reliable = state['reliable']
+        session.acked = state['acked']
+        session.multicast = state.get('multicast')
+        # CLOCK_MONOTONIC is system-wide, so send times survive the restart
+        session.replay.extend((n, base64.b64decode(f), t) for n, f, t in state['replay'])
+        session.conn = conn
+        with self.lock:
+            self.sessions[session.token] = session
+        return session
+
+    def get(self, token: str) -> Optional[Session]:
+        with self.lock:
+            session = self.sessions.get(token)
+        if session is None or session.ended:
+            return None
+        return session
+
+    def end(self, session: Session):
+        """Forget a session for good."""
+        session.ended = True
+        if session.expiry is not None:
+            session.expiry.cancel()
+            session.expiry = None
+        with self.lock:
+            self.sessions.pop(session.token, None)
+
+    def clear(self):
+        with self.lock:
+            sessions = list(self.sessions.values())
+        for session in sessions:
+            self.end(session)
+
+    def snapshot(self) -> List[Session]:
+        with self.lock:
+            return list(self.sessions.values())
+
+    def __len__(self) -> int:
+        return len(self.sessions)
@@ -0,0 +1,296 @@
+"""
+⚡ CYBER CHAT - Soak Test
+Long-running connection churn with resource leak tracking
+Students: Adir Buskila & Liav Weizman
+
+Runs a headless server in this process while a child process keeps
+connecting, chatting and disconnecting bot clients. RSS, thread count,
+open file descriptors and tracemalloc totals are sampled at intervals;
+after a warm-up period a least-squares slope is fitted to each series
+and the run fails if any of them grows faster than its configured limit.
+
+Usage:
+    python main.py soak --duration 4h
+    python main.py soak --duration 30m --interval 15 --bots 100
+    python main.py soak --max-rss-slope 10 --max-fd-slope 0
+"""
+
+import argparse
+import json
+import multiprocessing as mp
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from config import DEFAULT_HOST, POOL_WORKERS
+from utils import format_bytes, format_uptime, get_memory_usage, get_open_fds
+
+
+# Maximum growth per hour once warmed up
+DEFAULT_SLOPES = {
+    'rss_mb': 20.0,
+    'traced_mb': 10.0,
+    'threads': 2.0,
+    'fds': 5.0,
+}
+
+
+# ═══════════════════════════════════════════════════════════════
+# CHURN DRIVER (CHILD PROCESS)
+# ═══════════════════════════════════════════════════════════════
+
+def _churn(host: str, port: int, bots: int, rate: float, cycle: float, stop):
+    """Connect, chat and disconnect waves of bots until told to stop."""
+    from loadtest import LoadGenerator
+
+    wave = 0
+    while not stop.is_set():
+        generator = LoadGenerator(host, port, bots, rate, cycle,
+                                  {'chat': 70, 'dm': 10, 'status': 10, 'list': 10},
+                                  prefix=f"soak{wave % 100}b")
+        try:
+            generator.connect_all(timeout=10)
+            generator.drive()
+        except OSError:
+            time.sleep(1)  # Server busy or restarting - try the next wave
+        finally:
+            generator.close()
+        wave += 1
+
+
+# ═══════════════════════════════════════════════════════════════
+# RESOURCE SAMPLING
+# ═══════════════════════════════════════════════════════════════
+
+class ResourceSampler:
+    """Samples process resources and keeps the series for slope fitting."""
+
+    def __init__(self, top: int = 5, trace: bool = True):
+        self.top = top
+        self.trace = trace
+        self.samples: List[Dict[str, Any]] = []
+        self.started = time.monotonic()
+        self.warm_snapshot: Optional[tracemalloc.Snapshot] = None
+        if trace:
+            tracemalloc.start()
+
+    def sample(self, server) -> Dict[str, Any]:
+        """Take one sample of the current process."""
+        with server.lock:
+            clients = len(server.clients)
+
+        sample = {
+            'elapsed_s': time.monotonic() - self.started,
+            'rss_mb': get_memory_usage() / (1024 * 1024),
+            'threads': threading.active_count(),
+            'fds': get_open_fds(),
+            'clients': clients,
+            'total_connections': server.stats['total_connections'],
+            'messages': server.stats['messages'],
+        }
+
+        if self.trace:
+            snapshot = tracemalloc.take_snapshot()
+            sample['traced_mb'] = tracemalloc.get_traced_memory()[0] / (1024 * 1024)
+            sample['top_allocations'] = [
+                f"{stat.traceback[0].filename}:{stat.traceback[0].lineno} "
+                f"{format_bytes(stat.size)} in {stat.count} blocks"
+                for stat in snapshot.statistics('lineno')[:self.top]
+            ]
+
+        self.samples.append(sample)
+        return sample
+
+    def mark_warm(self):
+        """Remember the current allocations as the leak-comparison point."""
+        if self.trace:
+            self.warm_snapshot = tracemalloc.take_snapshot()
+
+    def growth_since_warm(self, limit: int = 10) -> List[str]:
+        """Allocation sites that grew the most since warm-up."""
+        if not self.trace or self.warm_snapshot is None:
+            return []
+        diff = tracemalloc.take_snapshot().compare_to(self.warm_snapshot, 'lineno')
+        return [
+            f"{stat.traceback[0].filename}:{stat.traceback[0].lineno} "
+            f"{'+' if stat.size_diff >= 0 else '-'}{format_bytes(abs(stat.size_diff))} "
+            f"({stat.count_diff:+d} blocks)"
+            for stat in diff[:limit] if stat.size_diff > 0
+        ]
+
+    def stop(self):
+        if self.trace:
+            tracemalloc.stop()
+
+
+def fit_slope(points: List[Tuple[float, float]]) -> float:
+    """Least-squares slope of (seconds, value) points, per hour."""
+    if len(points) < 2:
+        return 0.0
+    n = len(points)
+    mean_x = sum(x for x, _ in points) / n
+    mean_y = sum(y for _, y in points) / n
+    var_x = sum((x - mean_x) ** 2 for x, _ in points)
+    if var_x == 0:
+        return 0.0
+    cov = sum((x - mean_x) * (y - mean_y) for x, y in points)
+    return cov / var_x * 3600
+
+
+def evaluate(samples: List[Dict[str, Any]], warmup: float,
+             limits: Dict[str, float]) -> Dict[str, Dict[str, Any]]:
+    """Fit a slope to every metric after warm-up and compare to its limit."""
+    warm = [s for s in samples if s['elapsed_s'] >= warmup]
+    verdicts = {}
+    for metric, limit in limits.items():
+        points = [(s['elapsed_s'], s[metric]) for s in warm if s.get(metric) is not None]
+        if len(points) < 3:
+            continue
+        slope = fit_slope(points)
+        verdicts[metric] = {
+            'slope_per_hour': slope,
+            'limit_per_hour': limit,
+            'first': points[0][1],
+            'last': points[-1][1],
+            'passed': slope <= limit,
+        }
+    return verdicts
+
+
+# ═══════════════════════════════════════════════════════════════
+# SOAK RUN
+# ═══════════════════════════════════════════════════════════════
+
+def parse_duration(text: str) -> float:
+    """Parse '90', '90s', '30m' or '4h' into seconds."""
+    units = {'s': 1, 'm': 60, 'h': 3600}
+    text = text.strip().lower()
+    if text and text[-1] in units:
+        return float(text[:-1]) * units[text[-1]]
+    return float(text)
+
+
+def run_soak(args) -> int:
+    """Run the soak test. Returns a process exit code."""
+    from server import CyberServer
+
+    limits = {
+        'rss_mb': args.max_rss_slope,
+        'traced_mb': args.max_traced_slope,
+        'threads': args.max_thread_slope,
+        'fds': args.max_fd_slope,
+    }
+    if args.no_tracemalloc:
+        del limits['traced_mb']
+
+    server = CyberServer(port=args.port, workers=args.workers, headless=True)
+    server.echo_logs = False
+    server.start_server()
+    if not server.running:
+        print("❌ Server failed to start")
+        return 2
+
+    sampler = ResourceSampler(trace=not args.no_tracemalloc)
+    ctx = mp.get_context('spawn')
+    stop = ctx.Event()
+    churn = ctx.Process(target=_churn, daemon=True,
+                        args=(DEFAULT_HOST, args.port, args.bots, args.rate, args.cycle, stop))
+    churn.start()
+
+    output = args.output or f"soak_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl"
+    print(f"⚡ Soak test: {format_uptime(int(args.duration))} · {args.bots} bots per wave · "
+          f"sampling every {args.interval:.0f} s → {output}")
+
+    warmed = False
+    try:
+        with open(output, 'w', encoding='utf-8') as f:
+            deadline = time.monotonic() + args.duration
+            while time.monotonic() < deadline:
+                time.sleep(min(args.interval, max(0.0, deadline - time.monotonic())))
+                sample = sampler.sample(server)
+                f.write(json.dumps(sample) + "\n")
+                f.flush()
+
+                if not warmed and sample['elapsed_s'] >= args.warmup:
+                    sampler.mark_warm()
+                    warmed = True
+
+                print(f"[{format_uptime(int(sample['elapsed_s']))}] "
+                      f"rss {sample['rss_mb']:.1f} MB · threads {sample['threads']} · "
+                      f"fds {sample['fds']} · clients {sample['clients']} · "
+                      f"conns {sample['total_connections']} · msgs {sample['messages']}")
+    except KeyboardInterrupt:
+        print("Interrupted - evaluating collected samples")
+    finally:
+        stop.set()
+        churn.join(timeout=args.cycle + 10)
+        if churn.is_alive():
+            churn.terminate()
+
+    growth = sampler.growth_since_warm()
+    server.stop_server()
+    sampler.stop()
+
+    verdicts = evaluate(sampler.samples, args.warmup, limits)
+    print()
+    print(f"{'metric':<12}{'first':>10}{'last':>10}{'slope/h':>12}{'limit/h':>10}")
+    for metric, v in verdicts.items():
+        mark = "✅" if v['passed'] else "❌"
+        print(f"{metric:<12}{v['first']:>10.1f}{v['last']:>10.1f}"
+              f"{v['slope_per_hour']:>+12.2f}{v['limit_per_hour']:>10.1f}  {mark}")
+
+    if growth:
+        print("\nTop allocation growth since warm-up:")
+        for line in growth:
+            print(f"  {line}")
+
+    if not verdicts:
+        print("\nNot enough samples after warm-up to fit slopes.")
+        return 0
+
+    failed = [metric for metric, v in verdicts.items() if not v['passed']]
+    if failed:
+        print(f"\n❌ Soak test failed: {', '.join(failed)} grew past the configured slope")
+        return 1
+    print("\n✅ Soak test passed")
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command-line entry point (python main.py soak ...)."""
+    parser = argparse.ArgumentParser(prog="main.py soak",
+                                     description="Churn connections and watch for resource leaks")
+    parser.add_argument('--duration', type=parse_duration, default=parse_duration('1h'),
+                        help="total run time, e.g. 600, 30m, 4h (default 1h)")
+    parser.add_argument('--interval', type=parse_duration, default=30.0,
+                        help="seconds between samples (default 30)")
+    parser.add_argument('--warmup', type=parse_duration, default=None,
+                        help="ignored for slopes (default 10%% of duration)")
+    parser.add_argument('--bots', type=int, default=50, help="bots per churn wave")
+    parser.add_argument('--rate', type=float, default=50.0, help="ops/s per wave")
+    parser.add_argument('--cycle', type=float, default=20.0, help="seconds per churn wave")
+    parser.add_argument('--port', type=int, default=24567)
+    parser.add_argument('--workers', type=int, default=POOL_WORKERS,
+                        help="pool workers (0 = thread per client)")
+    parser.add_argument('--no-tracemalloc', action='store_true',
+                        help="skip allocation tracing (lower overhead)")
+    parser.add_argument('--max-rss-slope', type=float, default=DEFAULT_SLOPES['rss_mb'],
+                        help="MB per hour")
+    parser.add_argument('--max-traced-slope', type=float, default=DEFAULT_SLOPES['traced_mb'],
+                        help="traced MB per hour")
+    parser.add_argument('--max-thread-slope', type=float, default=DEFAULT_SLOPES['threads'],
+                        help="threads per hour")
+    parser.add_argument('--max-fd-slope', type=float, default=DEFAULT_SLOPES['fds'],
+                        help="file descriptors per hour")
+    parser.add_argument('--output', help="samples file (default: soak_<timestamp>.jsonl)")
+    args = parser.parse_args(argv)
+
+    if args.warmup is None:
+        args.warmup = args.duration * 0.1
+    return run_soak(args)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
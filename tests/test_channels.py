@@ -0,0 +1,57 @@
+"""
+⚡ CYBER CHAT - Channel Priority Tests
+Chat latency on a connection that is also receiving bulk file data
+Students: Adir Buskila & Liav Weizman
+
+Runs the channel benchmark scenario at a small size: three uploaders
+fill a slow reader's downlink with FILE_CHUNK frames while it is sent
+private messages and pings the server. With channel priorities, chat
+and PONG frames must overtake the bulk backlog that a plain FIFO
+outbox leaves them queued behind - in both server modes.
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.channel_bench import MODES, run_mode
+from config import POOL_WORKERS
+
+
+UPLOADERS = 3
+MEGABYTES = 2          # per upload
+READ_RATE = 2.0        # reader MB/s: ~3 s of bulk backlog
+RCVBUF = 64 * 1024
+INTERVAL = 0.02        # seconds between chat messages (and pings)
+CHAT_BUDGET_MS = 150   # prioritized chat p99 must stay under this
+
+
+@pytest.fixture(scope='module', params=[POOL_WORKERS, 0], ids=['pool', 'threads'])
+def results(request):
+    """{mode: run_mode() result} for one server mode."""
+    port = 24700 + 10 * request.param_index
+    return {mode: run_mode(mode, env, port + offset, request.param, UPLOADERS,
+                           MEGABYTES, READ_RATE, RCVBUF, INTERVAL)
+            for offset, (mode, env) in enumerate(MODES)}
+
+
+def test_bulk_completes(results):
+    for result in results.values():
+        assert result['completed'] == UPLOADERS
+
+
+def test_chat_overtakes_bulk(results):
+    fifo, prioritized = results['fifo']['chat'], results['prioritized']['chat']
+    assert prioritized['samples'] > 0 and fifo['samples'] > 0
+    assert prioritized['p99_ms'] < CHAT_BUDGET_MS
+    assert prioritized['p99_ms'] < fifo['p50_ms']
+
+
+def test_ping_overtakes_bulk(results):
+    fifo, prioritized = results['fifo']['ping'], results['prioritized']['ping']
+    assert prioritized['samples'] > 0
+    assert prioritized['p99_ms'] < CHAT_BUDGET_MS
+    assert prioritized['p99_ms'] < fifo['p50_ms']
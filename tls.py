@@ -0,0 +1,137 @@
+"""
+⚡ CYBER CHAT - TLS Module
+Self-signed certificates and TLS contexts for server and client
+Students: Adir Buskila & Liav Weizman
+
+The certificate is created on first use with the `cryptography` package
+when it is installed, otherwise with the `openssl` command. Clients on
+the same machine trust that exact certificate, which is enough for
+local testing; point TLS_CERT_FILE at a real certificate otherwise.
+"""
+
+import datetime
+import ipaddress
+import os
+import shutil
+import ssl
+import subprocess
+from typing import Sequence
+
+from config import (
+    TLS_CERT_FILE, TLS_KEY_FILE, TLS_CERT_DAYS, TLS_VERIFY, TLS_SESSION_TICKETS
+)
+
+
+DEFAULT_NAMES = ('localhost', '127.0.0.1', '::1')
+
+
+# ═══════════════════════════════════════════════════════════════
+# SELF-SIGNED CERTIFICATE
+# ═══════════════════════════════════════════════════════════════
+
+def ensure_certificate(cert_file: str = TLS_CERT_FILE, key_file: str = TLS_KEY_FILE,
+                       names: Sequence[str] = DEFAULT_NAMES) -> bool:
+    """Create a self-signed certificate if none exists. Returns True if created."""
+    if os.path.exists(cert_file) and os.path.exists(key_file):
+        return False
+
+    for path in (cert_file, key_file):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    try:
+        _generate_with_cryptography(cert_file, key_file, names)
+    except ImportError:
+        _generate_with_openssl(cert_file, key_file, names)
+    os.chmod(key_file, 0o600)
+    return True
+
+
+def _is_ip(name: str) -> bool:
+    try:
+        ipaddress.ip_address(name)
+        return True
+    except ValueError:
+        return False
+
+
+def _generate_with_cryptography(cert_file: str, key_file: str, names: Sequence[str]):
+    from cryptography import x509
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import ec
+    from cryptography.x509.oid import NameOID
+
+    key = ec.generate_private_key(ec.SECP256R1())
+    subject = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "Cyber Chat")])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    alt_names = [x509.IPAddress(ipaddress.ip_address(n)) if _is_ip(n) else x509.DNSName(n)
+                 for n in names]
+
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(subject)
+        .issuer_name(subject)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - datetime.timedelta(minutes=5))
+        .not_valid_after(now + datetime.timedelta(days=TLS_CERT_DAYS))
+        .add_extension(x509.SubjectAlternativeName(alt_names), critical=False)
+        .add_extension(x509.BasicConstraints(ca=True, path_length=None), critical=True)
+        .sign(key, hashes.SHA256())
+    )
+
+    with open(key_file, 'wb') as f:
+        f.write(key.private_bytes(serialization.Encoding.PEM,
+                                  serialization.PrivateFormat.PKCS8,
+                                  serialization.NoEncryption()))
+    with open(cert_file, 'wb') as f:
+        f.write(cert.public_bytes(serialization.Encoding.PEM))
+
+
+def _generate_with_openssl(cert_file: str, key_file: str, names: Sequence[str]):
+    if shutil.which('openssl') is None:
+        raise RuntimeError("TLS needs the 'cryptography' package or the openssl "
+                           "command to create a certificate")
+    alt_names = ",".join(f"IP:{n}" if _is_ip(n) else f"DNS:{n}" for n in names)
+    subprocess.run(
+        ['openssl', 'req', '-x509', '-newkey', 'ec',
+         '-pkeyopt', 'ec_paramgen_curve:prime256v1', '-nodes',
+         '-days', str(TLS_CERT_DAYS), '-subj', '/CN=Cyber Chat',
+         '-addext', f"subjectAltName={alt_names}",
+         '-keyout', key_file, '-out', cert_file],
+        check=True, capture_output=True,
+    )
+
+
+# ═══════════════════════════════════════════════════════════════
+# CONTEXTS
+# ═══════════════════════════════════════════════════════════════
+
+def server_context(cert_file: str = TLS_CERT_FILE,
+                   key_file: str = TLS_KEY_FILE) -> ssl.SSLContext:
+    """
+    Server context. Resumption works out of the box: TLS 1.3 tickets
+    (TLS_SESSION_TICKETS per handshake) and TLS 1.2 tickets/session cache
+    are keyed to this context, so keep one per server process.
+    """
+    ensure_certificate(cert_file, key_file)
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.minimum_version = ssl.TLSVersion.TLSv1_2
+    context.load_cert_chain(cert_file, key_file)
+    context.num_tickets = TLS_SESSION_TICKETS
+    return context
+
+
+def client_context(cert_file: str = TLS_CERT_FILE, verify: bool = TLS_VERIFY) -> ssl.SSLContext:
+    """Client context that trusts our self-signed certificate when present."""
+    cafile = cert_file if os.path.exists(cert_file) else None
+    context = ssl.create_default_context(cafile=cafile)
+    context.minimum_version = ssl.TLSVersion.TLSv1_2
+    if not verify:
+        context.check_hostname = False
+        context.verify_mode = ssl.CERT_NONE
+    return context
+
+
+def is_tls(sock) -> bool:
+    return isinstance(sock, ssl.SSLSocket)
@@ -0,0 +1,100 @@
+"""
+⚡ CYBER CHAT - Tracing Module
+Sampled per-message traces kept in an in-memory ring
+Students: Adir Buskila & Liav Weizman
+"""
+
+import json
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+from config import TRACE_SAMPLE_RATE, TRACE_RING_SIZE
+
+
+# ═══════════════════════════════════════════════════════════════
+# TRACE
+# ═══════════════════════════════════════════════════════════════
+
+class Trace:
+    """One inbound frame's journey: a trace ID plus timed spans."""
+
+    def __init__(self, user: Optional[str], size: int, origin: float):
+        self.trace_id = f"{random.getrandbits(64):016x}"
+        self.user = user
+        self.size = size
+        self.origin = origin        # perf_counter() when the bytes arrived
+        self.wall = time.time()
+        self.spans: List[Dict[str, Any]] = []
+
+    def add(self, name: str, start: float, end: float, **attrs):
+        """Record a span from two perf_counter() readings."""
+        span = {
+            'name': name,
+            'start_us': round((start - self.origin) * 1e6, 1),
+            'duration_us': round((end - start) * 1e6, 1),
+        }
+        if attrs:
+            span.update(attrs)
+        self.spans.append(span)
+
+    def to_dict(self) -> Dict[str, Any]:
+        self.spans.sort(key=lambda s: s['start_us'])
+        total = max((s['start_us'] + s['duration_us'] for s in self.spans), default=0.0)
+        return {
+            'trace_id': self.trace_id,
+            'time': self.wall,
+            'user': self.user,
+            'bytes': self.size,
+            'total_us': round(total, 1),
+            'spans': self.spans,
+        }
+
+
+# ═══════════════════════════════════════════════════════════════
+# TRACER
+# ═══════════════════════════════════════════════════════════════
+
+class Tracer:
+    """
+    Head-sampled tracer. The active trace lives in a thread-local because
+    a frame is decoded, dispatched and fanned out on one thread.
+    """
+
+    def __init__(self, sample_rate: float = TRACE_SAMPLE_RATE,
+                 capacity: int = TRACE_RING_SIZE):
+        self.sample_rate = sample_rate
+        self.ring: Deque[Dict[str, Any]] = deque(maxlen=capacity)
+        self.local = threading.local()
+        self.started = 0
+
+    def begin(self, user: Optional[str], size: int, origin: float) -> Optional[Trace]:
+        """Start a trace for one frame if it is sampled."""
+        if not self.sample_rate or random.random() >= self.sample_rate:
+            return None
+        trace = Trace(user, size, origin)
+        self.local.trace = trace
+        self.started += 1
+        return trace
+
+    def current(self) -> Optional[Trace]:
+        """Trace active on this thread, if any."""
+        return getattr(self.local, 'trace', None)
+
+    def finish(self, trace: Trace):
+        """Close the trace and keep it in the ring."""
+        self.local.trace = None
+        self.ring.append(trace.to_dict())
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        return list(self.ring)
+
+    def dump(self, path: str) -> int:
+        """Write the ring as JSON lines, oldest first. Returns the trace count."""
+        traces = self.snapshot()
+        with open(path, 'w', encoding='utf-8') as f:
+            for trace in traces:
+                f.write(json.dumps(trace) + "\n")
+        return len(traces)
@@ -0,0 +1,581 @@
+"""
+⚡ CYBER CHAT - File Transfer Module
+Chunked user-to-user file transfer, relayed by the server
+Students: Adir Buskila & Liav Weizman
+
+Protocol (client → server, forwarded by the server as OPCODE|...):
+
+    FILE_OFFER:bob:id:size:src:name  alice offers a file   → bob     FILE_OFFER|alice:id:size:src:name
+    FILE_ACCEPT:id:offset            bob wants it from here → alice   FILE_ACCEPT|id:offset
+    FILE_REJECT:id                   bob declines          → alice   FILE_CANCEL|id:reason
+    FILE_CHUNK:id:offset:base64      alice streams data    → bob     FILE_CHUNK|id:offset:base64
+    FILE_ACK:id:offset               bob holds `offset`    → alice   FILE_ACK|id:offset
+    FILE_CANCEL:id                   either side gives up  → other   FILE_CANCEL|id:reason
+
+The sender keeps at most FILE_WINDOW_CHUNKS chunks beyond the last ACK
+in flight, and the server refuses anything past that window, so a
+transfer never holds more than one window in server memory however big
+the file is. `src` identifies the sender's file (path, size and mtime,
+hashed). Chunks are not sequenced frames: they skip the replay
+buffer and a dropped connection simply loses the ones in flight. When
+either user resumes the session the server sends the receiver
+FILE_RESYNC|id, the receiver answers with FILE_ACCEPT from what it has
+on disk and the sender rewinds to that offset. Partial downloads are
+kept as <name>.part with the offer's `src` in <name>.part.src, so
+offering the same file again later also picks up where it stopped; a
+.part from any other file is started over.
+"""
+
+import base64
+import hashlib
+import os
+import secrets
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, List, Optional
+
+from config import (
+    FILE_CHUNK_SIZE, FILE_WINDOW_CHUNKS, FILE_MAX_SIZE, FILE_PROGRESS_INTERVAL, DOWNLOAD_DIR
+)
+from utils import format_bytes
+
+
+FILE_FRAMES = ("FILE_OFFER", "FILE_ACCEPT", "FILE_CHUNK", "FILE_ACK",
+               "FILE_CANCEL", "FILE_RESYNC")
+PART_SUFFIX = ".part"
+SOURCE_SUFFIX = ".part.src"
+
+
+def safe_filename(name: str) -> str:
+    """Base name only, without path tricks or protocol separators."""
+    name = os.path.basename(name.replace("\\", "/")).strip()
+    name = "".join("_" if c in "\n\r:" else c for c in name)
+    return name if name not in ("", ".", "..") else "file"
+
+
+def file_source(path: str) -> str:
+    """Short identity of a file's current version: path, size and mtime."""
+    st = os.stat(path)
+    key = f"{os.path.abspath(path)}:{st.st_size}:{st.st_mtime_ns}"
+    return hashlib.sha1(key.encode()).hexdigest()[:16]
+
+
+# ═══════════════════════════════════════════════════════════════
+# SERVER SIDE - RELAY
+# ═══════════════════════════════════════════════════════════════
+
+class RelayedTransfer:
+    """One transfer as the server sees it: who, how big, how far."""
+
+    def __init__(self, transfer_id: str, sender: str, receiver: str, name: str, size: int,
+                 source: str = ""):
+        self.id = transfer_id
+        self.sender = sender
+        self.receiver = receiver
+        self.name = name
+        self.size = size
+        self.source = source
+        self.accepted = False
+        self.acked = 0                  # Bytes the receiver confirmed
+        self.relayed = 0                # Bytes passed through, resends included
+        self.started = time.monotonic()
+
+    def involves(self, username: str) -> bool:
+        return username in (self.sender, self.receiver)
+
+    def peer_of(self, username: str) -> str:
+        return self.receiver if username == self.sender else self.sender
+
+    def export_state(self) -> Dict[str, Any]:
+        return {'id': self.id, 'sender': self.sender, 'receiver': self.receiver,
+                'name': self.name, 'size': self.size, 'source': self.source,
+                'accepted': self.accepted,
+                'acked': self.acked, 'relayed': self.relayed}
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> 'RelayedTransfer':
+        transfer = cls(state['id'], state['sender'], state['receiver'],
+                       state['name'], state['size'], state.get('source', ''))
+        transfer.accepted = state['accepted']
+        transfer.acked = state['acked']
+        transfer.relayed = state['relayed']
+        return transfer
+
+
+class TransferRelay:
+    """
+    Forwards FILE_* frames between users. Only the bookkeeping above is
+    kept per transfer; chunk data goes straight to the receiver's socket.
+    """
+
+    def __init__(self, server, chunk_size: int = FILE_CHUNK_SIZE,
+                 window: int = FILE_WINDOW_CHUNKS, max_size: int = FILE_MAX_SIZE):
+        self.server = server
+        self.chunk_size = chunk_size
+        self.window_bytes = window * chunk_size
+        self.max_encoded = len(base64.b64encode(bytes(chunk_size)))
+        self.max_size = max_size
+        self.transfers: Dict[str, RelayedTransfer] = {}
+        self.lock = threading.Lock()
+
+        # Accounting
+        self.bytes_relayed = 0
+        self.completed = 0
+
+    def _send(self, username: str, frame: str):
+        self.server.send_to_user(username, frame)
+
+    def _cancel(self, username: str, transfer_id: str, reason: str):
+        self._send(username, f"FILE_CANCEL|{transfer_id}:{reason}\n")
+
+    def _find(self, transfer_id: str, username: str) -> Optional[RelayedTransfer]:
+        transfer = self.transfers.get(transfer_id)
+        if transfer is None or not transfer.involves(username):
+            return None
+        return transfer
+
+    # ─────────────────────────────────────────────────────────────
+    # COMMANDS
+    # ─────────────────────────────────────────────────────────────
+
+    def cmd_offer(self, sender: str, args: str):
+        """FILE_OFFER:target:id:size:src:name"""
+        parts = args.split(":", 4)
+        if len(parts) != 5:
+            return
+        target, transfer_id, size, source, name = (p.strip() for p in parts)
+        if not transfer_id:
+            return
+        if not size.isdigit() or int(size) > self.max_size:
+            self._cancel(sender, transfer_id, f"files are limited to {self.max_size} bytes")
+            return
+        with self.server.lock:
+            online = target in self.server.clients
+        if not online or target == sender:
+            self._cancel(sender, transfer_id, f"user '{target}' not found")
+            return
+
+        name = safe_filename(name)
+        with self.lock:
+            if transfer_id in self.transfers:
+                self._cancel(sender, transfer_id, "duplicate transfer id")
+                return
+            self.transfers[transfer_id] = RelayedTransfer(transfer_id, sender, target,
+                                                          name, int(size), source)
+        self._send(target, f"FILE_OFFER|{sender}:{transfer_id}:{size}:{source}:{name}\n")
+        self.server.ui_call(self.server.log, f"[FILE] {sender} → {target}: "
+                                             f"'{name}' ({format_bytes(int(size))})", 'admin')
+
+    def cmd_accept(self, sender: str, args: str):
+        """FILE_ACCEPT:id:offset - also the receiver's answer to FILE_RESYNC."""
+        transfer_id, _, offset = args.partition(":")
+        with self.lock:
+            transfer = self._find(transfer_id, sender)
+            if transfer is None or transfer.receiver != sender or not offset.isdigit():
+                return
+            transfer.accepted = True
+            transfer.acked = min(int(offset), transfer.size)
+            offset = transfer.acked
+        self._send(transfer.sender, f"FILE_ACCEPT|{transfer_id}:{offset}\n")
+
+    def cmd_reject(self, sender: str, args: str):
+        """FILE_REJECT:id"""
+        self.end(args.strip(), sender, f"declined by {sender}")
+
+    def cmd_cancel(self, sender: str, args: str):
+        """FILE_CANCEL:id"""
+        self.end(args.strip(), sender, f"cancelled by {sender}")
+
+    def cmd_chunk(self, sender: str, args: str):
+        """FILE_CHUNK:id:offset:base64 - forwarded as is, never stored."""
+        transfer_id, _, rest = args.partition(":")
+        offset, _, data = rest.partition(":")
+        transfer = self.transfers.get(transfer_id)
+        if transfer is None or transfer.sender != sender:
+            self._cancel(sender, transfer_id, "unknown transfer")
+            return
+        if (not transfer.accepted or not offset.isdigit() or len(data) > self.max_encoded
+                or int(offset) >= transfer.acked + self.window_bytes):
+            # Past the window the server would have to buffer on the
+            # sender's behalf - that is a misbehaving client
+            self.end(transfer_id, sender, "chunk outside the transfer window",
+                     notify_sender=True)
+            return
+
+        size = len(data) * 3 // 4
+        transfer.relayed += size
+        self.bytes_relayed += size
+        self._send(transfer.receiver, f"FILE_CHUNK|{transfer_id}:{offset}:{data}\n")
+
+    def cmd_ack(self, sender: str, args: str):
+        """FILE_ACK:id:offset - the receiver has the file up to offset."""
+        transfer_id, _, offset = args.partition(":")
+        with self.lock:
+            transfer = self._find(transfer_id, sender)
+            if transfer is None or transfer.receiver != sender or not offset.isdigit():
+                return
+            transfer.acked = max(transfer.acked, min(int(offset), transfer.size))
+            finished = transfer.acked >= transfer.size
+            if finished:
+                del self.transfers[transfer_id]
+                self.completed += 1
+        self._send(transfer.sender, f"FILE_ACK|{transfer_id}:{offset}\n")
+
+        if finished:
+            elapsed = max(time.monotonic() - transfer.started, 1e-6)
+            self.server.ui_call(self.server.log,
+                                f"[FILE] '{transfer.name}' delivered to {transfer.receiver} "
+                                f"({format_bytes(transfer.size)} in {elapsed:.1f}s, "
+                                f"{format_bytes(transfer.size / elapsed)}/s)", 'success')
+
+    # ─────────────────────────────────────────────────────────────
+    # LIFECYCLE
+    # ─────────────────────────────────────────────────────────────
+
+    def end(self, transfer_id: str, username: str, reason: str, notify_sender: bool = False):
+        """Drop a transfer and tell the other side (and `username` if asked)."""
+        with self.lock:
+            transfer = self._find(transfer_id, username)
+            if transfer is None:
+                return
+            del self.transfers[transfer_id]
+        self._cancel(transfer.peer_of(username), transfer_id, reason)
+        self.server.ui_call(self.server.log, f"[FILE] '{transfer.name}' stopped: {reason}", 'warning')
+        if notify_sender:
+            self._cancel(username, transfer_id, reason)
+
+    def user_left(self, username: str):
+        """The user is gone for good: their transfers cannot finish."""
+        with self.lock:
+            ids = [t.id for t in self.transfers.values() if t.involves(username)]
+        for transfer_id in ids:
+            self.end(transfer_id, username, f"{username} left the chat")
+
+    def user_resumed(self, username: str):
+        """
+        Chunks and ACKs in flight on the old connection are lost: ask each
+        receiver where it stands (or repeat an offer it never answered).
+        """
+        with self.lock:
+            transfers = [t for t in self.transfers.values() if t.involves(username)]
+        for transfer in transfers:
+            if transfer.accepted:
+                self._send(transfer.receiver, f"FILE_RESYNC|{transfer.id}\n")
+            elif transfer.receiver == username:
+                self._send(username, f"FILE_OFFER|{transfer.sender}:{transfer.id}:"
+                                     f"{transfer.size}:{transfer.source}:{transfer.name}\n")
+
+    def active(self) -> int:
+        return len(self.transfers)
+
+    def export_state(self) -> List[Dict[str, Any]]:
+        with self.lock:
+            return [t.export_state() for t in self.transfers.values()]
+
+    def restore(self, states: List[Dict[str, Any]]):
+        with self.lock:
+            for state in states:
+                transfer = RelayedTransfer.from_state(state)
+                self.transfers[transfer.id] = transfer
+
+
+# ═══════════════════════════════════════════════════════════════
+# CLIENT SIDE - TRANSFERS
+# ═══════════════════════════════════════════════════════════════
+
+class Transfer(ABC):
+    """Progress shared by both directions."""
+
+    outgoing = False
+
+    def __init__(self, transfer_id: str, peer: str, name: str, size: int):
+        self.id = transfer_id
+        self.peer = peer
+        self.name = name
+        self.size = size
+        self.state = 'offered'          # offered → active → done | cancelled
+        self.reason = ""
+        self.started = time.monotonic()
+        self.resumed_from = 0           # Offset the current run started at
+        self.last_progress = 0.0
+
+    @property
+    @abstractmethod
+    def done_bytes(self) -> int:
+        """Bytes of the file this side has finished with."""
+
+    @property
+    def finished(self) -> bool:
+        return self.state in ('done', 'cancelled')
+
+    def fraction(self) -> float:
+        return self.done_bytes / self.size if self.size else 1.0
+
+    def rate(self) -> float:
+        """Bytes per second since the transfer (re)started."""
+        elapsed = time.monotonic() - self.started
+        return (self.done_bytes - self.resumed_from) / elapsed if elapsed > 0 else 0.0
+
+
+class OutgoingFile(Transfer):
+    outgoing = True
+
+    def __init__(self, transfer_id: str, peer: str, path: str):
+        super().__init__(transfer_id, peer, safe_filename(path), os.path.getsize(path))
+        self.path = path
+        self.source = file_source(path)
+        self.next_offset = 0
+        self.acked = 0
+        self.cond = threading.Condition()
+
+    @property
+    def done_bytes(self) -> int:
+        return self.acked
+
+
+class IncomingFile(Transfer):
+
+    def __init__(self, transfer_id: str, peer: str, name: str, size: int, source: str = ""):
+        super().__init__(transfer_id, peer, name, size)
+        self.source = source            # Sender's file identity, kept next to the .part
+        self.path: Optional[str] = None
+        self.file = None
+        self.offset = 0
+
+    @property
+    def done_bytes(self) -> int:
+        return self.offset
+
+
+class TransferManager:
+    """
+    Client end of the protocol. handle() runs on the receive thread, so
+    chunks are written to disk without a trip through the Tk event loop;
+    on_event(kind, transfer) reports 'offer', 'progress', 'done' and
+    'cancelled' and must hand over to the UI thread itself.
+    """
+
+    def __init__(self, send: Callable[[str], bool], on_event: Callable[[str, Transfer], None],
+                 chunk_size: int = FILE_CHUNK_SIZE, window: int = FILE_WINDOW_CHUNKS,
+                 progress_interval: float = FILE_PROGRESS_INTERVAL):
+        self.send = send
+        self.on_event = on_event
+        self.chunk_size = chunk_size
+        self.window_bytes = window * chunk_size
+        self.progress_interval = progress_interval
+        self.transfers: Dict[str, Transfer] = {}
+
+    def _progress(self, transfer: Transfer):
+        now = time.monotonic()
+        if now - transfer.last_progress >= self.progress_interval:
+            transfer.last_progress = now
+            self.on_event('progress', transfer)
+
+    def _finish(self, transfer: Transfer, state: str, reason: str = ""):
+        if transfer.finished:
+            return
+        if isinstance(transfer, OutgoingFile):
+            with transfer.cond:
+                transfer.state = state
+                transfer.cond.notify_all()
+        else:
+            transfer.state = state
+            if transfer.file is not None:
+                transfer.file.close()  # A cancelled download keeps its .part file
+                transfer.file = None
+        transfer.reason = reason
+        self.transfers.pop(transfer.id, None)
+        self.on_event(state, transfer)
+
+    # ─────────────────────────────────────────────────────────────
+    # SENDING
+    # ─────────────────────────────────────────────────────────────
+
+    def offer(self, target: str, path: str) -> OutgoingFile:
+        """Offer a file; streaming starts once the peer accepts."""
+        transfer = OutgoingFile(secrets.token_hex(4), target, path)
+        self.transfers[transfer.id] = transfer
+        self.send(f"FILE_OFFER:{target}:{transfer.id}:{transfer.size}:{transfer.source}:"
+                  f"{transfer.name}")
+        threading.Thread(target=self._pump, args=(transfer,), daemon=True,
+                         name=f"file-{transfer.id}").start()
+        return transfer
+
+    def _pump(self, transfer: OutgoingFile):
+        """Stream chunks, never more than the window beyond the last ACK."""
+        try:
+            with open(transfer.path, 'rb') as f:
+                while True:
+                    with transfer.cond:
+                        while not transfer.finished and not (
+                                transfer.state == 'active'
+                                and transfer.next_offset < transfer.size
+                                and transfer.next_offset - transfer.acked < self.window_bytes):
+                            transfer.cond.wait()
+                        if transfer.finished:
+                            return
+                        offset = transfer.next_offset
+                        transfer.next_offset = min(offset + self.chunk_size, transfer.size)
+                    f.seek(offset)
+                    data = base64.b64encode(f.read(self.chunk_size)).decode()
+                    # A failed send is fine: the chunk is lost like any other
+                    # in flight, and the resync after reconnecting resends it
+                    self.send(f"FILE_CHUNK:{transfer.id}:{offset}:{data}")
+        except OSError as e:
+            self.cancel(transfer.id, f"cannot read the file ({e.strerror or e})")
+
+    def _on_accept(self, transfer: OutgoingFile, offset: int):
+        """First FILE_ACCEPT, or a resync: (re)start streaming from offset."""
+        with transfer.cond:
+            if transfer.state == 'offered' or offset != transfer.acked:
+                transfer.started = time.monotonic()
+                transfer.resumed_from = offset
+            transfer.state = 'active'
+            transfer.acked = transfer.next_offset = offset
+            transfer.cond.notify_all()
+        self._progress(transfer)
+
+    def _on_ack(self, transfer: OutgoingFile, offset: int):
+        with transfer.cond:
+            transfer.acked = max(transfer.acked, offset)
+            transfer.cond.notify_all()
+        if transfer.acked >= transfer.size:
+            self._finish(transfer, 'done')
+        else:
+            self._progress(transfer)
+
+    # ─────────────────────────────────────────────────────────────
+    # RECEIVING
+    # ─────────────────────────────────────────────────────────────
+
+    def accept(self, transfer_id: str, path: str):
+        """Save an offered file to `path`, continuing a matching .part file."""
+        transfer = self.transfers.get(transfer_id)
+        if not isinstance(transfer, IncomingFile) or transfer.state != 'offered':
+            return
+        try:
+            if os.path.dirname(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+            transfer.file = open(path + PART_SUFFIX, 'ab')
+            if transfer.file.tell() and (transfer.file.tell() > transfer.size
+                                         or not transfer.source
+                                         or read_source(path) != transfer.source):
+                transfer.file.truncate(0)  # Leftover of some other file
+                transfer.file.seek(0)
+            with open(path + SOURCE_SUFFIX, 'w', encoding='utf-8') as f:
+                f.write(transfer.source)
+        except OSError as e:
+            self.reject(transfer_id)
+            transfer.reason = f"cannot write {path} ({e.strerror or e})"
+            self.on_event('cancelled', transfer)
+            return
+
+        transfer.path = path
+        transfer.offset = transfer.resumed_from = transfer.file.tell()
+        transfer.state = 'active'
+        transfer.started = time.monotonic()
+        self.send(f"FILE_ACCEPT:{transfer.id}:{transfer.offset}")
+        if transfer.offset >= transfer.size:
+            # Empty file, or the .part file of this same file already had it all
+            self.send(f"FILE_ACK:{transfer.id}:{transfer.offset}")
+            self._complete(transfer)
+        else:
+            self._progress(transfer)
+
+    def reject(self, transfer_id: str):
+        transfer = self.transfers.pop(transfer_id, None)
+        if transfer is not None:
+            transfer.state = 'cancelled'
+            self.send(f"FILE_REJECT:{transfer_id}")
+
+    def _on_chunk(self, transfer: IncomingFile, offset: int, data: str):
+        if transfer.state != 'active' or offset != transfer.offset:
+            return  # Resent or arriving after a gap - the resync sorts it out
+        try:
+            transfer.file.write(base64.b64decode(data))
+        except (OSError, ValueError) as e:
+            self.cancel(transfer.id, f"cannot write the file ({e})")
+            return
+        transfer.offset = transfer.file.tell()
+        self.send(f"FILE_ACK:{transfer.id}:{transfer.offset}")
+        if transfer.offset >= transfer.size:
+            self._complete(transfer)
+        else:
+            self._progress(transfer)
+
+    def _on_resync(self, transfer: IncomingFile):
+        """Chunks may have been lost with a connection: say where we are."""
+        if transfer.state == 'active':
+            transfer.file.flush()
+            self.send(f"FILE_ACCEPT:{transfer.id}:{transfer.offset}")
+
+    def _complete(self, transfer: IncomingFile):
+        transfer.file.close()
+        transfer.file = None
+        try:
+            os.replace(transfer.path + PART_SUFFIX, transfer.path)
+        except OSError as e:
+            self._finish(transfer, 'cancelled', f"cannot save {transfer.path} ({e.strerror or e})")
+            return
+        try:
+            os.remove(transfer.path + SOURCE_SUFFIX)
+        except OSError:
+            pass
+        self._finish(transfer, 'done')
+
+    # ─────────────────────────────────────────────────────────────
+    # BOTH DIRECTIONS
+    # ─────────────────────────────────────────────────────────────
+
+    def handle(self, msg_type: str, content: str):
+        """A FILE_* frame from the server (receive thread)."""
+        if msg_type == "FILE_OFFER":
+            parts = content.split(":", 4)
+            if len(parts) != 5 or not parts[2].isdigit() or parts[1] in self.transfers:
+                return  # Malformed, or repeated after a resume while still asking
+            sender, transfer_id, size, source, name = parts
+            transfer = IncomingFile(transfer_id, sender, safe_filename(name), int(size), source)
+            self.transfers[transfer_id] = transfer
+            self.on_event('offer', transfer)
+            return
+
+        transfer_id, _, rest = content.partition(":")
+        transfer = self.transfers.get(transfer_id)
+        if transfer is None:
+            return
+        if msg_type == "FILE_CANCEL":
+            self._finish(transfer, 'cancelled', rest)
+        elif msg_type == "FILE_CHUNK" and not transfer.outgoing:
+            offset, _, data = rest.partition(":")
+            if offset.isdigit():
+                self._on_chunk(transfer, int(offset), data)
+        elif msg_type == "FILE_RESYNC" and not transfer.outgoing:
+            self._on_resync(transfer)
+        elif msg_type == "FILE_ACCEPT" and transfer.outgoing and rest.isdigit():
+            self._on_accept(transfer, int(rest))
+        elif msg_type == "FILE_ACK" and transfer.outgoing and rest.isdigit():
+            self._on_ack(transfer, int(rest))
+
+    def cancel(self, transfer_id: str, reason: str = "cancelled"):
+        transfer = self.transfers.get(transfer_id)
+        if transfer is not None:
+            self.send(f"FILE_CANCEL:{transfer_id}")
+            self._finish(transfer, 'cancelled', reason)
+
+    def cancel_all(self, reason: str = "disconnected"):
+        for transfer_id in list(self.transfers):
+            self.cancel(transfer_id, reason)
+
+
+def read_source(path: str) -> str:
+    """The `src` a partial download of `path` was started from ("" if unknown)."""
+    try:
+        with open(path + SOURCE_SUFFIX, encoding='utf-8') as f:
+            return f.read().strip()
+    except OSError:
+        return ""
+
+
+def default_download_path(name: str) -> str:
+    return os.path.join(DOWNLOAD_DIR, safe_filename(name))
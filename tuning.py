@@ -0,0 +1,208 @@
+"""
+⚡ CYBER CHAT - Tuning Module
+Layered settings: config.py defaults < config file < environment < command line
+Students: Adir Buskila & Liav Weizman
+
+The config file is JSON keyed by setting name:
+    {"POOL_WORKERS": 8, "SOCKET_NODELAY": true, "OUTBOX_HIGH_WATERMARK": 262144}
+It is $CYBER_CHAT_CONFIG if set, else cyber_chat.json in the working
+directory when present. Environment variables use the same names with a
+CYBER_CHAT_ prefix (CYBER_CHAT_POOL_WORKERS=8), and main.py takes
+--config FILE and --set NAME=VALUE.
+
+config.py applies the file and environment layers when it is first
+imported; main.py adds the command line before it imports the server or
+client, so every `from config import X` sees the final value. Command
+line values are copied into the environment, so processes we spawn
+(benchmark servers) run with the same profile.
+"""
+
+import json
+import os
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+
+ENV_PREFIX = "CYBER_CHAT_"
+CONFIG_ENV = "CYBER_CHAT_CONFIG"
+DEFAULT_CONFIG_FILE = "cyber_chat.json"
+
+# Settings shown in the startup profile, by group
+PROFILE = (
+    ('Network', ('DEFAULT_HOST', 'DEFAULT_PORT', 'UNIX_SOCKET_PATH', 'MAX_CLIENTS', 'BUFFER_SIZE',
+                 'PING_INTERVAL')),
+    ('Sockets', ('SOCKET_RCVBUF', 'SOCKET_SNDBUF', 'SOCKET_NODELAY', 'SOCKET_KEEPALIVE',
+                 'SOCKET_KEEPALIVE_IDLE', 'SOCKET_KEEPALIVE_INTERVAL', 'SOCKET_KEEPALIVE_COUNT',
+                 'SOCKET_NOTSENT_LOWAT')),
+    ('Channels', ('CHANNEL_PRIORITIES', 'CHANNEL_WEIGHTS', 'CHANNEL_QUANTUM')),
+    ('Multicast', ('MULTICAST_ENABLED', 'MULTICAST_GROUP', 'MULTICAST_PORT', 'MULTICAST_TTL',
+                   'MULTICAST_INTERFACE', 'MULTICAST_REPAIR_FRAMES', 'MULTICAST_REPAIR_BYTES',
+                   'MULTICAST_HEARTBEAT')),
+    ('Pool', ('POOL_WORKERS', 'POOL_MAX_CONNECTIONS', 'POOL_TICK_SECONDS', 'OUTBOX_HIGH_WATERMARK',
+              'SEND_BATCH_BYTES', 'CLOSE_LINGER', 'SHUTDOWN_DRAIN_SECONDS')),
+    ('Sessions', ('RESUME_GRACE_SECONDS', 'RESUME_BUFFER_FRAMES', 'RELIABLE_DELIVERY')),
+    ('Typing', ('TYPING_FLUSH_INTERVAL', 'TYPING_TIMEOUT', 'TYPING_REFRESH')),
+    ('Presence', ('PRESENCE_WINDOW', 'PRESENCE_ANNOUNCE')),
+    ('Files', ('FILE_CHUNK_SIZE', 'FILE_WINDOW_CHUNKS', 'FILE_MAX_SIZE')),
+    ('Client UI', ('UI_TICK_MS', 'UI_FRAMES_PER_TICK', 'UI_TICK_BUDGET_MS',
+                   'CHAT_RENDER_WINDOW', 'CHAT_PAGE_SIZE', 'CHAT_SCROLLBACK')),
+    ('Hot restart', ('HOT_RESTART', 'HANDOFF_SOCKET', 'HANDOFF_TIMEOUT')),
+    ('TLS', ('TLS_ENABLED', 'TLS_SESSION_TICKETS', 'TLS_HANDSHAKE_TIMEOUT')),
+    ('Metrics', ('METRICS_PORT', 'SEND_LATENCY_SAMPLE_EVERY', 'TRACE_SAMPLE_RATE')),
+)
+
+TRUE_WORDS = ('1', 'true', 'yes', 'on')
+FALSE_WORDS = ('0', 'false', 'no', 'off')
+
+_defaults: Dict[str, Any] = {}
+_settings: Dict[str, Any] = {}       # config.py's globals, once loaded
+sources: Dict[str, str] = {}          # {name: 'file' | 'env' | 'cli'} for overridden settings
+config_file: Optional[str] = None     # File layer in use, if any
+
+
+# ═══════════════════════════════════════════════════════════════
+# VALUES
+# ═══════════════════════════════════════════════════════════════
+
+def _tunable(namespace: Dict[str, Any]) -> Dict[str, Any]:
+    """Upper-case scalar and tuple settings (not COLORS/FONTS or imports)."""
+    return {name: value for name, value in namespace.items()
+            if name.isupper() and isinstance(value, (bool, int, float, str, tuple))}
+
+
+def _scalar(default: Any, value: Any) -> Any:
+    if isinstance(default, bool):
+        if isinstance(value, bool):
+            return value
+        word = str(value).strip().lower()
+        if word in TRUE_WORDS:
+            return True
+        if word in FALSE_WORDS:
+            return False
+        raise ValueError
+    if isinstance(default, int):
+        return int(value)
+    if isinstance(default, float):
+        return float(value)
+    return str(value)
+
+
+def coerce(name: str, default: Any, value: Any) -> Any:
+    """Convert a file/env/CLI value to the type of the default."""
+    try:
+        if isinstance(default, tuple):
+            items = value if isinstance(value, (list, tuple)) else str(value).split(',')
+            kind = default[0] if default else ''
+            return tuple(_scalar(kind, item) for item in items)
+        return _scalar(default, value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{name}: cannot use {value!r} "
+                         f"(expected {type(default).__name__})") from None
+
+
+# ═══════════════════════════════════════════════════════════════
+# LAYERS
+# ═══════════════════════════════════════════════════════════════
+
+def _read_file(path: Optional[str]) -> Dict[str, Any]:
+    global config_file
+    if path is None:
+        path = os.environ.get(CONFIG_ENV)
+    if path is None and os.path.exists(DEFAULT_CONFIG_FILE):
+        path = DEFAULT_CONFIG_FILE
+    config_file = path
+    if path is None:
+        return {}
+    with open(path, encoding='utf-8') as f:
+        values = json.load(f)
+    if not isinstance(values, dict):
+        raise ValueError(f"{path}: expected a JSON object of settings")
+    return values
+
+
+def _read_env() -> Dict[str, str]:
+    return {name: os.environ[ENV_PREFIX + name] for name in _defaults
+            if ENV_PREFIX + name in os.environ}
+
+
+def load(namespace: Dict[str, Any], path: Optional[str] = None,
+         overrides: Iterable[Tuple[str, Any]] = ()):
+    """
+    (Re)apply every layer to `namespace` - config.py's globals. The first
+    call remembers the values there as the defaults.
+    """
+    global _settings
+    if not _defaults:
+        _defaults.update(_tunable(namespace))
+        _settings = namespace
+    namespace.update(_defaults)
+    sources.clear()
+
+    layers = (('file', _read_file(path)), ('env', _read_env()), ('cli', dict(overrides)))
+    for source, values in layers:
+        for name, value in values.items():
+            name = name.upper()
+            if name not in _defaults:
+                raise ValueError(f"Unknown setting {name!r} ({source})")
+            namespace[name] = coerce(name, _defaults[name], value)
+            sources[name] = source
+
+
+def apply_cli(args: List[str]) -> List[str]:
+    """
+    Take --config FILE and --set NAME=VALUE out of `args`, reload the
+    settings with them, and return the remaining arguments.
+    """
+    path = None
+    overrides: List[Tuple[str, str]] = []
+    rest: List[str] = []
+    i = 0
+    while i < len(args):
+        arg = args[i]
+        if arg in ('--config', '--set'):
+            if i + 1 >= len(args):
+                raise ValueError(f"{arg} needs a value")
+            value = args[i + 1]
+            i += 2
+            if arg == '--config':
+                path = value
+                continue
+            name, sep, value = value.partition('=')
+            if not sep:
+                raise ValueError(f"--set expects NAME=VALUE, got {name!r}")
+            overrides.append((name.strip().upper(), value))
+        else:
+            rest.append(arg)
+            i += 1
+
+    if path is None and not overrides:
+        return rest
+    load(_settings, path, overrides)
+
+    # Spawned processes re-import config: hand them the same layers
+    if path is not None:
+        os.environ[CONFIG_ENV] = path
+    for name, value in overrides:
+        os.environ[ENV_PREFIX + name] = value
+    return rest
+
+
+# ═══════════════════════════════════════════════════════════════
+# REPORTING
+# ═══════════════════════════════════════════════════════════════
+
+def changed_settings() -> List[str]:
+    """'NAME=value (source)' for every setting that differs from config.py."""
+    return [f"{name}={_settings[name]!r} ({source})" for name, source in sorted(sources.items())]
+
+
+def format_profile() -> str:
+    """Active tuning profile, one setting per line; overridden ones are marked."""
+    lines = [f"⚙️  Active profile - file: {config_file or 'none'}, "
+             f"{len(sources)} override(s)"]
+    for group, names in PROFILE:
+        lines.append(f"  {group}")
+        for name in names:
+            source = sources.get(name)
+            mark = f"  ← {source}" if source else ""
+            lines.append(f"    {name:<28}{_settings.get(name)!r}{mark}")
+    return "\n".join(lines)
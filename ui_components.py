@@ -6,7 +6,7 @@ Students: Adir Buskila & Liav Weizman
 
 import tkinter as tk
 from tkinter import ttk, scrolledtext
-from typing import Callable, Optional, Dict, Any
+from typing import Callable, Optional, Dict, Any, List, Tuple
 from datetime import datetime
 
 from config import COLORS, FONTS
@@ -235,32 +235,55 @@ class PingIndicator(tk.Frame):
 class MessageBubble(tk.Frame):
     """Chat message bubble with timestamp and styling."""
     
+    # Label texts per message type: (sender, time, message)
+    TEXTS = {
+        'sent': (None, "{time}", "{message}"),
+        'recv': ("👤 {sender}", " · {time}", "{message}"),
+        'private_sent': ("🔒 To {sender}", "{time} · ", "{message}"),
+        'private_recv': ("🔒 From {sender}", " · {time}", "{message}"),
+        'system': (None, None, "⚡ {message}"),
+    }
+    
     def __init__(self, parent, sender: str, message: str, 
                  msg_type: str = 'recv', timestamp: str = None, **kwargs):
         super().__init__(parent, bg=COLORS['bg_medium'], **kwargs)
         
-        self.timestamp = timestamp or datetime.now().strftime("%H:%M")
+        self.msg_type = msg_type
+        self.sender_label: Optional[tk.Label] = None
+        self.time_label: Optional[tk.Label] = None
+        self.text_label: Optional[tk.Label] = None
         
         if msg_type == 'sent':
-            self._create_sent_bubble(message)
+            self._create_sent_bubble()
         elif msg_type == 'recv':
-            self._create_recv_bubble(sender, message)
+            self._create_recv_bubble()
         elif msg_type == 'private_sent':
-            self._create_private_sent_bubble(sender, message)
+            self._create_private_sent_bubble()
         elif msg_type == 'private_recv':
-            self._create_private_recv_bubble(sender, message)
+            self._create_private_recv_bubble()
         elif msg_type == 'system':
-            self._create_system_message(message)
+            self._create_system_message()
+        
+        self.show(sender, message, timestamp)
     
-    def _create_sent_bubble(self, message: str):
+    def show(self, sender: str, message: str, timestamp: str = None):
+        """Fill in (or replace) the bubble's texts - bubbles are reused by ChatView."""
+        self.timestamp = timestamp or datetime.now().strftime("%H:%M")
+        labels = (self.sender_label, self.time_label, self.text_label)
+        for label, text in zip(labels, self.TEXTS.get(self.msg_type, ())):
+            if label is not None:
+                label.configure(text=text.format(sender=sender, time=self.timestamp,
+                                                 message=message))
+    
+    def _create_sent_bubble(self):
         """Create sent message bubble (right aligned, cyan border)."""
         container = tk.Frame(self, bg=COLORS['bg_medium'])
         container.pack(fill='x', pady=4, padx=8)
         
         # Time label
-        time_lbl = tk.Label(container, text=self.timestamp, font=FONTS['tiny'],
-                           fg=COLORS['text_dim'], bg=COLORS['bg_medium'])
-        time_lbl.pack(side='right', padx=(5, 0))
+        self.time_label = tk.Label(container, font=FONTS['tiny'],
+                                   fg=COLORS['text_dim'], bg=COLORS['bg_medium'])
+        self.time_label.pack(side='right', padx=(5, 0))
         
         # Bubble
         bubble = tk.Frame(container, bg=COLORS['accent_cyan'])
@@ -269,11 +292,12 @@ class MessageBubble(tk.Frame):
         inner = tk.Frame(bubble, bg=COLORS['bg_light'], padx=12, pady=8)
         inner.pack(padx=2, pady=2)
         
-        tk.Label(inner, text=message, font=FONTS['message'],
-                fg=COLORS['text_primary'], bg=COLORS['bg_light'],
-                wraplength=300, justify='left').pack()
+        self.text_label = tk.Label(inner, font=FONTS['message'],
+                                   fg=COLORS['text_primary'], bg=COLORS['bg_light'],
+                                   wraplength=300, justify='left')
+        self.text_label.pack()
     
-    def _create_recv_bubble(self, sender: str, message: str):
+    def _create_recv_bubble(self):
         """Create received message bubble (left aligned, purple border)."""
         container = tk.Frame(self, bg=COLORS['bg_medium'])
         container.pack(fill='x', pady=4, padx=8)
@@ -282,10 +306,12 @@ class MessageBubble(tk.Frame):
         sender_frame = tk.Frame(container, bg=COLORS['bg_medium'])
         sender_frame.pack(anchor='w')
         
-        tk.Label(sender_frame, text=f"👤 {sender}", font=FONTS['tiny'],
-                fg=COLORS['accent_pink'], bg=COLORS['bg_medium']).pack(side='left')
-        tk.Label(sender_frame, text=f" · {self.timestamp}", font=FONTS['tiny'],
-                fg=COLORS['text_dim'], bg=COLORS['bg_medium']).pack(side='left')
+        self.sender_label = tk.Label(sender_frame, font=FONTS['tiny'],
+                                     fg=COLORS['accent_pink'], bg=COLORS['bg_medium'])
+        self.sender_label.pack(side='left')
+        self.time_label = tk.Label(sender_frame, font=FONTS['tiny'],
+                                   fg=COLORS['text_dim'], bg=COLORS['bg_medium'])
+        self.time_label.pack(side='left')
         
         # Bubble
         bubble = tk.Frame(container, bg=COLORS['accent_purple'])
@@ -294,11 +320,12 @@ class MessageBubble(tk.Frame):
         inner = tk.Frame(bubble, bg=COLORS['bg_card'], padx=12, pady=8)
         inner.pack(padx=2, pady=2)
         
-        tk.Label(inner, text=message, font=FONTS['message'],
-                fg=COLORS['text_primary'], bg=COLORS['bg_card'],
-                wraplength=300, justify='left').pack()
+        self.text_label = tk.Label(inner, font=FONTS['message'],
+                                   fg=COLORS['text_primary'], bg=COLORS['bg_card'],
+                                   wraplength=300, justify='left')
+        self.text_label.pack()
     
-    def _create_private_sent_bubble(self, recipient: str, message: str):
+    def _create_private_sent_bubble(self):
         """Create private sent message bubble."""
         container = tk.Frame(self, bg=COLORS['bg_medium'])
         container.pack(fill='x', pady=4, padx=8)
@@ -307,10 +334,12 @@ class MessageBubble(tk.Frame):
         header = tk.Frame(container, bg=COLORS['bg_medium'])
         header.pack(anchor='e')
         
-        tk.Label(header, text=f"🔒 To {recipient}", font=FONTS['tiny'],
-                fg=COLORS['accent_purple'], bg=COLORS['bg_medium']).pack(side='right')
-        tk.Label(header, text=f"{self.timestamp} · ", font=FONTS['tiny'],
-                fg=COLORS['text_dim'], bg=COLORS['bg_medium']).pack(side='right')
+        self.sender_label = tk.Label(header, font=FONTS['tiny'],
+                                     fg=COLORS['accent_purple'], bg=COLORS['bg_medium'])
+        self.sender_label.pack(side='right')
+        self.time_label = tk.Label(header, font=FONTS['tiny'],
+                                   fg=COLORS['text_dim'], bg=COLORS['bg_medium'])
+        self.time_label.pack(side='right')
         
         # Bubble
         bubble = tk.Frame(container, bg=COLORS['accent_purple'])
@@ -319,11 +348,12 @@ class MessageBubble(tk.Frame):
         inner = tk.Frame(bubble, bg=COLORS['bg_light'], padx=12, pady=8)
         inner.pack(padx=2, pady=2)
         
-        tk.Label(inner, text=message, font=FONTS['message'],
-                fg=COLORS['text_primary'], bg=COLORS['bg_light'],
-                wraplength=300, justify='left').pack()
+        self.text_label = tk.Label(inner, font=FONTS['message'],
+                                   fg=COLORS['text_primary'], bg=COLORS['bg_light'],
+                                   wraplength=300, justify='left')
+        self.text_label.pack()
     
-    def _create_private_recv_bubble(self, sender: str, message: str):
+    def _create_private_recv_bubble(self):
         """Create private received message bubble."""
         container = tk.Frame(self, bg=COLORS['bg_medium'])
         container.pack(fill='x', pady=4, padx=8)
@@ -332,10 +362,12 @@ class MessageBubble(tk.Frame):
         header = tk.Frame(container, bg=COLORS['bg_medium'])
         header.pack(anchor='w')
         
-        tk.Label(header, text=f"🔒 From {sender}", font=FONTS['tiny'],
-                fg=COLORS['accent_pink'], bg=COLORS['bg_medium']).pack(side='left')
-        tk.Label(header, text=f" · {self.timestamp}", font=FONTS['tiny'],
-                fg=COLORS['text_dim'], bg=COLORS['bg_medium']).pack(side='left')
+        self.sender_label = tk.Label(header, font=FONTS['tiny'],
+                                     fg=COLORS['accent_pink'], bg=COLORS['bg_medium'])
+        self.sender_label.pack(side='left')
+        self.time_label = tk.Label(header, font=FONTS['tiny'],
+                                   fg=COLORS['text_dim'], bg=COLORS['bg_medium'])
+        self.time_label.pack(side='left')
         
         # Bubble
         bubble = tk.Frame(container, bg=COLORS['accent_pink'])
@@ -344,17 +376,248 @@ class MessageBubble(tk.Frame):
         inner = tk.Frame(bubble, bg=COLORS['bg_card'], padx=12, pady=8)
         inner.pack(padx=2, pady=2)
         
-        tk.Label(inner, text=message, font=FONTS['message'],
-                fg=COLORS['text_primary'], bg=COLORS['bg_card'],
-                wraplength=300, justify='left').pack()
+        self.text_label = tk.Label(inner, font=FONTS['message'],
+                                   fg=COLORS['text_primary'], bg=COLORS['bg_card'],
+                                   wraplength=300, justify='left')
+        self.text_label.pack()
     
-    def _create_system_message(self, message: str):
+    def _create_system_message(self):
         """Create system message (centered, cyan text)."""
         container = tk.Frame(self, bg=COLORS['bg_medium'])
         container.pack(fill='x', pady=2, padx=8)
         
-        tk.Label(container, text=f"⚡ {message}", font=FONTS['small'],
-                fg=COLORS['accent_cyan'], bg=COLORS['bg_medium']).pack()
+        self.text_label = tk.Label(container, font=FONTS['small'],
+                                   fg=COLORS['accent_cyan'], bg=COLORS['bg_medium'])
+        self.text_label.pack()
+
+
+# ═══════════════════════════════════════════════════════════════
+# CHAT VIEW
+# ═══════════════════════════════════════════════════════════════
+
+class ChatView(tk.Frame):
+    """
+    Scrollable message list that only renders a window of its messages.
+    
+    Every message is kept as a small tuple; at most `window` of them have a
+    MessageBubble at a time. Scrolling past either end of the rendered
+    window pages `page` more in from the store and drops as many at the
+    other end, and dropped bubbles are kept per type for reuse. Only the
+    last `scrollback` messages are kept at all.
+    
+    While the view is at the bottom it follows new messages, with layout
+    and scrolling done once per batch when the UI goes idle. Scrolled up,
+    new messages are only stored and counted on a "new messages" badge
+    that jumps back down.
+    """
+    
+    def __init__(self, parent, window: int = 80, page: int = 20,
+                 scrollback: int = 10000, **kwargs):
+        bg = COLORS['bg_medium']
+        super().__init__(parent, bg=bg, **kwargs)
+        
+        self.window = max(window, page)
+        self.page = page
+        self.scrollback = scrollback
+        self.entries: List[Tuple[str, str, str, str]] = []  # (sender, message, type, time)
+        self.start = 0                       # entries[start:end] are on screen...
+        self.end = 0
+        self.bubbles: List[MessageBubble] = []  # ...as these, in order
+        self.spare: Dict[str, List[MessageBubble]] = {}  # {msg_type: unpacked bubbles}
+        self.paging = False
+        self.following = True                # view at the bottom: show and scroll to new messages
+        self.scrolling = False               # a scroll to the bottom is pending
+        self.unseen = 0                      # messages added while not following
+        
+        self.canvas = tk.Canvas(self, bg=bg, highlightthickness=0)
+        self.scrollbar = tk.Scrollbar(self, orient='vertical', command=self.canvas.yview)
+        self.frame = tk.Frame(self.canvas, bg=bg)
+        
+        self.canvas.configure(yscrollcommand=self._on_scroll)
+        self.scrollbar.pack(side='right', fill='y')
+        self.canvas.pack(side='left', fill='both', expand=True)
+        
+        self.frame_window = self.canvas.create_window((0, 0), window=self.frame, anchor='nw')
+        
+        self.frame.bind('<Configure>',
+            lambda e: self.canvas.configure(scrollregion=self.canvas.bbox('all')))
+        self.canvas.bind('<Configure>',
+            lambda e: self.canvas.itemconfig(self.frame_window, width=e.width))
+        
+        # Jump badge (shown while scrolled up and messages arrive)
+        self.badge = tk.Button(self, font=FONTS['small_bold'], bg=COLORS['accent_cyan'],
+                               fg=COLORS['bg_dark'], relief='flat', cursor='hand2',
+                               command=self.jump_to_latest)
+    
+    @property
+    def at_tail(self) -> bool:
+        """The newest message is in the rendered window."""
+        return self.end == len(self.entries)
+    
+    def add(self, sender: str, message: str, msg_type: str = 'recv',
+            timestamp: str = None) -> bool:
+        """Store a message; True if it was rendered (the view follows new messages)."""
+        entry = (sender, message, msg_type, timestamp or datetime.now().strftime("%H:%M"))
+        rendered = self.following and self.at_tail
+        self.entries.append(entry)
+        if rendered:
+            bubble = self._bubble(entry)
+            bubble.pack(fill='x')
+            self.bubbles.append(bubble)
+            self.end += 1
+            while len(self.bubbles) > self.window:
+                self._recycle(self.bubbles.pop(0))
+                self.start += 1
+            self._scroll_soon()
+        else:
+            self._set_unseen(self.unseen + 1)
+        self._trim_store()
+        return rendered
+    
+    def clear(self):
+        """Forget every message."""
+        for bubble in self.bubbles:
+            self._recycle(bubble)
+        self.bubbles.clear()
+        self.entries.clear()
+        self.start = self.end = 0
+        self.following = True
+        self._set_unseen(0)
+    
+    def jump_to_latest(self):
+        """Show the newest messages and follow new ones again."""
+        if not self.at_tail:
+            for bubble in self.bubbles:
+                self._recycle(bubble)
+            self.bubbles.clear()
+            self.end = len(self.entries)
+            self.start = max(0, self.end - self.window)
+            for entry in self.entries[self.start:self.end]:
+                bubble = self._bubble(entry)
+                bubble.pack(fill='x')
+                self.bubbles.append(bubble)
+        self.following = True
+        self._set_unseen(0)
+        self._scroll_soon()
+    
+    # ─── Paging ───
+    
+    def _on_scroll(self, first: str, last: str):
+        """yscrollcommand: update the scrollbar and page when an end is reached."""
+        self.scrollbar.set(first, last)
+        if self.scrolling:
+            return  # Our own layout catching up, not the user scrolling
+        first, last = float(first), float(last)
+        following = last >= 1.0 and self.at_tail
+        if following != self.following:
+            self.following = following
+            if following:
+                self._set_unseen(0)
+        if self.paging or (first <= 0.0 and last >= 1.0):
+            return  # Everything fits: nothing to page
+        if first <= 0.0 and self.start > 0:
+            self.paging = True
+            self.after_idle(self._page_older)
+        elif last >= 1.0 and not self.at_tail:
+            self.paging = True
+            self.after_idle(self._page_newer)
+    
+    def _page_older(self):
+        """Render up to `page` messages above the window, drop as many below."""
+        self.paging = False
+        count = min(self.page, self.start)
+        if not count or not self.bubbles:
+            return
+        top = self.canvas.canvasy(0)
+        first = self.bubbles[0]
+        older = [self._bubble(entry) for entry in self.entries[self.start - count:self.start]]
+        for bubble in older:
+            bubble.pack(fill='x', before=first)
+        self.bubbles[:0] = older
+        self.start -= count
+        while len(self.bubbles) > self.window:
+            self._recycle(self.bubbles.pop())
+            self.end -= 1
+        self._layout()
+        # Keep what was on screen where it was
+        self._move_to(top + sum(b.winfo_height() for b in older))
+    
+    def _page_newer(self):
+        """Render up to `page` messages below the window, drop as many above."""
+        self.paging = False
+        count = min(self.page, len(self.entries) - self.end)
+        if not count:
+            return
+        top = self.canvas.canvasy(0)
+        for entry in self.entries[self.end:self.end + count]:
+            bubble = self._bubble(entry)
+            bubble.pack(fill='x')
+            self.bubbles.append(bubble)
+        self.end += count
+        removed = 0
+        while len(self.bubbles) > self.window:
+            bubble = self.bubbles.pop(0)
+            removed += bubble.winfo_height()
+            self._recycle(bubble)
+            self.start += 1
+        self._layout()
+        self._move_to(top - removed)
+    
+    # ─── Internals ───
+    
+    def _bubble(self, entry: Tuple[str, str, str, str]) -> MessageBubble:
+        """A bubble showing `entry`: a spare one of the same type, or a new one."""
+        sender, message, msg_type, timestamp = entry
+        spare = self.spare.get(msg_type)
+        if spare:
+            bubble = spare.pop()
+            bubble.show(sender, message, timestamp)
+            return bubble
+        return MessageBubble(self.frame, sender, message, msg_type, timestamp)
+    
+    def _recycle(self, bubble: MessageBubble):
+        bubble.pack_forget()
+        spare = self.spare.setdefault(bubble.msg_type, [])
+        if len(spare) < self.page:
+            spare.append(bubble)
+        else:
+            bubble.destroy()
+    
+    def _trim_store(self):
+        """Drop the oldest messages past `scrollback`, a page at a time."""
+        excess = min(len(self.entries) - self.scrollback, self.start)
+        if excess >= self.page:
+            del self.entries[:excess]
+            self.start -= excess
+            self.end -= excess
+    
+    def _scroll_soon(self):
+        """One layout and scroll to the bottom per batch of messages."""
+        if not self.scrolling:
+            self.scrolling = True
+            self.after_idle(self._scroll)
+    
+    def _scroll(self):
+        self._layout()
+        self.canvas.yview_moveto(1.0)
+        self.scrolling = False
+    
+    def _set_unseen(self, count: int):
+        self.unseen = count
+        if count:
+            self.badge.configure(text=f"⬇ {count} new message{'s' if count != 1 else ''}")
+            self.badge.place(relx=1.0, rely=1.0, x=-24, y=-8, anchor='se')
+        else:
+            self.badge.place_forget()
+    
+    def _layout(self):
+        self.canvas.update_idletasks()
+        self.canvas.configure(scrollregion=self.canvas.bbox('all'))
+    
+    def _move_to(self, y: float):
+        height = self.frame.winfo_height()
+        if height > 0:
+            self.canvas.yview_moveto(max(0.0, y) / height)
 
 
 # ═══════════════════════════════════════════════════════════════
@@ -392,6 +655,15 @@ class TypingIndicator(tk.Frame):
         if not self.typing_users:
             self._stop_animation()
     
+    def set_users(self, usernames):
+        """Replace the typing list with a full snapshot."""
+        self.typing_users = set(usernames)
+        self._update_display()
+        if self.typing_users:
+            self._start_animation()
+        else:
+            self._stop_animation()
+    
     def _update_display(self):
         """Update the display text."""
         if not self.typing_users:
@@ -441,6 +713,67 @@ class TypingIndicator(tk.Frame):
         self.animation_id = self.after(500, self._animate)
 
 
+# ═══════════════════════════════════════════════════════════════
+# FILE TRANSFER PROGRESS
+# ═══════════════════════════════════════════════════════════════
+
+class TransferPanel(tk.Frame):
+    """One progress row per active file transfer, hidden when there are none."""
+    
+    BAR_WIDTH = 120
+    
+    def __init__(self, parent, on_cancel: Callable = None, **kwargs):
+        bg = COLORS['bg_medium']
+        super().__init__(parent, bg=bg, **kwargs)
+        
+        self.on_cancel = on_cancel
+        self.rows: Dict[str, Dict[str, Any]] = {}  # {transfer id: row widgets}
+        
+        # Hide by default
+        self.pack_forget()
+    
+    def set_progress(self, transfer_id: str, text: str, fraction: float):
+        """Add or update a transfer's row."""
+        row = self.rows.get(transfer_id)
+        if row is None:
+            row = self._add_row(transfer_id)
+        row['label'].configure(text=text)
+        width = int(self.BAR_WIDTH * max(0.0, min(fraction, 1.0)))
+        row['bar'].coords(row['fill'], 0, 0, width, 6)
+        self.pack(fill='x')
+    
+    def remove(self, transfer_id: str):
+        """Drop a finished or cancelled transfer's row."""
+        row = self.rows.pop(transfer_id, None)
+        if row is not None:
+            row['frame'].destroy()
+        if not self.rows:
+            self.pack_forget()
+    
+    def _add_row(self, transfer_id: str) -> Dict[str, Any]:
+        bg = COLORS['bg_medium']
+        frame = tk.Frame(self, bg=bg)
+        frame.pack(fill='x', padx=10, pady=2)
+        
+        bar = tk.Canvas(frame, width=self.BAR_WIDTH, height=6, bg=COLORS['bg_light'],
+                        highlightthickness=0)
+        bar.pack(side='left', padx=(0, 8))
+        fill = bar.create_rectangle(0, 0, 0, 6, fill=COLORS['accent_cyan'], width=0)
+        
+        label = tk.Label(frame, text="", font=FONTS['small'],
+                         fg=COLORS['text_secondary'], bg=bg, anchor='w')
+        label.pack(side='left', fill='x', expand=True)
+        
+        if self.on_cancel:
+            tk.Button(frame, text="✕", font=FONTS['tiny'], bg=bg,
+                      fg=COLORS['accent_red'], relief='flat', cursor='hand2',
+                      command=lambda: self.on_cancel(transfer_id)).pack(side='right')
+        
+        row = {'frame': frame, 'bar': bar, 'fill': fill, 'label': label}
+        self.rows[transfer_id] = row
+        return row
+
+
 # ═══════════════════════════════════════════════════════════════
 # USER LIST ITEM
 # ═══════════════════════════════════════════════════════════════
@@ -454,6 +787,7 @@ class UserListItem(tk.Frame):
         super().__init__(parent, bg=bg, **kwargs)
         
         self.username = username
+        self.status = status
         self.on_click = on_click
         
         # Status colors
@@ -507,6 +841,7 @@ class UserListItem(tk.Frame):
     
     def update_status(self, status: str):
         """Update user status."""
+        self.status = status
         status_colors = {
             'online': COLORS['status_online'],
             'away': COLORS['status_away'],
@@ -516,6 +851,125 @@ class UserListItem(tk.Frame):
         self.dot.configure(fg=status_colors.get(status, COLORS['status_offline']))
 
 
+# ═══════════════════════════════════════════════════════════════
+# ROSTER
+# ═══════════════════════════════════════════════════════════════
+
+class RosterView(tk.Frame):
+    """
+    Online users list keyed by username, with a search filter.
+    
+    Rows have a fixed height and only those in or near the visible part of
+    the list exist as UserListItems, so a roster of thousands costs a
+    screenful of widgets. set_users() compares with what is shown: rows are
+    created, moved or removed only when the filtered list changes, and a
+    status change is one update_status().
+    """
+    
+    ROW_HEIGHT = 24
+    OVERSCAN = 5                             # rows kept beyond each edge of the view
+    
+    def __init__(self, parent, me: str = "", on_click: Callable = None, **kwargs):
+        bg = COLORS['bg_card']
+        super().__init__(parent, bg=bg, **kwargs)
+        
+        self.me = me
+        self.on_click = on_click
+        self.users: Dict[str, str] = {}      # {username: status}, in server order
+        self.names: List[str] = []           # users matching the filter, in order
+        self.rows: Dict[str, List[Any]] = {}  # {username: [canvas item, row, index]} on screen
+        self.query = ""
+        self.pending = False
+        
+        # Search filter
+        self.search = CyberEntry(self, placeholder="🔍 Search", width=1)
+        self.search.configure(font=FONTS['small'])
+        self.search.pack(fill='x', pady=(0, 5), ipady=3)
+        self.search.bind('<KeyRelease>', lambda e: self.set_filter(self.search.get_value()))
+        
+        # Rows are canvas windows at index * ROW_HEIGHT
+        body = tk.Frame(self, bg=bg)
+        body.pack(fill='both', expand=True)
+        
+        self.canvas = tk.Canvas(body, bg=bg, highlightthickness=0,
+                                yscrollincrement=self.ROW_HEIGHT)
+        self.scrollbar = tk.Scrollbar(body, orient='vertical', command=self.canvas.yview)
+        
+        self.canvas.configure(yscrollcommand=self._on_scroll)
+        self.scrollbar.pack(side='right', fill='y')
+        self.canvas.pack(side='left', fill='both', expand=True)
+        self.canvas.bind('<Configure>', self._on_resize)
+    
+    def set_users(self, users: Dict[str, str]):
+        """Show `users` ({username: status}), touching only what changed."""
+        self.users = dict(users)
+        self._refresh()
+    
+    def set_filter(self, query: str):
+        """Only show usernames containing `query` (case-insensitive)."""
+        query = query.strip().lower()
+        if query != self.query:
+            self.query = query
+            self.canvas.yview_moveto(0.0)
+            self._refresh()
+    
+    # ─── Internals ───
+    
+    def _refresh(self):
+        names = [name for name in self.users if self.query in name.lower()]
+        if names != self.names:
+            self.names = names
+            self.canvas.configure(scrollregion=(0, 0, 1, len(names) * self.ROW_HEIGHT))
+        self._render()
+    
+    def _schedule(self):
+        if not self.pending:
+            self.pending = True
+            self.after_idle(self._render)
+    
+    def _on_scroll(self, first: str, last: str):
+        self.scrollbar.set(first, last)
+        self._schedule()
+    
+    def _on_resize(self, event):
+        for item, _, _ in self.rows.values():
+            self.canvas.itemconfig(item, width=event.width)
+        self._schedule()
+    
+    def _render(self):
+        """Bring the rows in view up to date with names and users."""
+        self.pending = False
+        height = self.ROW_HEIGHT
+        top = self.canvas.canvasy(0)
+        first = max(0, int(top // height) - self.OVERSCAN)
+        last = int((top + self.canvas.winfo_height()) // height) + 1 + self.OVERSCAN
+        wanted = {name: index for index, name in enumerate(self.names[first:last], first)}
+        
+        for name in [name for name in self.rows if name not in wanted]:
+            item, row, _ = self.rows.pop(name)
+            self.canvas.delete(item)
+            row.destroy()
+        
+        width = self.canvas.winfo_width()
+        for name, index in wanted.items():
+            status = self.users[name]
+            shown = self.rows.get(name)
+            if shown is None:
+                is_self = name == self.me
+                row = UserListItem(self.canvas, name, status, is_self=is_self,
+                                   on_click=None if is_self else self.on_click)
+                item = self.canvas.create_window(0, index * height, window=row, anchor='nw',
+                                                 width=width, height=height)
+                self.rows[name] = [item, row, index]
+                continue
+            item, row, placed = shown
+            if placed != index:
+                self.canvas.coords(item, 0, index * height)
+                shown[2] = index
+            if row.status != status:
+                row.update_status(status)
+
+
 # ═══════════════════════════════════════════════════════════════
 # STATS CARD
 # ═══════════════════════════════════════════════════════════════
@@ -6,12 +6,19 @@ Students: Adir Buskila & Liav Weizman
 
 import os
 import json
+import math
 import logging
+import socket
 from datetime import datetime
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple
 from pathlib import Path
 
-from config import LOG_FILE, HISTORY_DIR, COLORS
+from config import (
+    LOG_FILE, HISTORY_DIR, COLORS, STATUS_ONLINE,
+    SOCKET_RCVBUF, SOCKET_SNDBUF, SOCKET_NODELAY, SOCKET_KEEPALIVE,
+    SOCKET_KEEPALIVE_IDLE, SOCKET_KEEPALIVE_INTERVAL, SOCKET_KEEPALIVE_COUNT,
+    SOCKET_NOTSENT_LOWAT
+)
 
 
 # ═══════════════════════════════════════════════════════════════
@@ -25,8 +32,8 @@ class ChatLogger:
         self.logger = logging.getLogger(name)
         self.logger.setLevel(logging.DEBUG)
         
-        # File handler
-        if log_file:
+        # File handler (loggers are process-wide; attach it only once)
+        if log_file and not self.logger.handlers:
             fh = logging.FileHandler(log_file, encoding='utf-8')
             fh.setLevel(logging.DEBUG)
             fh.setFormatter(logging.Formatter(
@@ -215,13 +222,48 @@ def parse_command(text: str) -> tuple:
     return (command, args)
 
 
+def parse_user_list(users_str: str) -> List[Tuple[str, str]]:
+    """
+    Parse a USERS frame body into (username, status) pairs.
+    Format: "Online: user1(status), user2(status), ..."
+    """
+    users_part = users_str.replace("Online:", "").strip()
+    if not users_part:
+        return []
+    
+    users = []
+    for user_entry in users_part.split(","):
+        user_entry = user_entry.strip()
+        if not user_entry:
+            continue
+        
+        # Parse "username(status)" format
+        if "(" in user_entry:
+            username = user_entry.split("(")[0].strip()
+            status = user_entry.split("(")[1].rstrip(")").strip()
+        else:
+            username = user_entry
+            status = STATUS_ONLINE
+        
+        users.append((username, status))
+    return users
+
+
 # ═══════════════════════════════════════════════════════════════
 # NETWORK UTILITIES
 # ═══════════════════════════════════════════════════════════════
 
+UNIX_PREFIX = "unix:"
+
+
 def parse_address(address: str, default_host: str = '127.0.0.1', 
                   default_port: int = 12345) -> tuple:
-    """Parse address string like 'host:port' or just 'host'."""
+    """
+    Parse address string like 'host:port' or just 'host'.
+    'unix:/path/to/socket' gives (path, None).
+    """
+    if address.startswith(UNIX_PREFIX):
+        return (address[len(UNIX_PREFIX):], None)
     try:
         if ':' in address:
             parts = address.split(':')
@@ -231,6 +273,59 @@ def parse_address(address: str, default_host: str = '127.0.0.1',
         return (default_host, default_port)
 
 
+def format_address(address: Optional[tuple]) -> str:
+    """'host:port', or 'unix:<path>' for a Unix socket address."""
+    if address is None or address[1] is None:
+        return UNIX_PREFIX + (address[0] if address else '')
+    return f"{address[0]}:{address[1]}"
+
+
+def is_unix_socket(sock: socket.socket) -> bool:
+    return hasattr(socket, 'AF_UNIX') and sock.family == socket.AF_UNIX
+
+
+def open_connection(host: str, port: Optional[int], timeout: float = 5.0) -> socket.socket:
+    """Connect to host:port over TCP, or to the Unix socket at `host` when port is None."""
+    if port is not None:
+        return socket.create_connection((host, port), timeout=timeout)
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    try:
+        sock.connect(host)
+    except OSError:
+        sock.close()
+        raise
+    return sock
+
+
+def apply_socket_options(sock: socket.socket, nodelay: bool = SOCKET_NODELAY):
+    """Apply the SOCKET_* tuning options to a socket (best effort)."""
+    options = []
+    if SOCKET_RCVBUF:
+        options.append((socket.SOL_SOCKET, socket.SO_RCVBUF, SOCKET_RCVBUF))
+    if SOCKET_SNDBUF:
+        options.append((socket.SOL_SOCKET, socket.SO_SNDBUF, SOCKET_SNDBUF))
+    tcp = not is_unix_socket(sock)  # Buffer sizes are all that apply to a Unix socket
+    if tcp and nodelay:
+        options.append((socket.IPPROTO_TCP, socket.TCP_NODELAY, 1))
+    if tcp and SOCKET_NOTSENT_LOWAT and hasattr(socket, 'TCP_NOTSENT_LOWAT'):
+        options.append((socket.IPPROTO_TCP, socket.TCP_NOTSENT_LOWAT, SOCKET_NOTSENT_LOWAT))
+    if tcp and SOCKET_KEEPALIVE:
+        options.append((socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1))
+        # Probe timing options are platform specific
+        for name, value in (('TCP_KEEPIDLE', SOCKET_KEEPALIVE_IDLE),
+                            ('TCP_KEEPINTVL', SOCKET_KEEPALIVE_INTERVAL),
+                            ('TCP_KEEPCNT', SOCKET_KEEPALIVE_COUNT)):
+            if hasattr(socket, name):
+                options.append((socket.IPPROTO_TCP, getattr(socket, name), value))
+    
+    for level, option, value in options:
+        try:
+            sock.setsockopt(level, option, value)
+        except OSError:
+            pass
+
+
 def format_bytes(num_bytes: int) -> str:
     """Format bytes to human readable string."""
     for unit in ['B', 'KB', 'MB', 'GB']:
@@ -240,6 +335,46 @@ def format_bytes(num_bytes: int) -> str:
     return f"{num_bytes:.1f} TB"
 
 
+# ═══════════════════════════════════════════════════════════════
+# MEASUREMENT UTILITIES
+# ═══════════════════════════════════════════════════════════════
+
+def get_memory_usage() -> int:
+    """Resident memory of this process in bytes (0 if unavailable)."""
+    try:
+        with open('/proc/self/status', encoding='utf-8') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    
+    try:
+        import resource
+        # Peak rather than current, but the best we get without /proc
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    except Exception:
+        return 0
+
+
+def get_open_fds() -> Optional[int]:
+    """Number of open file descriptors in this process (None if unknown)."""
+    for fd_dir in ('/proc/self/fd', '/dev/fd'):
+        try:
+            return len(os.listdir(fd_dir))
+        except OSError:
+            continue
+    return None
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list (0 if empty)."""
+    if not sorted_values:
+        return 0.0
+    rank = math.ceil(pct / 100 * len(sorted_values)) - 1
+    return sorted_values[max(0, min(rank, len(sorted_values) - 1))]
+
+
 # ═══════════════════════════════════════════════════════════════
 # COLOR UTILITIES
 # ═══════════════════════════════════════════════════════════════